@@ -1,6 +1,6 @@
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 import os
 from dotenv import load_dotenv
 
@@ -26,3 +26,12 @@ def get_db():
         yield db
     finally:
         db.close()
+
+def release_connection(db: Session):
+    """Return the session's pooled connection before awaiting slow I/O.
+
+    Async handlers run on the event loop, so holding a connection across an
+    await lets a burst of requests exhaust the pool and block the loop on
+    checkout. Only call this when the session has no pending changes.
+    """
+    db.rollback()
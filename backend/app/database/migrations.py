@@ -0,0 +1,64 @@
+import logging
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import CreateColumn
+from app.database.database import Base
+# Imported so every table is registered on Base.metadata
+from app.models import outbox, parcel, stats, user  # noqa: F401
+
+logger = logging.getLogger(__name__)
+
+# Columns added to tables that already existed in deployed databases.
+# create_all only creates missing tables, so these are added with ALTER TABLE;
+# each needs to be nullable or have a server default.
+ADDED_COLUMNS = [
+    # Stored routes
+    parcel.Parcel.__table__.c.distance_text,
+    parcel.Parcel.__table__.c.duration_text,
+    parcel.Parcel.__table__.c.route_polyline,
+    parcel.Parcel.__table__.c.route_coordinates,
+    # Proximity search
+    parcel.Parcel.__table__.c.pickup_geohash,
+    parcel.Parcel.__table__.c.destination_geohash,
+    # Fallback-priced quotes
+    parcel.Parcel.__table__.c.quote_is_estimate,
+]
+
+# Indexes declared on tables that already existed, created after the columns they cover
+ADDED_INDEXES = [
+    # Keyset pagination
+    "ix_parcels_created_id",
+    "ix_parcels_user_created_id",
+    "ix_parcels_status_created_id",
+    # Proximity search
+    "ix_parcels_status_pickup_geohash",
+    "ix_parcels_status_destination_geohash",
+    # Fallback-priced quotes
+    "ix_parcels_quote_estimate",
+]
+
+
+def create_schema(engine: Engine):
+    """Create missing tables, add columns newer than the table and create missing indexes.
+
+    Idempotent, so it runs on every start; each step is skipped when the
+    database already has it.
+    """
+    Base.metadata.create_all(bind=engine)
+
+    with engine.begin() as connection:
+        inspector = inspect(connection)
+        existing = {}
+        for column in ADDED_COLUMNS:
+            table = column.table.name
+            if table not in existing:
+                existing[table] = {info["name"] for info in inspector.get_columns(table)}
+            if column.name in existing[table]:
+                continue
+            definition = CreateColumn(column).compile(dialect=connection.dialect)
+            logger.info(f"Adding column {table}.{column.name}")
+            connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {definition}"))
+
+        indexes = {index.name: index for table in Base.metadata.sorted_tables for index in table.indexes}
+        for name in ADDED_INDEXES:
+            indexes[name].create(connection, checkfirst=True)
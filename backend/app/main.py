@@ -1,17 +1,35 @@
-from fastapi import FastAPI
+import hmac
+from typing import Optional
+from fastapi import Depends, FastAPI, Header, HTTPException, status
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
-from app.database.database import engine, Base, SessionLocal
+from app.database.database import engine, SessionLocal
+from app.database.migrations import create_schema
 from app.models.user import User
 from app.routers import auth, parcels, admin
 from app.middleware.security import SecurityHeadersMiddleware, RateLimitMiddleware
+from app.middleware.rate_limit import RateLimitRule, MemoryRateLimitStore, SQLiteRateLimitStore
+from app.middleware.timing import (
+    ServerTimingMiddleware, SERVER_TIMING_ENABLED, MAPS_TIMED_METHODS, EMAIL_TIMED_METHODS,
+    instrument_engine, instrument_service
+)
+from app.middleware.metrics import MetricsMiddleware
+from app.services.maps import maps_service, async_maps_service
+from app.services.metrics import metrics, METRICS_ENABLED, METRICS_TOKEN
+from app.services.outbox import outbox_worker, EMAIL_OUTBOX_WORKER_ENABLED
+from app.services.email import email_service
+from app.services.auth import password_hasher
+from app.services.stats import ensure_counters
+from app.services.nearby import backfill_geohashes
+from app.services.events import event_broker
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+# Create database tables and bring existing ones up to date
+create_schema(engine)
 
 app = FastAPI(
     title="Deliveroo API",
@@ -24,12 +42,35 @@ app = FastAPI(
 
 # Add security middleware
 # app.add_middleware(SecurityHeadersMiddleware)
-# app.add_middleware(RateLimitMiddleware, calls=100, period=60)
 # app.add_middleware(
 #     TrustedHostMiddleware,
 #     allowed_hosts=["localhost", "127.0.0.1", "*.deliveroo.com"]
 # )
 
+# Rate limiting; set RATE_LIMIT_STORE_PATH to share counters between workers
+if os.getenv("RATE_LIMIT_ENABLED", "false").lower() == "true":
+    rate_limit_calls = int(os.getenv("RATE_LIMIT_CALLS", 100))
+    rate_limit_period = int(os.getenv("RATE_LIMIT_PERIOD", 60))
+    rate_limit_store_path = os.getenv("RATE_LIMIT_STORE_PATH")
+    app.add_middleware(
+        RateLimitMiddleware,
+        rules=[
+            # Every request, per client IP
+            RateLimitRule(calls=rate_limit_calls, period=rate_limit_period),
+            # Login and registration attempts
+            RateLimitRule(
+                calls=int(os.getenv("RATE_LIMIT_AUTH_CALLS", 10)), period=60,
+                path_prefix="/auth/", methods=frozenset({"POST"})
+            ),
+            # Parcel API, per authenticated user
+            RateLimitRule(
+                calls=rate_limit_calls, period=rate_limit_period,
+                path_prefix="/parcels", per="user"
+            ),
+        ],
+        store=SQLiteRateLimitStore(rate_limit_store_path) if rate_limit_store_path else MemoryRateLimitStore(),
+    )
+
 # Configure CORS with environment variable
 frontend_url = os.getenv("FRONTEND_URL", "http://localhost:3000")
 allowed_origins = [
@@ -50,8 +91,50 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
+# Per-request db/maps/email timings as a Server-Timing header and an access log
+# line; when disabled nothing is hooked in, so there is no overhead
+if SERVER_TIMING_ENABLED:
+    instrument_engine(engine)
+    instrument_service(maps_service, "maps", MAPS_TIMED_METHODS)
+    instrument_service(async_maps_service, "maps", MAPS_TIMED_METHODS)
+    instrument_service(email_service, "email", EMAIL_TIMED_METHODS)
+    app.add_middleware(ServerTimingMiddleware)
+
+# Prometheus metrics; added last so request latency covers every other middleware
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware, registry=metrics)
+
+    def collect_pool_metrics():
+        pool = engine.pool
+        if not hasattr(pool, "checkedout"):
+            return []  # pools without a fixed size (SQLite in-memory, NullPool)
+        return [
+            ("db_pool_size", {}, pool.size()),
+            ("db_pool_checked_out", {}, pool.checkedout()),
+            ("db_pool_overflow", {}, max(pool.overflow(), 0)),
+        ]
+
+    def collect_maps_cache_metrics():
+        cache = maps_service.cache
+        return [
+            ("maps_cache_hits_total", {}, cache.hits),
+            ("maps_cache_misses_total", {}, cache.misses),
+        ]
+
+    def collect_maps_circuit_metrics():
+        breaker = maps_service.breaker
+        return [
+            ("maps_circuit_open", {}, int(breaker.state != breaker.CLOSED)),
+            ("maps_circuit_trips_total", {}, breaker.trips),
+        ]
+
+    metrics.add_collector(collect_pool_metrics)
+    metrics.add_collector(collect_maps_cache_metrics)
+    metrics.add_collector(collect_maps_circuit_metrics)
+
 # Include routers
 app.include_router(auth.router)
 app.include_router(parcels.router)
@@ -71,6 +154,59 @@ def ensure_admin_user_role():
     finally:
         db.close()
 
+@app.on_event("startup")
+def backfill_parcel_counters():
+    """Build the parcel summary counters for databases that predate them."""
+    db = SessionLocal()
+    try:
+        ensure_counters(db)
+    finally:
+        db.close()
+
+@app.on_event("startup")
+def backfill_parcel_geohashes():
+    """Index parcels stored before proximity search existed."""
+    db = SessionLocal()
+    try:
+        backfill_geohashes(db)
+    finally:
+        db.close()
+
+@app.on_event("startup")
+def start_outbox_worker():
+    """Start draining queued email notifications in the background."""
+    if EMAIL_OUTBOX_WORKER_ENABLED:
+        outbox_worker.start()
+
+@app.on_event("startup")
+def start_metrics_flush():
+    """Share this worker's metrics with the others through METRICS_DIR."""
+    if METRICS_ENABLED:
+        metrics.start()
+
+@app.on_event("shutdown")
+async def close_maps_client():
+    """Release pooled connections held by the async maps client."""
+    await async_maps_service.aclose()
+
+@app.on_event("shutdown")
+def stop_outbox_worker():
+    outbox_worker.stop()
+    email_service.close()
+
+@app.on_event("shutdown")
+def stop_password_hasher():
+    password_hasher.shutdown()
+
+@app.on_event("shutdown")
+def close_event_broker():
+    event_broker.close()
+
+@app.on_event("shutdown")
+def stop_metrics_flush():
+    if METRICS_ENABLED:
+        metrics.stop()
+
 @app.get("/")
 def read_root():
     return {
@@ -81,4 +217,20 @@ def read_root():
 
 @app.get("/health")
 def health_check():
-    return {"status": "healthy"}
\ No newline at end of file
+    return {"status": "healthy"}
+
+def require_metrics_token(authorization: Optional[str] = Header(None)):
+    """Check the scraper's bearer token when METRICS_TOKEN is set"""
+    if METRICS_TOKEN and not hmac.compare_digest(authorization or "", f"Bearer {METRICS_TOKEN}"):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid metrics token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+if METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False, dependencies=[Depends(require_metrics_token)])
+    def prometheus_metrics():
+        """Metrics of every worker in the Prometheus text exposition format."""
+        metrics.flush()
+        return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
\ No newline at end of file
@@ -0,0 +1,43 @@
+import time
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.services.metrics import MetricsRegistry
+
+
+class MetricsMiddleware:
+    """Record request latency per route template and status, and requests in flight.
+
+    Labels use the matched route's path template (``/parcels/{parcel_id}``)
+    rather than the raw path so the series stay bounded; requests that match
+    no route are labelled ``unmatched``.
+    """
+
+    def __init__(self, app: ASGIApp, registry: MetricsRegistry):
+        self.app = app
+        self.registry = registry
+        self.in_flight = 0
+        registry.add_collector(lambda: [("http_requests_in_flight", {}, self.in_flight)])
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+        self.in_flight += 1
+
+        async def send_with_status(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            self.in_flight -= 1
+            route = scope.get("route")
+            self.registry.observe(
+                "http_request_duration_seconds", time.perf_counter() - started,
+                method=scope["method"], route=getattr(route, "path", "unmatched"), status=status_code,
+            )
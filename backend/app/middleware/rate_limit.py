@@ -0,0 +1,133 @@
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import FrozenSet, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class RateLimitRule:
+    """Allow ``calls`` requests per ``period`` seconds.
+
+    Applies to requests whose path starts with ``path_prefix`` (and whose method
+    is in ``methods``, if given). ``per`` is ``"ip"`` or ``"user"``; user rules
+    fall back to the client IP for anonymous requests.
+    """
+    calls: int
+    period: float
+    path_prefix: str = "/"
+    methods: Optional[FrozenSet[str]] = None
+    per: str = "ip"
+
+    def matches(self, method: str, path: str) -> bool:
+        return path.startswith(self.path_prefix) and (self.methods is None or method in self.methods)
+
+
+def sliding_window(window_start: float, current: int, previous: int,
+                   limit: int, period: float, now: float) -> Tuple[bool, float, float, int, int]:
+    """Approximate sliding-window counter over two fixed windows.
+
+    Returns ``(allowed, retry_after, window_start, current, previous)`` with the
+    counters already rolled forward and the hit applied when allowed.
+    """
+    elapsed_windows = int((now - window_start) // period)
+    if elapsed_windows >= 2:
+        window_start, current, previous = now - (now % period), 0, 0
+    elif elapsed_windows == 1:
+        window_start, current, previous = window_start + period, 0, current
+
+    weight = 1 - (now - window_start) / period
+    estimated = previous * weight + current
+    if estimated + 1 > limit:
+        # Time until the previous window's contribution has decayed enough
+        if previous and current < limit:
+            retry_after = (1 - (limit - current - 1) / previous) * period - (now - window_start)
+        else:
+            retry_after = window_start + period - now
+        return False, max(retry_after, 0.0), window_start, current, previous
+    return True, 0.0, window_start, current + 1, previous
+
+
+class RateLimitStore(ABC):
+    """Storage backend for rate limit counters"""
+
+    # Whether hit() does I/O; the middleware then calls it from the threadpool
+    blocking = False
+
+    @abstractmethod
+    def hit(self, key: str, limit: int, period: float, now: float) -> Tuple[bool, float]:
+        """Record a request for ``key``; returns ``(allowed, retry_after_seconds)``"""
+
+
+class MemoryRateLimitStore(RateLimitStore):
+    """Per-process counters; keeps at most ``max_keys`` keys, least recently used first out"""
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._counters: "OrderedDict[str, Tuple[float, int, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key: str, limit: int, period: float, now: float) -> Tuple[bool, float]:
+        with self._lock:
+            window_start, current, previous = self._counters.get(key, (now - (now % period), 0, 0))
+            allowed, retry_after, *counters = sliding_window(window_start, current, previous, limit, period, now)
+            self._counters[key] = tuple(counters)
+            self._counters.move_to_end(key)
+            if len(self._counters) > self.max_keys:
+                self._counters.popitem(last=False)
+            return allowed, retry_after
+
+
+class SQLiteRateLimitStore(RateLimitStore):
+    """Counters in a SQLite file, shared by every worker process on the host"""
+
+    PRUNE_EVERY = 1000
+    blocking = True
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._hits = 0
+        with self._connection() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limits ("
+                "key TEXT PRIMARY KEY, window_start REAL NOT NULL, "
+                "current INTEGER NOT NULL, previous INTEGER NOT NULL, period REAL NOT NULL)"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            self._local.db = db
+        return db
+
+    def hit(self, key: str, limit: int, period: float, now: float) -> Tuple[bool, float]:
+        db = self._connection()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            row = db.execute(
+                "SELECT window_start, current, previous FROM rate_limits WHERE key = ?", (key,)
+            ).fetchone()
+            window_start, current, previous = row or (now - (now % period), 0, 0)
+            allowed, retry_after, window_start, current, previous = sliding_window(
+                window_start, current, previous, limit, period, now
+            )
+            db.execute(
+                "INSERT OR REPLACE INTO rate_limits (key, window_start, current, previous, period) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, window_start, current, previous, period)
+            )
+
+            # Lazily drop keys that have been idle for two full windows
+            self._hits += 1
+            if self._hits % self.PRUNE_EVERY == 0:
+                db.execute("DELETE FROM rate_limits WHERE window_start + 2 * period < ?", (now,))
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        return allowed, retry_after
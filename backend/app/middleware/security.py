@@ -1,5 +1,13 @@
 from fastapi import Request, Response
+from fastapi.concurrency import run_in_threadpool
 from starlette.middleware.base import BaseHTTPMiddleware
+from jose import JWTError, jwt
+from typing import Optional, Sequence
+from app.middleware.rate_limit import (
+    RateLimitRule, RateLimitStore, MemoryRateLimitStore
+)
+from app.services.auth import SECRET_KEY, ALGORITHM
+import math
 import time
 
 class SecurityHeadersMiddleware(BaseHTTPMiddleware):
@@ -25,36 +33,51 @@ class SecurityHeadersMiddleware(BaseHTTPMiddleware):
         return response
 
 class RateLimitMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app, calls: int = 100, period: int = 60):
+    """O(1) per-request rate limiting with pluggable counter storage.
+
+    Without explicit ``rules`` a single per-IP rule of ``calls`` per ``period``
+    applies to every request. Pass a SQLiteRateLimitStore to share counters
+    between uvicorn workers.
+    """
+
+    def __init__(self, app, calls: int = 100, period: int = 60,
+                 rules: Optional[Sequence[RateLimitRule]] = None,
+                 store: Optional[RateLimitStore] = None):
         super().__init__(app)
-        self.calls = calls
-        self.period = period
-        self.clients = {}
+        self.rules = list(rules) if rules else [RateLimitRule(calls=calls, period=period)]
+        self.store = store or MemoryRateLimitStore()
+    
+    def identify(self, request: Request, rule: RateLimitRule) -> str:
+        client_ip = request.client.host if request.client else "unknown"
+        if rule.per == "user":
+            authorization = request.headers.get("authorization", "")
+            if authorization.lower().startswith("bearer "):
+                try:
+                    payload = jwt.decode(authorization[7:], SECRET_KEY, algorithms=[ALGORITHM])
+                    if payload.get("sub"):
+                        return f"user:{payload['sub']}"
+                except JWTError:
+                    pass
+        return f"ip:{client_ip}"
     
     async def dispatch(self, request: Request, call_next):
-        client_ip = request.client.host
-        current_time = time.time()
-        
-        # Clean old entries
-        self.clients = {
-            ip: times for ip, times in self.clients.items()
-            if any(t > current_time - self.period for t in times)
-        }
+        now = time.time()
+        method, path = request.method, request.url.path
         
-        # Check rate limit
-        if client_ip in self.clients:
-            self.clients[client_ip] = [
-                t for t in self.clients[client_ip] 
-                if t > current_time - self.period
-            ]
-            if len(self.clients[client_ip]) >= self.calls:
+        for index, rule in enumerate(self.rules):
+            if not rule.matches(method, path):
+                continue
+            key = f"{index}:{self.identify(request, rule)}"
+            if self.store.blocking:
+                # A shared store can wait on a lock held by another worker
+                allowed, retry_after = await run_in_threadpool(self.store.hit, key, rule.calls, rule.period, now)
+            else:
+                allowed, retry_after = self.store.hit(key, rule.calls, rule.period, now)
+            if not allowed:
                 return Response(
                     content="Rate limit exceeded",
                     status_code=429,
-                    headers={"Retry-After": str(self.period)}
+                    headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
                 )
-        else:
-            self.clients[client_ip] = []
         
-        self.clients[client_ip].append(current_time)
-        return await call_next(request)
\ No newline at end of file
+        return await call_next(request)
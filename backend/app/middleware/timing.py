@@ -0,0 +1,179 @@
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import os
+import time
+from typing import Dict, Iterable, Optional, Tuple
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger("app.access")
+
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "false").lower() == "true"
+
+MAPS_TIMED_METHODS = (
+    "calculate_distance_matrix", "calculate_distance_matrix_batch", "get_route_polyline", "get_route",
+    "estimate_distance", "estimate_distances", "distance_matrix",
+)
+EMAIL_TIMED_METHODS = ("send_notification", "send_batch", "send_status_update", "send_location_update")
+# Components reported even when a request did not touch them
+REPORTED_COMPONENTS = ("db", "maps", "email")
+
+
+class RequestTimings:
+    """Seconds spent and calls made per component during one request"""
+    __slots__ = ("durations", "counts")
+
+    def __init__(self):
+        self.durations: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+
+    def add(self, component: str, seconds: float):
+        self.durations[component] = self.durations.get(component, 0.0) + seconds
+        self.counts[component] = self.counts.get(component, 0) + 1
+
+    def server_timing(self, total_seconds: float) -> str:
+        parts = [
+            f'{component};dur={self.durations[component] * 1000:.1f};desc="{self.counts[component]} calls"'
+            for component in self.durations
+        ]
+        parts.append(f"total;dur={total_seconds * 1000:.1f}")
+        return ", ".join(parts)
+
+
+_request_timings: contextvars.ContextVar[Optional[RequestTimings]] = \
+    contextvars.ContextVar("request_timings", default=None)
+# Components already being timed in this context, so nested service calls count once
+_open_components: contextvars.ContextVar[Tuple[str, ...]] = contextvars.ContextVar("open_components", default=())
+
+
+def current_timings() -> Optional[RequestTimings]:
+    return _request_timings.get()
+
+
+def timed(component: str, func):
+    """Wrap a sync or async callable so its time is charged to ``component``"""
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            timings = _request_timings.get()
+            if timings is None or component in _open_components.get():
+                return await func(*args, **kwargs)
+            token = _open_components.set(_open_components.get() + (component,))
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                timings.add(component, time.perf_counter() - started)
+                _open_components.reset(token)
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        timings = _request_timings.get()
+        if timings is None or component in _open_components.get():
+            return func(*args, **kwargs)
+        token = _open_components.set(_open_components.get() + (component,))
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            timings.add(component, time.perf_counter() - started)
+            _open_components.reset(token)
+    return wrapper
+
+
+def instrument_service(service, component: str, methods: Iterable[str]):
+    """Time the given methods of one service instance"""
+    for name in methods:
+        method = getattr(service, name, None)
+        if method is not None:
+            setattr(service, name, timed(component, method))
+
+
+def instrument_engine(engine: Engine):
+    """Charge every statement run on ``engine`` to the current request's db time"""
+
+    # The start time lives on the statement's execution context, so a
+    # statement that fails leaves nothing behind on the connection
+
+    def charge(context):
+        timings = _request_timings.get()
+        started = getattr(context, "query_started", None)
+        if timings is not None and started is not None:
+            context.query_started = None
+            timings.add("db", time.perf_counter() - started)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+        if _request_timings.get() is not None:
+            context.query_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def stop_query_timer(conn, cursor, statement, parameters, context, executemany):
+        charge(context)
+
+    @event.listens_for(engine, "handle_error")
+    def stop_failed_query_timer(exception_context):
+        # Time spent on a statement that raised still counts
+        if exception_context.execution_context is not None:
+            charge(exception_context.execution_context)
+
+
+class ServerTimingMiddleware:
+    """Collect per-request db/maps/email timings into a Server-Timing header and access log.
+
+    A plain ASGI middleware rather than BaseHTTPMiddleware: it only touches the
+    response start message, so streaming responses pass through untouched.
+    The header covers the time until the response starts; the access log line
+    is written when the response has finished.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = _request_timings.set(timings)
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_timing(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", timings.server_timing(time.perf_counter() - started))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_timings.reset(token)
+            logger.info(access_log_line(scope, status_code, time.perf_counter() - started, timings))
+
+
+def access_log_line(scope: Scope, status_code: int, seconds: float, timings: RequestTimings) -> str:
+    route = scope.get("route")
+    entry = {
+        "method": scope["method"],
+        "path": scope["path"],
+        "route": getattr(route, "path", None),
+        "status": status_code,
+        "duration_ms": round(seconds * 1000, 1),
+    }
+    for component in REPORTED_COMPONENTS:
+        entry[f"{component}_ms"] = round(timings.durations.get(component, 0.0) * 1000, 1)
+        entry[f"{component}_calls"] = timings.counts.get(component, 0)
+    return json.dumps(entry)
@@ -0,0 +1,40 @@
+from sqlalchemy import Column, Integer, String, DateTime, Enum, Index
+from sqlalchemy.sql import func
+from app.database.database import Base
+import enum
+
+
+class OutboxStatus(enum.Enum):
+    pending = "pending"
+    sent = "sent"
+    skipped = "skipped"
+    failed = "failed"
+
+class NotificationKind(enum.Enum):
+    status = "status"
+    location = "location"
+
+
+class EmailOutbox(Base):
+    __tablename__ = "email_outbox"
+    __table_args__ = (
+        Index("ix_email_outbox_status_next_attempt", "status", "next_attempt_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    to_email = Column(String, nullable=False)
+    parcel_id = Column(Integer, nullable=False)
+
+    # What changed; the message is rendered when it is sent
+    kind = Column(Enum(NotificationKind), nullable=False)
+    value = Column(String, nullable=False)
+
+    # Delivery state
+    status = Column(Enum(OutboxStatus), default=OutboxStatus.pending, nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    next_attempt_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    last_error = Column(String, nullable=True)
+
+    # Timestamps
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    sent_at = Column(DateTime(timezone=True), nullable=True)
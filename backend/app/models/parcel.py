@@ -1,6 +1,8 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Float, ForeignKey, Enum
-from sqlalchemy.sql import func
+from datetime import datetime, timezone
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Float, ForeignKey, Enum, Text, Index, event, text
+from sqlalchemy.sql import func, false
 from app.database.database import Base
+from app.services.geohash import encode as geohash_encode
 import enum
 
 
@@ -18,6 +20,20 @@ class WeightCategory(enum.Enum):
 
 class Parcel(Base):
     __tablename__ = "parcels"
+    __table_args__ = (
+        # Keyset pagination on (created_at, id), optionally scoped by owner or status
+        Index("ix_parcels_created_id", "created_at", "id"),
+        Index("ix_parcels_user_created_id", "user_id", "created_at", "id"),
+        Index("ix_parcels_status_created_id", "status", "created_at", "id"),
+        # Proximity queries scan geohash prefix ranges within each status; the
+        # coordinates are included so candidates are filtered from the index alone
+        Index("ix_parcels_status_pickup_geohash", "status", "pickup_geohash", "pickup_lat", "pickup_lng"),
+        Index("ix_parcels_status_destination_geohash", "status", "destination_geohash",
+              "destination_lat", "destination_lng"),
+        # Only the few parcels priced from a fallback estimate, for re-quoting
+        Index("ix_parcels_quote_estimate", "id",
+              postgresql_where=text("quote_is_estimate"), sqlite_where=text("quote_is_estimate")),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -32,10 +48,15 @@ class Parcel(Base):
     pickup_lng = Column(Float, nullable=False)
     destination_lat = Column(Float, nullable=False)
     destination_lng = Column(Float, nullable=False)
+    # Kept in step with the coordinates by update_geohashes below
+    pickup_geohash = Column(String(9), nullable=True)
+    destination_geohash = Column(String(9), nullable=True)
 
     # Parcel details
     weight_category = Column(Enum(WeightCategory), nullable=False)
     quote_amount = Column(Float, nullable=False)
+    # Priced from the local estimate because Google was unavailable; re-quoted later
+    quote_is_estimate = Column(Boolean, default=False, server_default=false(), nullable=False)
     status = Column(Enum(ParcelStatus), default=ParcelStatus.pending, nullable=False)
     present_location = Column(String, nullable=True)
 
@@ -43,6 +64,27 @@ class Parcel(Base):
     distance_km = Column(Float, nullable=True)
     duration_mins = Column(Integer, nullable=True)
 
+    # Stored route, refreshed only when the coordinates change
+    distance_text = Column(String, nullable=True)
+    duration_text = Column(String, nullable=True)
+    route_polyline = Column(Text, nullable=True)
+    route_coordinates = Column(String, nullable=True)  # "lat,lng;lat,lng" the route was computed for
+
     # Timestamps
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
\ No newline at end of file
+    # Set in Python as well so SQLite keeps microseconds and cursors compare exactly
+    created_at = Column(DateTime(timezone=True), server_default=func.now(),
+                        default=lambda: datetime.now(timezone.utc))
+    # Microsecond updated_at keeps ETags distinct for updates within the same second
+    updated_at = Column(DateTime(timezone=True), onupdate=lambda: datetime.now(timezone.utc))
+
+    def current_route_coordinates(self) -> str:
+        return f"{self.pickup_lat},{self.pickup_lng};{self.destination_lat},{self.destination_lng}"
+
+
+@event.listens_for(Parcel, "before_insert")
+@event.listens_for(Parcel, "before_update")
+def update_geohashes(mapper, connection, parcel: Parcel):
+    if parcel.pickup_lat is not None and parcel.pickup_lng is not None:
+        parcel.pickup_geohash = geohash_encode(parcel.pickup_lat, parcel.pickup_lng)
+    if parcel.destination_lat is not None and parcel.destination_lng is not None:
+        parcel.destination_geohash = geohash_encode(parcel.destination_lat, parcel.destination_lng)
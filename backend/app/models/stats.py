@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, String, Float
+from app.database.database import Base
+
+
+class ParcelCounter(Base):
+    """Parcel count and quoted revenue per owner, status and weight category.
+
+    Kept in step with the parcels table in the same transaction as every
+    change (see app.services.stats), so summaries never scan parcels.
+    """
+    __tablename__ = "parcel_counters"
+
+    user_id = Column(Integer, primary_key=True)
+    status = Column(String, primary_key=True)
+    weight_category = Column(String, primary_key=True)
+    parcel_count = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0.0)
@@ -2,8 +2,9 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from app.database.database import get_db
 from app.models.user import User
-from app.models.parcel import Parcel
 from app.services.auth import get_current_admin
+from app.services.maps import maps_service
+from app.services.stats import database_stats
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
@@ -16,13 +17,9 @@ def get_all_users(db: Session = Depends(get_db), current_admin = Depends(get_cur
 @router.get("/database-stats")
 def get_database_stats(db: Session = Depends(get_db), current_admin = Depends(get_current_admin)):
     """Get database statistics (admin only)"""
-    user_count = db.query(User).count()
-    parcel_count = db.query(Parcel).count()
-    
-    return {
-        "total_users": user_count,
-        "total_parcels": parcel_count,
-        "admin_users": db.query(User).filter(User.is_admin == True).count(),
-        "pending_parcels": db.query(Parcel).filter(Parcel.status == "pending").count(),
-        "delivered_parcels": db.query(Parcel).filter(Parcel.status == "delivered").count(),
-    }
\ No newline at end of file
+    return database_stats(db)
+
+@router.get("/maps-cache")
+def get_maps_cache_stats(current_admin = Depends(get_current_admin)):
+    """Get distance cache hit/miss counters (admin only)"""
+    return maps_service.cache.stats()
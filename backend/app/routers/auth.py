@@ -1,61 +1,91 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from datetime import timedelta
-from app.database.database import get_db
+from app.database.database import get_db, release_connection
 from app.models.user import User
 from app.schemas.user import UserCreate, UserResponse, Token
 from app.services.auth import (
-    get_password_hash, verify_password, create_access_token,
+    password_hasher, create_access_token,
     ACCESS_TOKEN_EXPIRE_MINUTES
 )
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
 
+# These handlers are async so they can await the password hashing pool;
+# their Session work goes through run_in_threadpool, off the event loop.
+
+def email_registered_error() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Email already registered"
+    )
+
 @router.post("/register", response_model=UserResponse)
-def register(user: UserCreate, db: Session = Depends(get_db)):
-    # Check if user already exists
-    db_user = db.query(User).filter(User.email == user.email).first()
-    if db_user:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email already registered"
+async def register(user: UserCreate, db: Session = Depends(get_db)):
+    def check_email_free():
+        # Check if user already exists
+        registered = db.query(User.id).filter(User.email == user.email).first()
+        release_connection(db)
+        if registered:
+            raise email_registered_error()
+
+    def save_user(hashed_password: str) -> User:
+        db_user = User(
+            email=user.email,
+            full_name=user.full_name,
+            hashed_password=hashed_password
         )
-    
+        db.add(db_user)
+        try:
+            db.commit()
+        except IntegrityError:
+            # Registered by a concurrent request while the password was hashed
+            db.rollback()
+            raise email_registered_error()
+        db.refresh(db_user)
+        return db_user
+
+    await run_in_threadpool(check_email_free)
+
     # Create new user
-    hashed_password = get_password_hash(user.password)
-    db_user = User(
-        email=user.email,
-        full_name=user.full_name,
-        hashed_password=hashed_password
-    )
-    
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
-    return db_user
+    hashed_password = await password_hasher.hash(user.password)
+    return await run_in_threadpool(save_user, hashed_password)
 
 @router.post("/login", response_model=Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == form_data.username).first()
-    
-    if not user or not verify_password(form_data.password, user.hashed_password):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+    def load_user():
+        user = db.query(User).filter(User.email == form_data.username).first()
+        user_data = user and {
+            "email": user.email,
+            "is_admin": user.is_admin,
+            "is_active": user.is_active,
+            "hashed_password": user.hashed_password,
+        }
+        release_connection(db)
+        return user_data
+
+    user_data = await run_in_threadpool(load_user)
+
+    if not user_data or not await password_hasher.verify(form_data.password, user_data["hashed_password"]):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    
-    if not user.is_active:
+
+    if not user_data["is_active"]:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Inactive user"
         )
-    
+
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.email, "is_admin": user.is_admin},
+        data={"sub": user_data["email"], "is_admin": user_data["is_admin"]},
         expires_delta=access_token_expires
     )
-    
+
     return {"access_token": access_token, "token_type": "bearer"}
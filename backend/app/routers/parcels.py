@@ -1,29 +1,102 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import csv
+import io
+import json
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from sqlalchemy import select, update
 from sqlalchemy.orm import Session
-from typing import List
-from app.database.database import get_db
+from typing import List, Optional
+from app.database.database import get_db, release_connection
 from app.models.parcel import Parcel
 from app.models.user import User
 from app.schemas.parcel import (
-    ParcelCreate, ParcelResponse, ParcelUpdate, MapRoute
+    ParcelCreate, ParcelResponse, ParcelUpdate, MapRoute,
+    QuoteBatchRequest, QuoteResponse, ParcelBulkUpdate, ParcelBulkUpdateResponse, ParcelStatus,
+    RoutePlanRequest, RoutePlanResponse, RequoteResponse
 )
-from app.services.auth import get_current_user, get_current_admin
-from app.services.maps import maps_service
-from app.services.email import email_service
+from app.schemas.user import StreamTicket
+from app.services.auth import (
+    Principal, get_current_user, get_current_admin, get_stream_user,
+    create_stream_ticket, STREAM_TICKET_EXPIRE_SECONDS
+)
+from app.services.maps import maps_service, async_maps_service, calculate_quotes
+from app.models.outbox import NotificationKind
+from app.services.outbox import enqueue_status_update, enqueue_location_update, enqueue_bulk
+from app.services.parcel_query import (
+    Page, ParcelFilters, page_params, parcel_filters,
+    field_params, list_columns, rows_to_dicts, LAST_CHANGED
+)
+from app.services.http_cache import (
+    as_utc, cache_headers, is_not_modified, make_etag, not_modified_response
+)
+from app.services.nearby import find_nearby
+from app.services.route_planner import plan_routes, route_cost, WEIGHT_UNITS, ROUTE_PLAN_TIME_LIMIT_SECONDS
+from app.services.stats import user_summary, apply_counter_deltas, status_change_deltas
+from app.services.events import event_broker, parcel_event, format_sse, SSE_KEEPALIVE_SECONDS
 
 router = APIRouter(prefix="/parcels", tags=["parcels"])
 
+EXPORT_BATCH_SIZE = 1000
+BULK_UPDATE_MAX_PARCELS = 10000
+ROUTE_PLAN_MAX_STOPS = 1000
+REQUOTE_MAX_PARCELS = 500
+EXPORT_COLUMNS = [
+    Parcel.id, Parcel.user_id,
+    Parcel.pickup_address, Parcel.destination_address,
+    Parcel.pickup_lat, Parcel.pickup_lng, Parcel.destination_lat, Parcel.destination_lng,
+    Parcel.weight_category, Parcel.quote_amount, Parcel.quote_is_estimate, Parcel.status,
+    Parcel.present_location, Parcel.distance_km, Parcel.duration_mins,
+    Parcel.created_at, Parcel.updated_at,
+]
+
+
+def store_route(parcel: Parcel, distance_info: dict, polyline):
+    """Store the route served by GET /parcels/{id}/route on the parcel"""
+    parcel.distance_text = distance_info['distance']['text']
+    parcel.duration_text = distance_info['duration']['text']
+    parcel.route_polyline = polyline or ""
+
+    # A missing polyline from a configured provider is retried on the next route view
+    if polyline is not None or not async_maps_service.enabled:
+        parcel.route_coordinates = parcel.current_route_coordinates()
+    else:
+        parcel.route_coordinates = None
+
+
+def check_destination_editable(parcel: Parcel):
+    # Can't update if already delivered or cancelled
+    if parcel.status.value in ('delivered', 'cancelled'):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Cannot update parcel with status: {parcel.status.value}"
+        )
+
+
+def save_parcel(db: Session, parcel: Parcel) -> Parcel:
+    db.add(parcel)
+    db.commit()
+    db.refresh(parcel)
+    return parcel
+
+
+# Handlers that await the maps client are async; their Session work goes
+# through run_in_threadpool so a slow query never blocks the event loop.
+
 @router.post("/", response_model=ParcelResponse)
-def create_parcel(
+async def create_parcel(
     parcel: ParcelCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     # Calculate distance and duration
     origin = (parcel.pickup_lat, parcel.pickup_lng)
     destination = (parcel.destination_lat, parcel.destination_lng)
 
-    distance_info = maps_service.calculate_distance_matrix(origin, destination)
+    await run_in_threadpool(release_connection, db)
+    distance_info, polyline = await async_maps_service.get_route(origin, destination)
 
     if not distance_info:
         raise HTTPException(
@@ -35,7 +108,7 @@ def create_parcel(
     duration_mins = int(distance_info['duration']['value'] / 60)  # Convert to minutes as an integer
 
     # Calculate quote
-    quote_amount = maps_service.calculate_quote(parcel.weight_category, distance_km)
+    quote_amount = async_maps_service.calculate_quote(parcel.weight_category, distance_km)
 
     # Create parcel
     db_parcel = Parcel(
@@ -48,65 +121,214 @@ def create_parcel(
         destination_lng=parcel.destination_lng,
         weight_category=parcel.weight_category,
         quote_amount=quote_amount,
+        quote_is_estimate=bool(distance_info.get('estimate')),
         distance_km=distance_km,
         duration_mins=duration_mins
     )
+    store_route(db_parcel, distance_info, polyline)
+    return await run_in_threadpool(save_parcel, db, db_parcel)
 
-    db.add(db_parcel)
-    db.commit()
-    db.refresh(db_parcel)
-    return db_parcel
 
+@router.post("/quotes", response_model=List[QuoteResponse])
+def quote_parcels(
+    batch: QuoteBatchRequest,
+    current_user: Principal = Depends(get_current_user)
+):
+    """Price many candidate deliveries at once without creating parcels"""
+    pairs = [
+        ((item.pickup_lat, item.pickup_lng), (item.destination_lat, item.destination_lng))
+        for item in batch.items
+    ]
+    distance_infos = maps_service.calculate_distance_matrix_batch(pairs)
+    distances_km = [distance_info['distance']['value'] / 1000 for distance_info in distance_infos]
+    amounts = calculate_quotes([item.weight_category for item in batch.items], distances_km).tolist()
+
+    quotes = []
+    for item, distance_info, distance_km, amount in zip(batch.items, distance_infos, distances_km, amounts):
+        quotes.append({
+            **item.model_dump(),
+            "quote_amount": amount,
+            "quote_is_estimate": bool(distance_info.get('estimate')),
+            "distance_km": distance_km,
+            "duration_mins": int(distance_info['duration']['value'] / 60),
+        })
+
+    return quotes
+
+
+def parcel_list_response(
+    request: Request, db: Session, scope, conditions: list, page: Page, fields: List[str]
+) -> Response:
+    """Run a projected list query and encode the rows without building ORM objects.
+
+    The version is read from the page itself first: the ids and change times
+    of its rows, found through the same keyset index as the page, so a matching
+    If-None-Match or If-Modified-Since is answered with 304 without loading
+    the rows or scanning the rest of the filtered set.
+    """
+    versions = db.execute(page.apply(select(Parcel.id, LAST_CHANGED).where(*conditions))).all()
+    last_modified = max((as_utc(changed_at) for _, changed_at in versions), default=None)
+    etag = make_etag("parcels", scope, [tuple(version) for version in versions], request.url.query)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified_response(etag, last_modified)
+
+    rows = db.execute(page.apply(select(*list_columns(fields)).where(*conditions))).all()
+    headers = cache_headers(etag, last_modified)
+    next_cursor = page.next_cursor(rows)
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    return ORJSONResponse(rows_to_dicts(rows, fields), headers=headers)
 
 @router.get("/")
 def get_user_parcels(
+    request: Request,
+    filters: ParcelFilters = Depends(parcel_filters),
+    page: Page = Depends(page_params),
+    fields: List[str] = Depends(field_params),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
-    parcels = db.query(Parcel).filter(Parcel.user_id == current_user.id).all()
+    """List the user's parcels, newest first; the next page cursor is in X-Next-Cursor"""
+    conditions = [Parcel.user_id == current_user.id, *filters.conditions()]
+    return parcel_list_response(request, db, current_user.id, conditions, page, fields)
 
-    # Converted to dict format to handle serialization
-    result = []
-    for parcel in parcels:
-        result.append({
-            "id": parcel.id,
-            "user_id": parcel.user_id,
-            "pickup_address": parcel.pickup_address,
-            "destination_address": parcel.destination_address,
-            "pickup_lat": parcel.pickup_lat,
-            "pickup_lng": parcel.pickup_lng,
-            "destination_lat": parcel.destination_lat,
-            "destination_lng": parcel.destination_lng,
-            "weight_category": parcel.weight_category.value if hasattr(parcel.weight_category, 'value') else str(parcel.weight_category),
-            "quote_amount": parcel.quote_amount,
-            "status": parcel.status.value if hasattr(parcel.status, 'value') else str(parcel.status),
-            "present_location": parcel.present_location,
-            "distance_km": parcel.distance_km,
-            "duration_mins": parcel.duration_mins,
-            "created_at": parcel.created_at.isoformat() if parcel.created_at else None,
-            "updated_at": parcel.updated_at.isoformat() if parcel.updated_at else None
-        })
-    
-    return result
+@router.post("/stream/ticket", response_model=StreamTicket)
+def get_stream_ticket(current_user: Principal = Depends(get_current_user)):
+    """Short-lived ticket for GET /parcels/stream?ticket=..., so the access token stays out of URLs"""
+    return {"ticket": create_stream_ticket(current_user.email), "expires_in": STREAM_TICKET_EXPIRE_SECONDS}
+
+@router.get("/stream")
+async def stream_parcel_events(
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_stream_user)
+):
+    """Server-sent events for status, location and destination changes to the user's parcels"""
+    # The stream stays open indefinitely; it must not pin a pooled connection
+    await run_in_threadpool(release_connection, db)
+    subscription = event_broker.subscribe(current_user.id)
+
+    async def generate():
+        try:
+            yield "retry: 5000\n\n"
+            while not await request.is_disconnected():
+                event = await subscription.get(SSE_KEEPALIVE_SECONDS)
+                yield format_sse(event) if event else ": keepalive\n\n"
+        finally:
+            event_broker.unsubscribe(subscription)
+
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/summary")
+def get_parcel_summary(
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """Get parcel counts and quoted revenue for the current user"""
+    return user_summary(db, current_user.id)
 
 # Simplifying the admin endpoint to return basic parcel info only
 @router.get("/all")
 def get_all_parcels(
+    request: Request,
+    filters: ParcelFilters = Depends(parcel_filters),
+    page: Page = Depends(page_params),
+    fields: List[str] = Depends(field_params),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_admin)
+):
+    """Admin endpoint to get all parcels, paginated like GET /parcels/"""
+    return parcel_list_response(request, db, "all", filters.conditions(), page, fields)
+
+
+def export_value(value):
+    if hasattr(value, 'value'):
+        return value.value
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+@router.get("/nearby")
+def get_nearby_parcels(
+    lat: float = Query(..., ge=-90, le=90),
+    lng: float = Query(..., ge=-180, le=180),
+    radius_m: float = Query(3000, gt=0, le=50000),
+    point: str = Query("pickup", pattern="^(pickup|destination)$"),
+    status_filter: Optional[ParcelStatus] = Query(None, alias="status"),
+    limit: int = Query(50, ge=1, le=500),
+    fields: List[str] = Depends(field_params),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_admin)
+):
+    """Admin endpoint for parcels whose pickup/destination is within radius_m, nearest first"""
+    statuses = [status_filter.value] if status_filter else None
+    return ORJSONResponse(find_nearby(db, lat, lng, radius_m, fields, point, statuses, limit))
+
+
+@router.get("/export")
+def export_parcels(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    filters: ParcelFilters = Depends(parcel_filters),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin)
+    current_user: Principal = Depends(get_current_admin)
 ):
-    """Admin endpoint to get all parcels"""
-    parcels = db.query(Parcel).all()
-    return parcels
+    """Admin endpoint to stream all parcels as NDJSON or CSV"""
+    names = [column.key for column in EXPORT_COLUMNS]
+    statement = (
+        select(*EXPORT_COLUMNS)
+        .where(*filters.conditions())
+        .order_by(Parcel.id)
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+
+    def generate():
+        # Rows are fetched through a server-side cursor one batch at a time,
+        # so memory use does not depend on the size of the export
+        try:
+            if format == "csv":
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                writer.writerow(names)
+                yield buffer.getvalue()
+
+            for batch in db.execute(statement).partitions():
+                if format == "csv":
+                    buffer = io.StringIO()
+                    writer = csv.writer(buffer)
+                    writer.writerows([export_value(value) for value in row] for row in batch)
+                    yield buffer.getvalue()
+                else:
+                    yield "".join(
+                        json.dumps(dict(zip(names, map(export_value, row)))) + "\n" for row in batch
+                    )
+        finally:
+            db.close()
+
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        generate(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="parcels.{format}"'}
+    )
 
 
 @router.get("/{parcel_id}", response_model=ParcelResponse)
 def get_parcel(
     parcel_id: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
-    parcel = db.query(Parcel).filter(Parcel.id == parcel_id).first()
+    """Get a parcel; revalidation with If-None-Match/If-Modified-Since is answered from a version query"""
+    parcel = db.execute(
+        select(Parcel.id, Parcel.user_id, LAST_CHANGED.label("changed_at")).where(Parcel.id == parcel_id)
+    ).first()
     
     if not parcel:
         raise HTTPException(
@@ -120,68 +342,90 @@ def get_parcel(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not authorized to view this parcel"
         )
-    
+
+    last_modified = as_utc(parcel.changed_at)
+    etag = make_etag("parcel", parcel.id, last_modified)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified_response(etag, last_modified)
+
+    parcel = db.query(Parcel).filter(Parcel.id == parcel_id).first()
+    last_modified = as_utc(parcel.updated_at or parcel.created_at)
+    response.headers.update(cache_headers(make_etag("parcel", parcel.id, last_modified), last_modified))
     return parcel
 
 @router.put("/{parcel_id}/destination", response_model=ParcelResponse)
-def update_parcel_destination(
+async def update_parcel_destination(
     parcel_id: int,
     update_data: ParcelUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
-    parcel = db.query(Parcel).filter(Parcel.id == parcel_id).first()
-    
-    if not parcel:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Parcel not found"
-        )
-    
-    # Only parcel owner can update destination
-    if parcel.user_id != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized to update this parcel"
-        )
-    
-    # Can't update if already delivered or cancelled
-    if parcel.status in ['delivered', 'cancelled']:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Cannot update parcel with status: {parcel.status}"
-        )
-    
-    # Update destination if provided
-    if update_data.destination_address:
-        parcel.destination_address = update_data.destination_address
-    
-    if update_data.destination_lat and update_data.destination_lng:
-        parcel.destination_lat = update_data.destination_lat
-        parcel.destination_lng = update_data.destination_lng
-        
+    def load_parcel() -> Parcel:
+        parcel = db.query(Parcel).filter(Parcel.id == parcel_id).first()
+
+        if not parcel:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Parcel not found"
+            )
+
+        # Only parcel owner can update destination
+        if parcel.user_id != current_user.id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Not authorized to update this parcel"
+            )
+
+        check_destination_editable(parcel)
+        return parcel
+
+    parcel = await run_in_threadpool(load_parcel)
+
+    new_coordinates = bool(update_data.destination_lat and update_data.destination_lng)
+    distance_info = polyline = None
+    if new_coordinates:
         # Recalculate distance and quote
         origin = (parcel.pickup_lat, parcel.pickup_lng)
-        destination = (parcel.destination_lat, parcel.destination_lng)
-        
-        distance_info = maps_service.calculate_distance_matrix(origin, destination)
-        if distance_info:
-            parcel.distance_km = distance_info['distance']['value'] / 1000
-            parcel.duration_mins = int(distance_info['duration']['value'] / 60)  # Convert to integer
-            parcel.quote_amount = maps_service.calculate_quote(
-                parcel.weight_category, parcel.distance_km
-            )
-    
-    db.commit()
-    db.refresh(parcel)
-    return parcel
+        destination = (update_data.destination_lat, update_data.destination_lng)
+
+        await run_in_threadpool(release_connection, db)
+        distance_info, polyline = await async_maps_service.get_route(origin, destination)
+
+    def apply_update() -> Parcel:
+        # The parcel may have been delivered or cancelled while the route was priced
+        db.refresh(parcel, with_for_update=True)
+        check_destination_editable(parcel)
+
+        # Update destination if provided
+        if update_data.destination_address:
+            parcel.destination_address = update_data.destination_address
+
+        if new_coordinates:
+            parcel.destination_lat = update_data.destination_lat
+            parcel.destination_lng = update_data.destination_lng
+
+            if distance_info:
+                parcel.distance_km = distance_info['distance']['value'] / 1000
+                parcel.duration_mins = int(distance_info['duration']['value'] / 60)  # Convert to integer
+                parcel.quote_amount = async_maps_service.calculate_quote(
+                    parcel.weight_category.value, parcel.distance_km
+                )
+                parcel.quote_is_estimate = bool(distance_info.get('estimate'))
+                store_route(parcel, distance_info, polyline)
+
+        db.commit()
+        db.refresh(parcel)
+        event_broker.publish(parcel.user_id, parcel_event(parcel, "destination"))
+        return parcel
+
+    return await run_in_threadpool(apply_update)
 
 
 @router.put("/{parcel_id}/cancel", response_model=ParcelResponse)
 def cancel_parcel(
     parcel_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     parcel = db.query(Parcel).filter(Parcel.id == parcel_id).first()
     
@@ -208,6 +452,7 @@ def cancel_parcel(
     parcel.status = 'cancelled'
     db.commit()
     db.refresh(parcel)
+    event_broker.publish(parcel.user_id, parcel_event(parcel, "status"))
     return parcel
 
 @router.put("/{parcel_id}/admin", response_model=ParcelResponse)
@@ -215,7 +460,7 @@ def admin_update_parcel(
     parcel_id: int,
     update_data: ParcelUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin)
+    current_user: Principal = Depends(get_current_admin)
 ):
     parcel = db.query(Parcel).filter(Parcel.id == parcel_id).first()
     
@@ -226,7 +471,7 @@ def admin_update_parcel(
         )
     
     # Store old values for email notifications
-    old_status = parcel.status
+    old_status = parcel.status.value if hasattr(parcel.status, 'value') else parcel.status
     old_location = parcel.present_location
     
     # Update status if provided
@@ -237,57 +482,313 @@ def admin_update_parcel(
     if update_data.present_location:
         parcel.present_location = update_data.present_location
     
-    db.commit()
-    db.refresh(parcel)
-    
-    # Send email notifications if values changed
+    # Queue email notifications in the same transaction; the outbox worker sends them
     user = db.query(User).filter(User.id == parcel.user_id).first()
     
-    if update_data.status and update_data.status != old_status:
-        email_service.send_status_update(user.email, parcel.id, update_data.status)
+    if update_data.status and update_data.status.value != old_status:
+        enqueue_status_update(db, user.email, parcel.id, update_data.status.value)
     
     if (update_data.present_location and 
         update_data.present_location != old_location):
-        email_service.send_location_update(user.email, parcel.id, update_data.present_location)
+        enqueue_location_update(db, user.email, parcel.id, update_data.present_location)
     
+    db.commit()
+    db.refresh(parcel)
+    event_broker.publish(parcel.user_id, parcel_event(parcel, "status" if update_data.status else "location"))
     return parcel
 
 
-@router.get("/{parcel_id}/route", response_model=MapRoute)
-def get_parcel_route(
-    parcel_id: int,
+@router.put("/admin/bulk", response_model=ParcelBulkUpdateResponse)
+def admin_bulk_update_parcels(
+    update_data: ParcelBulkUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_admin)
 ):
-    parcel = db.query(Parcel).filter(Parcel.id == parcel_id).first()
-    
-    if not parcel:
+    """Admin endpoint to set status/location on many parcels in one transaction"""
+    if (update_data.parcel_ids is None) == (update_data.filter is None):
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Parcel not found"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Provide either parcel_ids or filter"
         )
-    
-    # Users can only see their own routes unless they're admin
-    if parcel.user_id != current_user.id and not current_user.is_admin:
+    if not update_data.status and not update_data.present_location:
         raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized to view this route"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Provide a status or present_location to set"
         )
-    
+
+    if update_data.parcel_ids is not None:
+        conditions = [Parcel.id.in_(update_data.parcel_ids)]
+    else:
+        selected = update_data.filter
+        conditions = ParcelFilters(
+            selected.status, selected.weight_category, selected.created_from, selected.created_to
+        ).conditions()
+
+    # Current values and owners in one join; PostgreSQL locks the rows until commit
+    rows = db.execute(
+        select(
+            Parcel.id, Parcel.user_id, Parcel.status, Parcel.weight_category, Parcel.quote_amount,
+            Parcel.present_location, Parcel.destination_address,
+            Parcel.destination_lat, Parcel.destination_lng, User.email
+        )
+        .join(User, User.id == Parcel.user_id)
+        .where(*conditions)
+        .order_by(Parcel.id)
+        .limit(BULK_UPDATE_MAX_PARCELS + 1)
+        .with_for_update(of=Parcel)
+    ).all()
+    if len(rows) > BULK_UPDATE_MAX_PARCELS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {BULK_UPDATE_MAX_PARCELS} parcels can be updated at once"
+        )
+
+    new_status = update_data.status.value if update_data.status else None
+    new_location = update_data.present_location
+    values = {"updated_at": datetime.now(timezone.utc)}
+    if new_status:
+        values["status"] = new_status
+    if new_location:
+        values["present_location"] = new_location
+
+    parcel_ids = [row.id for row in rows]
+    if parcel_ids:
+        db.execute(
+            update(Parcel).where(Parcel.id.in_(parcel_ids)).values(**values),
+            execution_options={"synchronize_session": False}
+        )
+
+    # A bulk UPDATE bypasses the ORM flush, so counters and notifications are handled here
+    if new_status:
+        apply_counter_deltas(db.connection(), status_change_deltas(
+            [(row.user_id, row.status, row.weight_category, row.quote_amount) for row in rows], new_status
+        ))
+
+    notifications = []
+    for row in rows:
+        old_status = row.status.value if hasattr(row.status, 'value') else row.status
+        if new_status and new_status != old_status:
+            notifications.append((row.email, row.id, NotificationKind.status, new_status))
+        if new_location and new_location != row.present_location:
+            notifications.append((row.email, row.id, NotificationKind.location, new_location))
+    enqueue_bulk(db, notifications)
+
+    db.commit()
+
+    change = "status" if new_status else "location"
+    event_broker.publish_many(
+        (row.user_id, parcel_event(SimpleNamespace(**{
+            **row._mapping,
+            "status": new_status or row.status,
+            "present_location": new_location or row.present_location,
+            "updated_at": values["updated_at"],
+        }), change))
+        for row in rows
+    )
+
+    return {"updated": len(parcel_ids), "parcel_ids": parcel_ids}
+
+
+@router.post("/admin/route-plan", response_model=RoutePlanResponse)
+def admin_plan_routes(
+    plan_request: RoutePlanRequest,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_admin)
+):
+    """Admin endpoint to split parcels into capacity-limited courier runs from a depot"""
+    if (plan_request.parcel_ids is None) == (plan_request.filter is None):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Provide either parcel_ids or filter"
+        )
+
+    if plan_request.parcel_ids is not None:
+        conditions = [Parcel.id.in_(plan_request.parcel_ids)]
+    else:
+        selected = plan_request.filter
+        conditions = ParcelFilters(
+            selected.status, selected.weight_category, selected.created_from, selected.created_to
+        ).conditions()
+
+    pickup = plan_request.point == "pickup"
+    rows = db.execute(
+        select(
+            Parcel.id, Parcel.weight_category,
+            Parcel.pickup_address if pickup else Parcel.destination_address,
+            Parcel.pickup_lat if pickup else Parcel.destination_lat,
+            Parcel.pickup_lng if pickup else Parcel.destination_lng,
+        )
+        .where(*conditions)
+        .order_by(Parcel.id)
+        .limit(ROUTE_PLAN_MAX_STOPS + 1)
+    ).all()
+    if not rows:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No parcels to route"
+        )
+    if len(rows) > ROUTE_PLAN_MAX_STOPS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {ROUTE_PLAN_MAX_STOPS} parcels can be routed at once"
+        )
+
+    weights = [row.weight_category.value if hasattr(row.weight_category, 'value') else row.weight_category
+               for row in rows]
+    demands = [0] + [WEIGHT_UNITS[weight] for weight in weights]
+    if max(demands) > plan_request.vehicle_capacity:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"A {max(weights, key=WEIGHT_UNITS.get)} parcel needs {max(demands)} units of vehicle capacity"
+        )
+
+    # Planning takes seconds; don't hold a pooled connection meanwhile
+    release_connection(db)
+    points = [(plan_request.depot_lat, plan_request.depot_lng)] + [(row[3], row[4]) for row in rows]
+    distance_m, duration_s = maps_service.distance_matrix(points)
+    plan = plan_routes(
+        distance_m, demands, plan_request.vehicle_capacity,
+        plan_request.time_limit_seconds or ROUTE_PLAN_TIME_LIMIT_SECONDS
+    )
+
+    routes = []
+    for vehicle, route in enumerate(plan.routes, start=1):
+        previous_stops = [0] + route[:-1]
+        routes.append({
+            "vehicle": vehicle,
+            "load": sum(demands[stop] for stop in route),
+            "distance_m": round(route_cost(distance_m, route), 1),
+            "duration_s": round(route_cost(duration_s, route), 1),
+            "stops": [
+                {
+                    "parcel_id": rows[stop - 1].id,
+                    "address": rows[stop - 1][2],
+                    "lat": rows[stop - 1][3],
+                    "lng": rows[stop - 1][4],
+                    "weight_category": weights[stop - 1],
+                    "leg_distance_m": round(float(distance_m[previous, stop]), 1),
+                }
+                for previous, stop in zip(previous_stops, route)
+            ],
+        })
+
+    return {
+        "parcel_count": len(rows),
+        "vehicle_count": len(routes),
+        "total_distance_m": round(plan.distance, 1),
+        "total_duration_s": round(sum(route["duration_s"] for route in routes), 1),
+        "construction_distance_m": round(plan.construction_distance, 1),
+        "routes": routes,
+    }
+
+
+@router.post("/admin/requote", response_model=RequoteResponse)
+def admin_requote_parcels(
+    limit: int = Query(REQUOTE_MAX_PARCELS, ge=1, le=REQUOTE_MAX_PARCELS),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_admin)
+):
+    """Admin endpoint to re-price pending parcels quoted from the fallback estimate"""
+    if not maps_service.gmaps:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Google Maps is not configured"
+        )
+
+    rows = db.execute(
+        select(Parcel.id, Parcel.pickup_lat, Parcel.pickup_lng, Parcel.destination_lat, Parcel.destination_lng)
+        .where(Parcel.quote_is_estimate.is_(True), Parcel.status == ParcelStatus.pending.value)
+        .order_by(Parcel.id)
+        .limit(limit)
+    ).all()
+
+    release_connection(db)
+    distance_infos = maps_service.calculate_distance_matrix_batch(
+        [((row.pickup_lat, row.pickup_lng), (row.destination_lat, row.destination_lng)) for row in rows]
+    )
+    quoted = {row.id: (row, info) for row, info in zip(rows, distance_infos) if not info.get('estimate')}
+
+    # The owner may have moved or cancelled a parcel while Google was being asked;
+    # only rows still flagged, pending and at the coordinates that were priced are written
+    locked = db.query(Parcel).filter(
+        Parcel.id.in_(quoted),
+        Parcel.quote_is_estimate.is_(True),
+        Parcel.status == ParcelStatus.pending.value,
+    ).with_for_update().all() if quoted else []
+    parcels = [
+        parcel for parcel in locked
+        if (parcel.pickup_lat, parcel.pickup_lng, parcel.destination_lat, parcel.destination_lng)
+        == tuple(quoted[parcel.id][0][1:])
+    ]
+    for parcel in parcels:
+        distance_info = quoted[parcel.id][1]
+        parcel.distance_km = distance_info['distance']['value'] / 1000
+        parcel.duration_mins = int(distance_info['duration']['value'] / 60)
+        parcel.distance_text = distance_info['distance']['text']
+        parcel.duration_text = distance_info['duration']['text']
+        parcel.quote_amount = maps_service.calculate_quote(parcel.weight_category.value, parcel.distance_km)
+        parcel.quote_is_estimate = False
+    db.commit()
+
+    return {
+        "requoted": len(parcels),
+        "still_estimated": len(rows) - len(quoted),
+        "changed": len(quoted) - len(parcels),
+        "parcel_ids": sorted(parcel.id for parcel in parcels),
+    }
+
+
+@router.get("/{parcel_id}/route", response_model=MapRoute)
+async def get_parcel_route(
+    parcel_id: int,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    def load_parcel() -> Parcel:
+        parcel = db.query(Parcel).filter(Parcel.id == parcel_id).first()
+
+        if not parcel:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Parcel not found"
+            )
+
+        # Users can only see their own routes unless they're admin
+        if parcel.user_id != current_user.id and not current_user.is_admin:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Not authorized to view this route"
+            )
+        return parcel
+
+    def route_response(parcel: Parcel) -> dict:
+        return {
+            "distance": parcel.distance_text,
+            "duration": parcel.duration_text,
+            "polyline": parcel.route_polyline or ""
+        }
+
+    parcel = await run_in_threadpool(load_parcel)
+
+    # Parcels created before routes were stored are backfilled once
+    if parcel.route_coordinates == parcel.current_route_coordinates():
+        return route_response(parcel)
+
     origin = (parcel.pickup_lat, parcel.pickup_lng)
     destination = (parcel.destination_lat, parcel.destination_lng)
-    
-    distance_info = maps_service.calculate_distance_matrix(origin, destination)
-    polyline = maps_service.get_route_polyline(origin, destination)
-    
+
+    await run_in_threadpool(release_connection, db)
+    distance_info, polyline = await async_maps_service.get_route(origin, destination)
+
     if not distance_info:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Could not calculate route"
         )
-    
-    return {
-        "distance": distance_info['distance']['text'],
-        "duration": distance_info['duration']['text'],
-        "polyline": polyline or ""
-    }
\ No newline at end of file
+
+    def save_route() -> dict:
+        store_route(parcel, distance_info, polyline)
+        db.commit()
+        return route_response(parcel)
+
+    return await run_in_threadpool(save_route)
\ No newline at end of file
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field, model_validator
+from typing import List, Optional
 from datetime import datetime
 from enum import Enum
 
@@ -33,10 +33,69 @@ class ParcelUpdate(BaseModel):
     status: Optional[ParcelStatus] = None
     present_location: Optional[str] = None
 
+class ParcelBulkFilter(BaseModel):
+    status: Optional[ParcelStatus] = None
+    weight_category: Optional[WeightCategory] = None
+    created_from: Optional[datetime] = None
+    created_to: Optional[datetime] = None
+
+    @model_validator(mode="after")
+    def require_a_condition(self):
+        # An empty filter would select every parcel
+        if all(value is None for _, value in self):
+            raise ValueError("filter needs at least one of status, weight_category, created_from, created_to")
+        return self
+
+class ParcelBulkUpdate(BaseModel):
+    # Either explicit ids or a filter selects the parcels to update
+    parcel_ids: Optional[List[int]] = Field(None, min_length=1, max_length=10000)
+    filter: Optional[ParcelBulkFilter] = None
+    status: Optional[ParcelStatus] = None
+    present_location: Optional[str] = None
+
+class ParcelBulkUpdateResponse(BaseModel):
+    updated: int
+    parcel_ids: List[int]
+
+class RoutePlanRequest(BaseModel):
+    depot_lat: float = Field(..., ge=-90, le=90)
+    depot_lng: float = Field(..., ge=-180, le=180)
+    # Either explicit ids or a filter selects the parcels to route
+    parcel_ids: Optional[List[int]] = Field(None, min_length=1, max_length=1000)
+    filter: Optional[ParcelBulkFilter] = None
+    # Couriers visit the pickups (collection run) or the destinations (delivery run)
+    point: str = Field("pickup", pattern="^(pickup|destination)$")
+    vehicle_capacity: int = Field(20, ge=1)  # weight units: small 1, medium 2, large 4
+    time_limit_seconds: Optional[float] = Field(None, gt=0, le=30)
+
+class RouteStop(BaseModel):
+    parcel_id: int
+    address: str
+    lat: float
+    lng: float
+    weight_category: WeightCategory
+    leg_distance_m: float
+
+class CourierRoute(BaseModel):
+    vehicle: int
+    load: int
+    distance_m: float
+    duration_s: float
+    stops: List[RouteStop]
+
+class RoutePlanResponse(BaseModel):
+    parcel_count: int
+    vehicle_count: int
+    total_distance_m: float
+    total_duration_s: float
+    construction_distance_m: float
+    routes: List[CourierRoute]
+
 class ParcelResponse(ParcelBase):
     id: int
     user_id: int
     quote_amount: float
+    quote_is_estimate: bool = False
     status: ParcelStatus
     present_location: Optional[str] = None
     distance_km: Optional[float] = None
@@ -51,3 +110,25 @@ class MapRoute(BaseModel):
     distance: str
     duration: str
     polyline: str
+
+class QuoteRequest(BaseModel):
+    pickup_lat: float
+    pickup_lng: float
+    destination_lat: float
+    destination_lng: float
+    weight_category: WeightCategory
+
+class QuoteBatchRequest(BaseModel):
+    items: List[QuoteRequest] = Field(..., min_length=1, max_length=500)
+
+class QuoteResponse(QuoteRequest):
+    quote_amount: float
+    quote_is_estimate: bool = False
+    distance_km: float
+    duration_mins: int
+
+class RequoteResponse(BaseModel):
+    requoted: int
+    still_estimated: int  # Google still unavailable for these
+    changed: int  # moved, cancelled or re-priced while being quoted; left untouched
+    parcel_ids: List[int]
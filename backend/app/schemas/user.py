@@ -19,4 +19,8 @@ class UserResponse(UserBase):
 
 class Token(BaseModel):
     access_token: str
-    token_type: str
\ No newline at end of file
+    token_type: str
+
+class StreamTicket(BaseModel):
+    ticket: str
+    expires_in: int
@@ -0,0 +1,75 @@
+import logging
+import threading
+import time
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose circuit is open"""
+
+
+class CircuitBreaker:
+    """Stop calling a failing dependency for a while.
+
+    Closed: calls go through, and ``failure_threshold`` consecutive failures
+    open the circuit; a call slower than ``latency_slo_seconds`` counts as a
+    failure even if it succeeded. Open: calls are refused for
+    ``reset_seconds``. Half-open: a single probe call is let through, and its
+    outcome closes the circuit or opens it for another ``reset_seconds``.
+    Safe to share between threads and the event loop.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, latency_slo_seconds: float = 1.0,
+                 reset_seconds: float = 30.0, clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.latency_slo_seconds = latency_slo_seconds
+        self.reset_seconds = reset_seconds
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.trips = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a call may go ahead now; the first call after the reset period is the probe"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and self.clock() - self._opened_at >= self.reset_seconds:
+                self.state = self.HALF_OPEN
+                return True
+            return False
+
+    def record_success(self, seconds: float):
+        if seconds > self.latency_slo_seconds:
+            self.record_failure()
+            return
+        with self._lock:
+            # Calls that started before the circuit opened do not close it
+            if self.state != self.OPEN:
+                if self.state == self.HALF_OPEN:
+                    logger.info(f"{self.name} circuit closed")
+                self.state = self.CLOSED
+                self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or (
+                self.state == self.CLOSED and self.failures >= self.failure_threshold
+            ):
+                self.state = self.OPEN
+                self._opened_at = self.clock()
+                self.trips += 1
+                logger.warning(
+                    f"{self.name} circuit open after {self.failures} consecutive failures; "
+                    f"retrying in {self.reset_seconds:g}s"
+                )
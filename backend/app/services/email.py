@@ -1,22 +1,61 @@
 import os
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail
+import threading
+from typing import Dict, List, Optional, Tuple
+import httpx
+from sendgrid.helpers.mail import Mail, Personalization, To, Substitution
 from dotenv import load_dotenv
 import logging
+from app.services.metrics import metrics
 
 load_dotenv()
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+SENDGRID_API_URL = "https://api.sendgrid.com/v3"
+SENDGRID_TIMEOUT_SECONDS = float(os.getenv("SENDGRID_TIMEOUT_SECONDS", 10))
+SENDGRID_MAX_PERSONALIZATIONS = 1000  # SendGrid limit per request
+FROM_EMAIL = 'notifications@deliveroo.com'
+
 class EmailService:
     def __init__(self):
         self.api_key = os.getenv("SENDGRID_API_KEY")
         self.enabled = bool(self.api_key and self.api_key != "your-sendgrid-api-key")
+        self._client: Optional[httpx.Client] = None
+        self._client_lock = threading.Lock()
         
         if not self.enabled:
             logger.warning("SENDGRID_API_KEY not set or is placeholder. Email notifications disabled.")
     
+    @property
+    def client(self) -> httpx.Client:
+        """Long-lived keep-alive client shared by every send"""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = httpx.Client(
+                        base_url=SENDGRID_API_URL,
+                        headers={"Authorization": f"Bearer {self.api_key}"},
+                        timeout=SENDGRID_TIMEOUT_SECONDS,
+                    )
+        return self._client
+    
+    def close(self):
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+    
+    def _send(self, message: Mail) -> int:
+        metrics.inc("email_requests_total")
+        try:
+            response = self.client.post("/mail/send", json=message.get())
+        except Exception:
+            metrics.inc("email_errors_total")
+            raise
+        if response.status_code != 202:
+            metrics.inc("email_errors_total")
+        return response.status_code
+    
     def send_notification(self, to_email: str, subject: str, content: str):
         """Send email notification"""
         if not self.enabled:
@@ -25,50 +64,126 @@ class EmailService:
         
         try:
             message = Mail(
-                from_email='notifications@deliveroo.com',
+                from_email=FROM_EMAIL,
                 to_emails=to_email,
                 subject=subject,
                 html_content=content
             )
             
-            sg = SendGridAPIClient(self.api_key)
-            response = sg.send(message)
-            logger.info(f"Email sent to {to_email}: {response.status_code}")
-            return response.status_code == 202
+            status_code = self._send(message)
+            logger.info(f"Email sent to {to_email}: {status_code}")
+            return status_code == 202
         except Exception as e:
             logger.error(f"Error sending email: {e}")
             return False
     
-    def send_status_update(self, to_email: str, parcel_id: int, new_status: str):
-        subject = f"📦 Deliveroo: Parcel #{parcel_id} Status Updated"
-        content = f"""
-        <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
-            <div style="background: #0066FF; color: white; padding: 20px; text-align: center;">
-                <h1>🚚 Deliveroo Update</h1>
-            </div>
-            <div style="padding: 20px; background: #f9f9f9;">
-                <h2>Parcel Status Update</h2>
-                <p>Your parcel #{parcel_id} status has been updated to: <strong>{new_status.replace('_', ' ').title()}</strong></p>
-                <p>Track your parcel at: <a href="{os.getenv('FRONTEND_URL', 'http://localhost:3000')}/parcel/{parcel_id}">View Details</a></p>
-            </div>
-        </div>
+    def send_batch(self, subject: str, content: str, recipients: List[Tuple[str, Dict[str, str]]]):
+        """Send one templated message to many recipients.
+
+        ``recipients`` is a list of ``(to_email, substitutions)``; each becomes a
+        SendGrid personalization, so up to 1000 recipients share one request.
         """
+        if not self.enabled:
+            for to_email, _ in recipients:
+                logger.info(f"Email would be sent to {to_email}: {subject}")
+            return False
+        
+        try:
+            message = Mail(from_email=FROM_EMAIL, subject=subject, html_content=content)
+            for to_email, substitutions in recipients:
+                personalization = Personalization()
+                personalization.add_to(To(to_email))
+                for key, value in substitutions.items():
+                    personalization.add_substitution(Substitution(key, value))
+                message.add_personalization(personalization)
+            
+            status_code = self._send(message)
+            logger.info(f"Batch email sent to {len(recipients)} recipients: {status_code}")
+            return status_code == 202
+        except Exception as e:
+            logger.error(f"Error sending batch email: {e}")
+            return False
+    
+    def send_status_update(self, to_email: str, parcel_id: int, new_status: str):
+        subject, content = self.render_status_update(parcel_id, new_status)
         return self.send_notification(to_email, subject, content)
     
+    def render_status_update(self, parcel_id: int, new_status: str):
+        return self.render_parcel_update(parcel_id, status_text=format_status(new_status))
+    
     def send_location_update(self, to_email: str, parcel_id: int, new_location: str):
-        subject = f"📍 Deliveroo: Parcel #{parcel_id} Location Updated"
+        subject, content = self.render_location_update(parcel_id, new_location)
+        return self.send_notification(to_email, subject, content)
+    
+    def render_location_update(self, parcel_id: int, new_location: str):
+        return self.render_parcel_update(parcel_id, location=new_location)
+    
+    def render_parcel_update(self, parcel_id, status_text: Optional[str] = None,
+                             location: Optional[str] = None):
+        """Render one message covering every change to a parcel.
+
+        Values are inserted verbatim, so SendGrid substitution tokens such as
+        ``-parcel_id-`` can be passed in to build a batch template.
+        """
+        if status_text is not None and location is None:
+            subject = f"📦 Deliveroo: Parcel #{parcel_id} Status Updated"
+            color, heading, title = "#0066FF", "🚚 Deliveroo Update", "Parcel Status Update"
+        elif location is not None and status_text is None:
+            subject = f"📍 Deliveroo: Parcel #{parcel_id} Location Updated"
+            color, heading, title = "#00D4AA", "📍 Location Update", "Parcel Location Update"
+        else:
+            subject = f"📦 Deliveroo: Parcel #{parcel_id} Updated"
+            color, heading, title = "#0066FF", "🚚 Deliveroo Update", "Parcel Update"
+        
+        lines = ""
+        if status_text is not None:
+            lines += f"<p>Your parcel #{parcel_id} status has been updated to: <strong>{status_text}</strong></p>"
+        if location is not None:
+            lines += f"<p>Your parcel #{parcel_id} is now at: <strong>{location}</strong></p>"
+        
         content = f"""
         <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
-            <div style="background: #00D4AA; color: white; padding: 20px; text-align: center;">
-                <h1>📍 Location Update</h1>
+            <div style="background: {color}; color: white; padding: 20px; text-align: center;">
+                <h1>{heading}</h1>
             </div>
             <div style="padding: 20px; background: #f9f9f9;">
-                <h2>Parcel Location Update</h2>
-                <p>Your parcel #{parcel_id} is now at: <strong>{new_location}</strong></p>
+                <h2>{title}</h2>
+                {lines}
                 <p>Track your parcel at: <a href="{os.getenv('FRONTEND_URL', 'http://localhost:3000')}/parcel/{parcel_id}">View Details</a></p>
             </div>
         </div>
         """
-        return self.send_notification(to_email, subject, content)
+        return subject, content
+
+
+def format_status(status: str) -> str:
+    return status.replace('_', ' ').title()
+
+
+class LocalEmailTransport:
+    """In-memory stand-in for SendGrid, used by tests and local runs"""
+    def __init__(self, fail: bool = False):
+        self.enabled = True
+        self.fail = fail
+        self.sent = []
+        self.batches = 0
+    
+    def send_notification(self, to_email: str, subject: str, content: str):
+        if self.fail:
+            return False
+        self.sent.append({"to_email": to_email, "subject": subject, "content": content})
+        return True
+    
+    def send_batch(self, subject: str, content: str, recipients: List[Tuple[str, Dict[str, str]]]):
+        if self.fail:
+            return False
+        self.batches += 1
+        for to_email, substitutions in recipients:
+            rendered_subject, rendered_content = subject, content
+            for key, value in substitutions.items():
+                rendered_subject = rendered_subject.replace(key, value)
+                rendered_content = rendered_content.replace(key, value)
+            self.sent.append({"to_email": to_email, "subject": rendered_subject, "content": rendered_content})
+        return True
 
 email_service = EmailService()
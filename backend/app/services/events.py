@@ -0,0 +1,238 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from typing import Dict, Iterable, Optional, Set, Tuple
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+EVENT_BROKER = os.getenv("EVENT_BROKER", "local")
+EVENT_BROKER_PATH = os.getenv("EVENT_BROKER_PATH", "events.db")
+EVENT_BROKER_POLL_SECONDS = float(os.getenv("EVENT_BROKER_POLL_SECONDS", 0.5))
+EVENT_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", 100))
+SSE_KEEPALIVE_SECONDS = float(os.getenv("SSE_KEEPALIVE_SECONDS", 15))
+
+
+def parcel_event(parcel, change: str) -> dict:
+    """Payload pushed to the owner when one of their parcels changes"""
+    return {
+        "change": change,
+        "parcel_id": parcel.id,
+        "status": parcel.status.value if hasattr(parcel.status, 'value') else str(parcel.status),
+        "present_location": parcel.present_location,
+        "destination_address": parcel.destination_address,
+        "destination_lat": parcel.destination_lat,
+        "destination_lng": parcel.destination_lng,
+        "quote_amount": parcel.quote_amount,
+        "updated_at": parcel.updated_at.isoformat() if parcel.updated_at else None,
+    }
+
+
+def format_sse(event: dict) -> str:
+    return f"event: parcel\ndata: {json.dumps(event)}\n\n"
+
+
+class Subscription:
+    """Bounded queue of events for one open stream.
+
+    Lives on the event loop that created it; a slow client loses its oldest
+    events rather than growing the queue.
+    """
+
+    def __init__(self, user_id: int, max_size: int = EVENT_QUEUE_SIZE):
+        self.user_id = user_id
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue(max_size)
+        self.dropped = 0
+
+    def put(self, event: dict):
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout: float) -> Optional[dict]:
+        """Next event, or None if nothing arrived within ``timeout`` seconds"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class EventBroker(ABC):
+    """Routes parcel events to the open streams of the parcel's owner.
+
+    ``publish`` may be called from any thread and may block, so async
+    handlers call it from the threadpool, as sync handlers already are.
+    ``subscribe`` runs on the event loop and must not block. An idle stream
+    costs one Subscription and no database connection.
+    """
+
+    def __init__(self):
+        self._subscribers: Dict[int, Set[Subscription]] = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id: int) -> Subscription:
+        subscription = Subscription(user_id)
+        with self._lock:
+            self._subscribers[user_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.user_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.user_id]
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    @abstractmethod
+    def publish(self, user_id: int, event: dict):
+        """Deliver ``event`` to every open stream of ``user_id``"""
+
+    def publish_many(self, events: Iterable[Tuple[int, dict]]):
+        """publish for many (user_id, event) pairs, e.g. after a bulk update"""
+        for user_id, event in events:
+            self.publish(user_id, event)
+
+    def dispatch(self, user_id: int, event: dict):
+        """Hand an event to this process's streams for ``user_id``"""
+        with self._lock:
+            subscriptions = list(self._subscribers.get(user_id, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, event)
+            except RuntimeError:
+                # The stream's event loop has already shut down
+                self.unsubscribe(subscription)
+
+    def close(self):
+        pass
+
+
+class LocalEventBroker(EventBroker):
+    """In-process pub/sub; events reach streams served by this worker only"""
+
+    def publish(self, user_id: int, event: dict):
+        self.dispatch(user_id, event)
+
+
+class SQLiteEventBroker(EventBroker):
+    """Fan-out across the worker processes on one host through a SQLite file.
+
+    Every worker appends published events to the parcel_events table and
+    polls it for rows written since its last read, dispatching them to its
+    own streams. Polling only runs while the worker has open streams, and
+    every read of the file happens in a worker thread.
+    """
+
+    RETENTION_SECONDS = 300
+    PRUNE_EVERY = 1000
+
+    def __init__(self, path: str, poll_seconds: float = EVENT_BROKER_POLL_SECONDS):
+        super().__init__()
+        self.path = path
+        self.poll_seconds = poll_seconds
+        self._local = threading.local()
+        self._published = 0
+        self._poller: Optional[asyncio.Task] = None
+        self._polling_since = 0.0
+        db = self._connection()
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS parcel_events ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER NOT NULL, "
+            "payload TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        self.last_id: Optional[int] = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            self._local.db = db
+        return db
+
+    def publish(self, user_id: int, event: dict):
+        self.publish_many([(user_id, event)])
+
+    def publish_many(self, events: Iterable[Tuple[int, dict]]):
+        """Append every event in one transaction, so a bulk update costs a single commit"""
+        # Called after the parcel change is committed; a lost event must not fail the request
+        now = time.time()
+        rows = [(user_id, json.dumps(event), now) for user_id, event in events]
+        if not rows:
+            return
+        db = self._connection()
+        try:
+            db.execute("BEGIN")
+            try:
+                db.executemany("INSERT INTO parcel_events (user_id, payload, created_at) VALUES (?, ?, ?)", rows)
+                published, self._published = self._published, self._published + len(rows)
+                if published // self.PRUNE_EVERY != self._published // self.PRUNE_EVERY:
+                    db.execute("DELETE FROM parcel_events WHERE created_at < ?", (now - self.RETENTION_SECONDS,))
+                db.execute("COMMIT")
+            except sqlite3.Error:
+                db.execute("ROLLBACK")
+                raise
+        except sqlite3.Error as e:
+            logger.error(f"Failed to publish {len(rows)} parcel events: {e}")
+
+    def subscribe(self, user_id: int) -> Subscription:
+        subscription = super().subscribe(user_id)
+        if self._poller is None or self._poller.done():
+            # The first poll finds where to start reading, off the event loop
+            self.last_id = None
+            self._polling_since = time.time()
+            self._poller = asyncio.get_running_loop().create_task(self._poll())
+        return subscription
+
+    def fetch_new(self) -> int:
+        """Dispatch events written since the last read; returns how many"""
+        db = self._connection()
+        if self.last_id is None:
+            # Streams opened later must not replay what was published while idle
+            self.last_id = db.execute(
+                "SELECT COALESCE(MAX(id), 0) FROM parcel_events WHERE created_at < ?", (self._polling_since,)
+            ).fetchone()[0]
+        rows = db.execute(
+            "SELECT id, user_id, payload FROM parcel_events WHERE id > ? ORDER BY id", (self.last_id,)
+        ).fetchall()
+        for event_id, user_id, payload in rows:
+            self.last_id = event_id
+            self.dispatch(user_id, json.loads(payload))
+        return len(rows)
+
+    async def _poll(self):
+        while self.subscriber_count():
+            try:
+                await asyncio.to_thread(self.fetch_new)
+            except sqlite3.Error as e:
+                logger.error(f"Failed to read parcel events: {e}")
+            await asyncio.sleep(self.poll_seconds)
+
+    def close(self):
+        if self._poller is not None:
+            self._poller.cancel()
+            self._poller = None
+
+
+def create_event_broker() -> EventBroker:
+    if EVENT_BROKER == "sqlite":
+        return SQLiteEventBroker(EVENT_BROKER_PATH)
+    return LocalEventBroker()
+
+
+event_broker = create_event_broker()
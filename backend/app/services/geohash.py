@@ -0,0 +1,98 @@
+import math
+from typing import List, Set, Tuple
+import numpy as np
+
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+# Stored precision; a 9-character cell is about 4.8 m x 4.8 m
+GEOHASH_PRECISION = 9
+# Upper bound on the cells a proximity query is split into
+MAX_COVER_CELLS = 32
+METRES_PER_DEGREE_LAT = 111_320
+
+
+def encode(lat: float, lng: float, precision: int = GEOHASH_PRECISION) -> str:
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars = []
+    bits, value, even = 0, 0, True
+    while len(chars) < precision:
+        interval, coordinate = (lng_range, lng) if even else (lat_range, lat)
+        middle = (interval[0] + interval[1]) / 2
+        if coordinate >= middle:
+            value = (value << 1) | 1
+            interval[0] = middle
+        else:
+            value <<= 1
+            interval[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(GEOHASH_ALPHABET[value])
+            bits, value = 0, 0
+    return "".join(chars)
+
+
+def encode_many(lats, lngs, precision: int = GEOHASH_PRECISION) -> List[str]:
+    """encode over arrays of coordinates, for bulk loads"""
+    total_bits = precision * 5
+    lng_bits, lat_bits = (total_bits + 1) // 2, total_bits // 2
+    lat_cells = np.clip(((np.asarray(lats, dtype=float) + 90) / 180 * 2 ** lat_bits).astype(np.int64),
+                        0, 2 ** lat_bits - 1)
+    lng_cells = np.clip(((np.asarray(lngs, dtype=float) + 180) / 360 * 2 ** lng_bits).astype(np.int64),
+                        0, 2 ** lng_bits - 1)
+
+    # Interleave the bits, longitude first
+    codes = np.zeros(len(lat_cells), dtype=np.int64)
+    for bit in range(total_bits):
+        cells, width = (lng_cells, lng_bits) if bit % 2 == 0 else (lat_cells, lat_bits)
+        codes = (codes << 1) | ((cells >> (width - 1 - bit // 2)) & 1)
+
+    digits = np.stack([(codes >> (5 * (precision - 1 - i))) & 31 for i in range(precision)], axis=1)
+    characters = np.array(list(GEOHASH_ALPHABET))[digits]
+    return np.ascontiguousarray(characters).view(f"<U{precision}").ravel().tolist()
+
+
+def cell_size(precision: int) -> Tuple[float, float]:
+    """(height, width) in degrees of a geohash cell"""
+    lng_bits = math.ceil(precision * 5 / 2)
+    lat_bits = precision * 5 // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lng_bits
+
+
+def bounding_box(lat: float, lng: float, radius_m: float) -> Tuple[float, float, float, float]:
+    """(south, west, north, east) of a circle"""
+    dlat = radius_m / METRES_PER_DEGREE_LAT
+    dlng = radius_m / (METRES_PER_DEGREE_LAT * max(math.cos(math.radians(lat)), 1e-6))
+    return max(lat - dlat, -90.0), max(lng - dlng, -180.0), min(lat + dlat, 90.0), min(lng + dlng, 180.0)
+
+
+def covering_cells(lat: float, lng: float, radius_m: float) -> List[str]:
+    """Geohash prefixes whose cells together cover a circle.
+
+    Uses the finest precision that needs at most MAX_COVER_CELLS cells, so a
+    query becomes a handful of index range scans over the stored geohashes.
+    """
+    south, west, north, east = bounding_box(lat, lng, radius_m)
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        height, width = cell_size(precision)
+        rows = math.floor(north / height) - math.floor(south / height) + 1
+        columns = math.floor(east / width) - math.floor(west / width) + 1
+        if rows * columns <= MAX_COVER_CELLS:
+            break
+
+    cells: Set[str] = set()
+    for row in range(rows):
+        cell_lat = min(south + row * height, north)
+        for column in range(columns):
+            cell_lng = min(west + column * width, east)
+            cells.add(encode(cell_lat, cell_lng, precision))
+        cells.add(encode(cell_lat, east, precision))
+    for column in range(columns):
+        cells.add(encode(north, min(west + column * width, east), precision))
+    cells.add(encode(north, east, precision))
+    return sorted(cells)
+
+
+def prefix_range(prefix: str) -> Tuple[str, str]:
+    """[low, high) bounds matching every geohash that starts with ``prefix``"""
+    # "~" sorts after every geohash character
+    return prefix, prefix + "~"
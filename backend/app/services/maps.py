@@ -1,37 +1,321 @@
+import asyncio
+import json
 import logging
-from typing import Dict, Tuple, Optional
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Tuple, Optional
 import os
+import httpx
+import numpy as np
 from dotenv import load_dotenv
+from app.services.circuit_breaker import CircuitBreaker, CircuitOpenError
+from app.services.metrics import metrics
 
 load_dotenv()
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+MAPS_CACHE_SIZE = int(os.getenv("MAPS_CACHE_SIZE", 10000))
+MAPS_CACHE_TTL_SECONDS = int(os.getenv("MAPS_CACHE_TTL_SECONDS", 7 * 24 * 3600))
+MAPS_CACHE_GRID_DEGREES = float(os.getenv("MAPS_CACHE_GRID_DEGREES", 0.001))  # ~110 m
+MAPS_CACHE_DB_PATH = os.getenv("MAPS_CACHE_DB_PATH")
+
+GOOGLE_MAPS_API_URL = "https://maps.googleapis.com/maps/api"
+# Response statuses that are answers rather than failures
+GOOGLE_OK_STATUSES = ("OK", "ZERO_RESULTS")
+# Statuses that mean Google is refusing or failing requests, as opposed to a bad request
+GOOGLE_UNAVAILABLE_STATUSES = ("OVER_DAILY_LIMIT", "OVER_QUERY_LIMIT", "REQUEST_DENIED", "UNKNOWN_ERROR")
+MAPS_HTTP_TIMEOUT_SECONDS = float(os.getenv("MAPS_HTTP_TIMEOUT_SECONDS", 5))
+# Longest one Google call (including the client's retries) may take before the local estimate is used
+MAPS_DEADLINE_SECONDS = float(os.getenv("MAPS_DEADLINE_SECONDS", 2))
+# Consecutive failures, or calls slower than the latency SLO, that open the circuit
+MAPS_BREAKER_FAILURES = int(os.getenv("MAPS_BREAKER_FAILURES", 5))
+MAPS_LATENCY_SLO_SECONDS = float(os.getenv("MAPS_LATENCY_SLO_SECONDS", 1))
+MAPS_BREAKER_RESET_SECONDS = float(os.getenv("MAPS_BREAKER_RESET_SECONDS", 30))
+MAPS_HTTP_MAX_CONNECTIONS = int(os.getenv("MAPS_HTTP_MAX_CONNECTIONS", 20))
+# "google" (falls back to local estimates without an API key) or "graph" (local road network)
+MAPS_PROVIDER = os.getenv("MAPS_PROVIDER", "google")
+
+# Google Distance Matrix limit per request; batches send one origin per request
+MATRIX_MAX_DESTINATIONS = 25
+
+# Local distance engine used when Google is unavailable and for bulk pricing
+EARTH_RADIUS_M = 6371008.8
+ROAD_CIRCUITY_FACTOR = float(os.getenv("ROAD_CIRCUITY_FACTOR", 1.3))  # road km per great-circle km
+# "<up to km>:<km/h>,..." - each band of a trip is driven at its own average speed
+ROAD_SPEED_PROFILE = os.getenv("ROAD_SPEED_PROFILE", "5:20,20:35,inf:60")
+
+BASE_PRICES = {
+    'small': 5.0,
+    'medium': 10.0,
+    'large': 15.0
+}
+DISTANCE_RATE = 0.5  # $ per km
+
+
+class DistanceCache:
+    """Bounded LRU + TTL cache for distance-matrix elements.
+
+    Origins and destinations are snapped to a grid of ``grid_degrees`` so that
+    nearby requests share an entry. When ``persist_path`` is set, entries are
+    also written to a SQLite table and survive restarts.
+    """
+
+    def __init__(self, max_size: int = MAPS_CACHE_SIZE, ttl_seconds: int = MAPS_CACHE_TTL_SECONDS,
+                 grid_degrees: float = MAPS_CACHE_GRID_DEGREES, persist_path: Optional[str] = None):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.grid_degrees = grid_degrees
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[Tuple[int, int, int, int], Tuple[float, Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._db = None
+        if persist_path:
+            try:
+                self._db = sqlite3.connect(persist_path, check_same_thread=False)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS distance_cache ("
+                    "key TEXT PRIMARY KEY, element TEXT NOT NULL, expires_at REAL NOT NULL)"
+                )
+                self._db.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"Persistent distance cache disabled: {e}")
+                self._db = None
+
+    def _snap(self, value: float) -> int:
+        return int(round(value / self.grid_degrees))
+
+    def make_key(self, origin: Tuple[float, float],
+                 destination: Tuple[float, float]) -> Tuple[int, int, int, int]:
+        return (self._snap(origin[0]), self._snap(origin[1]),
+                self._snap(destination[0]), self._snap(destination[1]))
+
+    def _persistent_key(self, key: Tuple[int, int, int, int]) -> str:
+        # The grid size is part of the key so a config change never reuses stale cells
+        return f"{self.grid_degrees}:" + ",".join(str(part) for part in key)
+
+    def get(self, origin: Tuple[float, float], destination: Tuple[float, float]) -> Optional[Dict]:
+        key = self.make_key(origin, destination)
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, element = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return element
+                del self._entries[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT element, expires_at FROM distance_cache WHERE key = ?",
+                    (self._persistent_key(key),)
+                ).fetchone()
+                if row and row[1] > now:
+                    element = json.loads(row[0])
+                    self._store(key, row[1], element)
+                    self.hits += 1
+                    return element
+
+            self.misses += 1
+            return None
+
+    def set(self, origin: Tuple[float, float], destination: Tuple[float, float], element: Dict):
+        key = self.make_key(origin, destination)
+        expires_at = time.time() + self.ttl_seconds
+
+        with self._lock:
+            self._store(key, expires_at, element)
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO distance_cache (key, element, expires_at) VALUES (?, ?, ?)",
+                        (self._persistent_key(key), json.dumps(element), expires_at)
+                    )
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    logger.error(f"Error writing persistent distance cache: {e}")
+
+    def _store(self, key: Tuple[int, int, int, int], expires_at: float, element: Dict):
+        self._entries[key] = (expires_at, element)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+            if self._db is not None:
+                self._db.execute("DELETE FROM distance_cache")
+                self._db.commit()
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "grid_degrees": self.grid_degrees,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "persistent": self._db is not None,
+        }
+
+
+def parse_speed_profile(profile: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Parse ROAD_SPEED_PROFILE into (band upper bounds in km, speeds in km/h)"""
+    bands = sorted(
+        (float(limit), float(speed))
+        for limit, speed in (band.split(":") for band in profile.split(",") if band.strip())
+    )
+    if not bands or bands[-1][0] != float("inf"):
+        raise ValueError(f"Speed profile must end with an 'inf:<km/h>' band: {profile!r}")
+    limits, speeds = zip(*bands)
+    return np.array(limits), np.array(speeds)
+
+
+def format_distance(distance_m: int) -> str:
+    return f"{distance_m / 1000:.1f} km"
+
+
+def format_duration(duration_s: int) -> str:
+    """Google-style duration text, e.g. "1 hour 5 mins" """
+    minutes = max(1, round(duration_s / 60))
+    hours, minutes = divmod(minutes, 60)
+    parts = []
+    if hours:
+        parts.append(f"{hours} hour{'s' if hours != 1 else ''}")
+    if minutes or not hours:
+        parts.append(f"{minutes} min{'s' if minutes != 1 else ''}")
+    return " ".join(parts)
+
+
+class DistanceEngine:
+    """Vectorized road distance and travel time estimates.
+
+    Great-circle (haversine) distance scaled by a road circuity factor, with
+    durations from a piecewise speed profile: the first band of each trip is
+    driven at the first speed, the next band at the second, and so on, so
+    longer trips are not slower per km than shorter ones. Works on whole
+    arrays of origin/destination pairs at once.
+    """
+
+    def __init__(self, circuity: float = ROAD_CIRCUITY_FACTOR, speed_profile: str = ROAD_SPEED_PROFILE):
+        self.circuity = circuity
+        self.band_limits_km, self.band_speeds_kmh = parse_speed_profile(speed_profile)
+        self.band_starts_km = np.concatenate(([0.0], self.band_limits_km[:-1]))
+
+    @staticmethod
+    def haversine_m(origins: np.ndarray, destinations: np.ndarray) -> np.ndarray:
+        """Great-circle distance in metres between (N, 2) arrays of lat/lng degrees"""
+        lat1, lng1 = np.radians(origins[:, 0]), np.radians(origins[:, 1])
+        lat2, lng2 = np.radians(destinations[:, 0]), np.radians(destinations[:, 1])
+        a = (np.sin((lat2 - lat1) / 2) ** 2
+             + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2)
+        return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+    def estimate(self, origins, destinations) -> Tuple[np.ndarray, np.ndarray]:
+        """Road distance (m) and duration (s) arrays for paired origins/destinations"""
+        origins = np.asarray(origins, dtype=float).reshape(-1, 2)
+        destinations = np.asarray(destinations, dtype=float).reshape(-1, 2)
+        distance_m = self.haversine_m(origins, destinations) * self.circuity
+
+        # km driven in each speed band: (N, bands)
+        distance_km = distance_m[:, None] / 1000
+        band_km = np.clip(distance_km - self.band_starts_km, 0.0, self.band_limits_km - self.band_starts_km)
+        duration_s = (band_km / self.band_speeds_kmh).sum(axis=1) * 3600
+        return distance_m, duration_s
+
+    def elements(self, origins, destinations) -> List[Dict]:
+        """Estimates in the shape of Google distance matrix elements"""
+        distance_m, duration_s = self.estimate(origins, destinations)
+        return [
+            {
+                'distance': {'text': format_distance(distance), 'value': distance},
+                'duration': {'text': format_duration(duration), 'value': duration},
+                'status': 'OK'
+            }
+            for distance, duration in zip(
+                np.rint(distance_m).astype(int).tolist(), np.rint(duration_s).astype(int).tolist()
+            )
+        ]
+
+
+def calculate_quotes(weight_categories, distance_km) -> np.ndarray:
+    """Vectorized calculate_quote over arrays of weight categories and distances"""
+    if isinstance(weight_categories, np.ndarray):
+        categories = weight_categories
+    else:
+        # numpy would stringify enum members as "WeightCategory.small"
+        categories = np.array([getattr(category, 'value', category) for category in weight_categories])
+    base = np.full(categories.shape, 10.0)
+    for category, price in BASE_PRICES.items():
+        base[categories == category] = price
+    return np.round(base + np.asarray(distance_km, dtype=float) * DISTANCE_RATE, 2)
+
+
+def record_google_call(breaker: CircuitBreaker, status: Optional[str], seconds: float):
+    """Feed one Google response status (None for a transport error or timeout) to the breaker"""
+    if status is None or status in GOOGLE_UNAVAILABLE_STATUSES:
+        breaker.record_failure()
+    else:
+        breaker.record_success(seconds)
+
+
 class MapsService:
-    def __init__(self):
+    def __init__(self, cache: Optional[DistanceCache] = None, engine: Optional[DistanceEngine] = None,
+                 breaker: Optional[CircuitBreaker] = None):
+        self.engine = engine or DistanceEngine()
         self.api_key = os.getenv("GOOGLE_MAPS_API_KEY")
-        
+        self.cache = cache or DistanceCache(persist_path=MAPS_CACHE_DB_PATH)
+        # Shared with AsyncMapsService, so both stop calling Google together
+        self.breaker = breaker or CircuitBreaker(
+            "Google Maps", MAPS_BREAKER_FAILURES, MAPS_LATENCY_SLO_SECONDS, MAPS_BREAKER_RESET_SECONDS
+        )
+        self.gmaps = self.create_client()
+
+    def create_client(self):
+        """googlemaps client, or None to answer every lookup locally"""
         # Try to import googlemaps only if we have a valid key
-        self.gmaps = None
         if self.api_key and self.api_key != "YOUR_GOOGLE_MAPS_API_KEY_HERE":
             try:
                 import googlemaps
-                self.gmaps = googlemaps.Client(key=self.api_key)
+                # retry_timeout bounds the client's own retries on rate limiting and 5xx
+                gmaps = googlemaps.Client(
+                    key=self.api_key, timeout=MAPS_DEADLINE_SECONDS, retry_timeout=MAPS_DEADLINE_SECONDS
+                )
                 logger.info("Google Maps client initialized successfully")
+                return gmaps
             except ImportError:
                 logger.warning("googlemaps package not installed")
             except Exception as e:
                 logger.warning(f"Failed to initialize Google Maps client: {e}")
         else:
             logger.warning("GOOGLE_MAPS_API_KEY not set or is placeholder. Using mock data.")
+        return None
     
     def calculate_distance_matrix(self, origin: Tuple[float, float], 
                                  destination: Tuple[float, float]) -> Optional[Dict]:
         """Calculate distance and duration between two points"""
         if self.gmaps:
+            cached = self.cache.get(origin, destination)
+            if cached is not None:
+                return cached
+
             try:
-                result = self.gmaps.distance_matrix(
+                result = self._google("distancematrix", self.gmaps.distance_matrix,
                     origins=[origin],
                     destinations=[destination],
                     mode="driving",
@@ -41,21 +325,136 @@ class MapsService:
                 if result['status'] == 'OK':
                     element = result['rows'][0]['elements'][0]
                     if element['status'] == 'OK':
+                        self.cache.set(origin, destination, element)
                         return element
+            except CircuitOpenError:
+                pass
             except Exception as e:
                 logger.error(f"Error calculating distance matrix: {e}")
+            return self.fallback_estimate(origin, destination)
         
-        # Return mock data for development
-        lat_diff = abs(destination[0] - origin[0])
-        lng_diff = abs(destination[1] - origin[1])
-        distance_value = int((lat_diff + lng_diff) * 111000)  # Approximate km to meters
-        duration_value = int(distance_value / 1000 * 1.5 * 60)  # 1.5 minutes per km
-        
-        return {
-            'distance': {'text': f'{distance_value/1000:.1f} km', 'value': distance_value},
-            'duration': {'text': f'{duration_value//60}h {duration_value%60}m', 'value': duration_value},
-            'status': 'OK'
-        }
+        return self.estimate_distance(origin, destination)
+
+    def _google(self, api: str, call, **kwargs):
+        """Call a googlemaps client method through the circuit breaker, counting requests and failures"""
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"Google Maps circuit open, skipping {api}")
+        metrics.inc("maps_requests_total", api=api)
+        started = time.perf_counter()
+        try:
+            result = call(**kwargs)
+        except Exception as e:
+            metrics.inc("maps_errors_total", api=api)
+            # googlemaps raises ApiError with the response status for non-OK answers
+            record_google_call(self.breaker, getattr(e, "status", None), time.perf_counter() - started)
+            raise
+        status = result.get("status") if isinstance(result, dict) else "OK"
+        if status not in GOOGLE_OK_STATUSES:
+            metrics.inc("maps_errors_total", api=api)
+        record_google_call(self.breaker, status, time.perf_counter() - started)
+        return result
+
+    def estimate_distance(self, origin: Tuple[float, float],
+                          destination: Tuple[float, float]) -> Dict:
+        """Local road distance estimate, used without Google or when it fails"""
+        return self.engine.elements([origin], [destination])[0]
+
+    def fallback_estimate(self, origin: Tuple[float, float],
+                          destination: Tuple[float, float]) -> Dict:
+        """Local estimate standing in for a failed Google call, flagged so the quote can be redone"""
+        return {**self.estimate_distance(origin, destination), 'estimate': True}
+
+    def estimate_distances(self, pairs: List[Tuple[Tuple[float, float], Tuple[float, float]]]) -> List[Dict]:
+        """estimate_distance for many pairs in one vectorized pass"""
+        if not pairs:
+            return []
+        origins, destinations = zip(*pairs)
+        return self.engine.elements(origins, destinations)
+
+    def distance_matrix(self, points: List[Tuple[float, float]]) -> Tuple[np.ndarray, np.ndarray]:
+        """All-pairs road distance (m) and duration (s) matrices between points.
+
+        The local estimate, never Google: its matrix API caps a request at 100
+        elements and bills each one, so a route plan over hundreds of stops
+        would take thousands of calls. RoadGraphMapsService overrides this
+        with distances over its road network.
+        """
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        count = len(points)
+        distance_m, duration_s = self.engine.estimate(np.repeat(points, count, axis=0), np.tile(points, (count, 1)))
+        return distance_m.reshape(count, count), duration_s.reshape(count, count)
+
+    def calculate_distance_matrix_batch(
+        self, pairs: List[Tuple[Tuple[float, float], Tuple[float, float]]]
+    ) -> List[Dict]:
+        """Calculate distance and duration for many origin/destination pairs.
+
+        Cache misses sharing an origin are fetched together, up to 25
+        destinations per request, so pairs from one depot cost ceil(N / 25)
+        round trips instead of N; pairs with distinct origins still take one
+        request each. Only the requested pairs are billed.
+        """
+        results: List[Optional[Dict]] = [None] * len(pairs)
+
+        if self.gmaps:
+            pending: Dict[Tuple[Tuple[float, float], Tuple[float, float]], List[int]] = {}
+            for index, (origin, destination) in enumerate(pairs):
+                cached = self.cache.get(origin, destination)
+                if cached is not None:
+                    results[index] = cached
+                else:
+                    pending.setdefault((tuple(origin), tuple(destination)), []).append(index)
+
+            for origins, destinations, chunk in self._chunk_matrix_pairs(list(pending)):
+                try:
+                    result = self._google("distancematrix", self.gmaps.distance_matrix,
+                        origins=origins,
+                        destinations=destinations,
+                        mode="driving",
+                        units="metric"
+                    )
+                except CircuitOpenError:
+                    break
+                except Exception as e:
+                    logger.error(f"Error calculating distance matrix batch: {e}")
+                    continue
+
+                if result['status'] != 'OK':
+                    continue
+
+                for origin, destination in chunk:
+                    element = result['rows'][origins.index(origin)]['elements'][destinations.index(destination)]
+                    if element['status'] != 'OK':
+                        continue
+                    self.cache.set(origin, destination, element)
+                    for index in pending[(origin, destination)]:
+                        results[index] = element
+
+        missing = [index for index, result in enumerate(results) if result is None]
+        for index, estimate in zip(missing, self.estimate_distances([pairs[index] for index in missing])):
+            results[index] = {**estimate, 'estimate': True} if self.gmaps else estimate
+
+        return results
+
+    @staticmethod
+    def _chunk_matrix_pairs(pairs):
+        """Group pairs into (origins, destinations, pairs) chunks of a single origin.
+
+        Google bills every element of the origins x destinations grid, so a
+        request only ever carries one origin and up to
+        MATRIX_MAX_DESTINATIONS of its destinations: each element is a pair
+        that was asked for, and nothing is billed twice.
+        """
+        by_origin: Dict[Tuple[float, float], List[Tuple[float, float]]] = {}
+        for origin, destination in pairs:
+            by_origin.setdefault(origin, []).append(destination)
+
+        chunks = []
+        for origin, destinations in by_origin.items():
+            for start in range(0, len(destinations), MATRIX_MAX_DESTINATIONS):
+                row = destinations[start:start + MATRIX_MAX_DESTINATIONS]
+                chunks.append(([origin], row, [(origin, destination) for destination in row]))
+        return chunks
     
     def get_route_polyline(self, origin: Tuple[float, float], 
                           destination: Tuple[float, float]) -> Optional[str]:
@@ -65,7 +464,7 @@ class MapsService:
         
         try:
             import googlemaps
-            directions = self.gmaps.directions(
+            directions = self._google("directions", self.gmaps.directions,
                 origin=origin,
                 destination=destination,
                 mode="driving"
@@ -73,6 +472,8 @@ class MapsService:
             
             if directions:
                 return directions[0]['overview_polyline']['points']
+        except CircuitOpenError:
+            pass
         except Exception as e:
             logger.error(f"Error getting directions: {e}")
         
@@ -80,15 +481,181 @@ class MapsService:
     
     def calculate_quote(self, weight_category: str, distance_km: float) -> float:
         """Calculate delivery quote based on weight and distance"""
-        base_prices = {
-            'small': 5.0,
-            'medium': 10.0,
-            'large': 15.0
-        }
-        
-        base_price = base_prices.get(weight_category, 10.0)
-        distance_rate = 0.5  # $ per km
-        
-        return round(base_price + (distance_km * distance_rate), 2)
+        base_price = BASE_PRICES.get(weight_category, 10.0)
+        return round(base_price + (distance_km * DISTANCE_RATE), 2)
+
+
+class AsyncMapsService:
+    """Async counterpart of MapsService for use in ``async def`` routes.
+
+    Talks to the Google Maps web services over a pooled keep-alive HTTP client
+    with per-call timeouts, and shares the cache, fallback estimate and pricing
+    of the wrapped MapsService.
+    """
+
+    def __init__(self, sync_service: MapsService, timeout: float = MAPS_HTTP_TIMEOUT_SECONDS,
+                 max_connections: int = MAPS_HTTP_MAX_CONNECTIONS, deadline: float = MAPS_DEADLINE_SECONDS):
+        self.sync_service = sync_service
+        self.api_key = sync_service.api_key
+        self.enabled = bool(self.api_key and self.api_key != "YOUR_GOOGLE_MAPS_API_KEY_HERE")
+        self.timeout = timeout
+        self.deadline = deadline
+        self.max_connections = max_connections
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def cache(self) -> DistanceCache:
+        return self.sync_service.cache
+
+    @property
+    def breaker(self) -> CircuitBreaker:
+        return self.sync_service.breaker
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # Created lazily so the pool is bound to the running event loop
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=GOOGLE_MAPS_API_URL,
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+            )
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _get_json(self, path: str, params: Dict, timeout: Optional[float] = None) -> Dict:
+        """GET a web service through the circuit breaker, giving up after ``self.deadline``.
+
+        httpx timeouts apply per connect/read, so a slowly trickling response
+        could outlast them; the deadline bounds the whole call.
+        """
+        api = path.strip("/").split("/")[0]
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"Google Maps circuit open, skipping {api}")
+        metrics.inc("maps_requests_total", api=api)
+        started = time.perf_counter()
+        try:
+            response = await asyncio.wait_for(self._get_client().get(
+                path,
+                params={**params, "key": self.api_key},
+                timeout=timeout or self.timeout,
+            ), self.deadline)
+            response.raise_for_status()
+            result = response.json()
+        except (Exception, asyncio.CancelledError):
+            metrics.inc("maps_errors_total", api=api)
+            # Also on cancellation, so a cancelled half-open probe does not leave the circuit stuck
+            record_google_call(self.breaker, None, time.perf_counter() - started)
+            raise
+        if result.get("status") not in GOOGLE_OK_STATUSES:
+            metrics.inc("maps_errors_total", api=api)
+        record_google_call(self.breaker, result.get("status"), time.perf_counter() - started)
+        return result
+
+    @staticmethod
+    def _format_point(point: Tuple[float, float]) -> str:
+        return f"{point[0]},{point[1]}"
+
+    async def calculate_distance_matrix(self, origin: Tuple[float, float],
+                                        destination: Tuple[float, float],
+                                        timeout: Optional[float] = None) -> Optional[Dict]:
+        """Calculate distance and duration between two points"""
+        if self.enabled:
+            cached = self.cache.get(origin, destination)
+            if cached is not None:
+                return cached
+
+            try:
+                result = await self._get_json("/distancematrix/json", {
+                    "origins": self._format_point(origin),
+                    "destinations": self._format_point(destination),
+                    "mode": "driving",
+                    "units": "metric",
+                }, timeout)
+
+                if result['status'] == 'OK':
+                    element = result['rows'][0]['elements'][0]
+                    if element['status'] == 'OK':
+                        self.cache.set(origin, destination, element)
+                        return element
+            except CircuitOpenError:
+                pass
+            except Exception as e:
+                logger.error(f"Error calculating distance matrix: {e}")
+            return self.sync_service.fallback_estimate(origin, destination)
+
+        return self.sync_service.estimate_distance(origin, destination)
+
+    async def get_route_polyline(self, origin: Tuple[float, float],
+                                 destination: Tuple[float, float],
+                                 timeout: Optional[float] = None) -> Optional[str]:
+        """Get route polyline for map display"""
+        if not self.enabled:
+            return None
+
+        try:
+            result = await self._get_json("/directions/json", {
+                "origin": self._format_point(origin),
+                "destination": self._format_point(destination),
+                "mode": "driving",
+            }, timeout)
+
+            if result['status'] == 'OK' and result['routes']:
+                return result['routes'][0]['overview_polyline']['points']
+        except CircuitOpenError:
+            pass
+        except Exception as e:
+            logger.error(f"Error getting directions: {e}")
+
+        return None
+
+    async def get_route(self, origin: Tuple[float, float],
+                        destination: Tuple[float, float],
+                        timeout: Optional[float] = None) -> Tuple[Optional[Dict], Optional[str]]:
+        """Distance info and polyline from a single Directions request.
+
+        The route's leg carries the same distance and duration as a Distance
+        Matrix element, so a parcel costs one Google request rather than two.
+        """
+        if not self.enabled:
+            return self.sync_service.estimate_distance(origin, destination), None
+
+        try:
+            result = await self._get_json("/directions/json", {
+                "origin": self._format_point(origin),
+                "destination": self._format_point(destination),
+                "mode": "driving",
+                "units": "metric",
+            }, timeout)
+
+            if result['status'] == 'OK' and result['routes']:
+                route = result['routes'][0]
+                leg = route['legs'][0]
+                element = {'distance': leg['distance'], 'duration': leg['duration'], 'status': 'OK'}
+                self.cache.set(origin, destination, element)
+                return element, route['overview_polyline']['points']
+        except CircuitOpenError:
+            pass
+        except Exception as e:
+            logger.error(f"Error getting directions: {e}")
+
+        return self.sync_service.fallback_estimate(origin, destination), None
+
+    def calculate_quote(self, weight_category: str, distance_km: float) -> float:
+        return self.sync_service.calculate_quote(weight_category, distance_km)
+
+def create_maps_services(provider: str = MAPS_PROVIDER) -> Tuple[MapsService, AsyncMapsService]:
+    if provider == "graph":
+        from app.services.routing import RoadGraphMapsService, AsyncRoadGraphMapsService
+        service = RoadGraphMapsService.from_config()
+        return service, AsyncRoadGraphMapsService(service)
+    service = MapsService()
+    return service, AsyncMapsService(service)
 
-maps_service = MapsService()
+maps_service, async_maps_service = create_maps_services()
@@ -0,0 +1,276 @@
+import bisect
+import glob
+import json
+import logging
+import math
+import os
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Off unless asked for: the endpoint exposes route and dependency internals
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "false").lower() == "true"
+# Bearer token the scraper must send to /metrics; unset leaves it open, e.g. behind an internal-only listener
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+# Shared by every uvicorn worker on the host; unset for a single process
+METRICS_DIR = os.getenv("METRICS_DIR")
+METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", 5))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# name -> (type, help)
+METRICS = {
+    "http_request_duration_seconds": ("histogram", "Request latency by route template and status code"),
+    "http_requests_in_flight": ("gauge", "Requests currently being served"),
+    "db_pool_size": ("gauge", "Configured database connection pool size"),
+    "db_pool_checked_out": ("gauge", "Database connections currently checked out"),
+    "db_pool_overflow": ("gauge", "Database connections open beyond the pool size"),
+    "maps_cache_hits_total": ("counter", "Distance cache hits"),
+    "maps_cache_misses_total": ("counter", "Distance cache misses"),
+    "maps_cache_hit_ratio": ("gauge", "Distance cache hits per lookup"),
+    "maps_requests_total": ("counter", "Google Maps API requests by API"),
+    "maps_errors_total": ("counter", "Failed Google Maps API requests by API"),
+    "maps_circuit_open": ("gauge", "1 while the Google Maps circuit breaker is open or half-open"),
+    "maps_circuit_trips_total": ("counter", "Times the Google Maps circuit breaker has opened"),
+    "email_requests_total": ("counter", "SendGrid send requests"),
+    "email_errors_total": ("counter", "Failed SendGrid send requests"),
+}
+
+LabelKey = Tuple[Tuple[str, str], ...]
+MetricKey = Tuple[str, LabelKey]
+
+
+class _Shard:
+    """Metric values written by a single thread"""
+    __slots__ = ("counters", "histograms")
+
+    def __init__(self):
+        self.counters: Dict[MetricKey, float] = {}
+        # key -> per-bucket counts (last slot is +Inf), then sum
+        self.histograms: Dict[MetricKey, List[float]] = {}
+
+
+class MetricsRegistry:
+    """Process-local metrics with optional aggregation across worker processes.
+
+    Each thread updates its own shard, so recording takes no lock; shards are
+    only merged when the metrics are read. With ``directory`` set, every
+    worker periodically writes its snapshot to ``metrics-<pid>.json`` there
+    and a scrape served by any worker merges all of them: counters and
+    histograms from every file, gauges only from workers still running.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory
+        self._local = threading.local()
+        self._shards: List[_Shard] = []
+        self._shards_lock = threading.Lock()
+        self._collectors: List[Callable[[], Iterable[Tuple[str, Dict[str, str], float]]]] = []
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _shard(self) -> _Shard:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = _Shard()
+            with self._shards_lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+        return shard
+
+    @staticmethod
+    def _key(name: str, labels: Dict[str, str]) -> MetricKey:
+        return name, tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def inc(self, name: str, value: float = 1.0, **labels):
+        counters = self._shard().counters
+        key = self._key(name, labels)
+        counters[key] = counters.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        histograms = self._shard().histograms
+        key = self._key(name, labels)
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = histograms[key] = [0.0] * (len(LATENCY_BUCKETS) + 2)
+        histogram[bisect.bisect_left(LATENCY_BUCKETS, value)] += 1
+        histogram[-1] += value
+
+    def add_collector(self, collector: Callable[[], Iterable[Tuple[str, Dict[str, str], float]]]):
+        """Register a function returning (name, labels, value) samples read at snapshot time"""
+        self._collectors.append(collector)
+
+    # -- Snapshots ------------------------------------------------------
+
+    def snapshot(self) -> Dict:
+        """This process's values as JSON-serializable lists"""
+        counters: Dict[MetricKey, float] = {}
+        histograms: Dict[MetricKey, List[float]] = {}
+        with self._shards_lock:
+            shards = list(self._shards)
+        for shard in shards:
+            for key, value in list(shard.counters.items()):
+                counters[key] = counters.get(key, 0.0) + value
+            for key, values in list(shard.histograms.items()):
+                merged = histograms.setdefault(key, [0.0] * len(values))
+                for index, value in enumerate(values):
+                    merged[index] += value
+
+        gauges: Dict[MetricKey, float] = {}
+        for collector in self._collectors:
+            try:
+                samples = list(collector())
+            except Exception as e:
+                logger.error(f"Metrics collector failed: {e}")
+                continue
+            for name, labels, value in samples:
+                target = counters if METRICS[name][0] == "counter" else gauges
+                target[self._key(name, labels)] = value
+
+        return {
+            "pid": os.getpid(),
+            "counters": [[name, dict(labels), value] for (name, labels), value in counters.items()],
+            "histograms": [[name, dict(labels), values] for (name, labels), values in histograms.items()],
+            "gauges": [[name, dict(labels), value] for (name, labels), value in gauges.items()],
+        }
+
+    def _path(self, pid: int) -> str:
+        return os.path.join(self.directory, f"metrics-{pid}.json")
+
+    def flush(self):
+        """Write this worker's snapshot for the others to read"""
+        if not self.directory:
+            return
+        path = self._path(os.getpid())
+        temporary = f"{path}.tmp"
+        try:
+            with open(temporary, "w") as snapshot_file:
+                json.dump(self.snapshot(), snapshot_file)
+            os.replace(temporary, path)
+        except OSError as e:
+            logger.error(f"Failed to write metrics snapshot: {e}")
+
+    def snapshots(self) -> List[Tuple[Dict, bool]]:
+        """(snapshot, worker alive) for this process and every worker sharing the directory"""
+        own = self.snapshot()
+        result = [(own, True)]
+        if not self.directory:
+            return result
+        for path in glob.glob(os.path.join(self.directory, "metrics-*.json")):
+            try:
+                with open(path) as snapshot_file:
+                    snapshot = json.load(snapshot_file)
+            except (OSError, ValueError):
+                continue
+            if snapshot["pid"] != own["pid"]:
+                result.append((snapshot, pid_alive(snapshot["pid"])))
+        return result
+
+    # -- Exposition -----------------------------------------------------
+
+    def render(self) -> str:
+        """All workers' metrics in the Prometheus text format"""
+        counters: Dict[MetricKey, float] = {}
+        histograms: Dict[MetricKey, List[float]] = {}
+        gauges: Dict[MetricKey, float] = {}
+        for snapshot, alive in self.snapshots():
+            for name, labels, value in snapshot["counters"]:
+                key = self._key(name, labels)
+                counters[key] = counters.get(key, 0.0) + value
+            for name, labels, values in snapshot["histograms"]:
+                merged = histograms.setdefault(self._key(name, labels), [0.0] * len(values))
+                for index, value in enumerate(values):
+                    merged[index] += value
+            if alive:
+                for name, labels, value in snapshot["gauges"]:
+                    key = self._key(name, labels)
+                    gauges[key] = gauges.get(key, 0.0) + value
+
+        hits = counters.get(("maps_cache_hits_total", ()), 0.0)
+        misses = counters.get(("maps_cache_misses_total", ()), 0.0)
+        gauges[("maps_cache_hit_ratio", ())] = hits / (hits + misses) if hits + misses else 0.0
+
+        # name -> [(labels, lines)], so histogram buckets keep their order
+        samples: Dict[str, List[Tuple[LabelKey, List[str]]]] = {}
+        for (name, labels), value in list(counters.items()) + list(gauges.items()):
+            samples.setdefault(name, []).append(
+                (labels, [f"{name}{format_labels(labels)} {format_value(value)}"])
+            )
+        for (name, labels), values in histograms.items():
+            lines = []
+            cumulative = 0.0
+            for bound, count in zip(LATENCY_BUCKETS + (math.inf,), values[:-1]):
+                cumulative += count
+                le = "+Inf" if bound == math.inf else repr(bound)
+                lines.append(f"{name}_bucket{format_labels(labels + (('le', le),))} {format_value(cumulative)}")
+            lines.append(f"{name}_sum{format_labels(labels)} {format_value(values[-1])}")
+            lines.append(f"{name}_count{format_labels(labels)} {format_value(cumulative)}")
+            samples.setdefault(name, []).append((labels, lines))
+
+        output = []
+        for name, (kind, description) in METRICS.items():
+            if name not in samples:
+                continue
+            output.append(f"# HELP {name} {description}")
+            output.append(f"# TYPE {name} {kind}")
+            for _, lines in sorted(samples[name], key=lambda series: series[0]):
+                output.extend(lines)
+        return "\n".join(output) + "\n"
+
+    # -- Background flushing --------------------------------------------
+
+    def start(self):
+        """Remove snapshots of exited workers and start flushing this one's"""
+        if not self.directory or (self._thread is not None and self._thread.is_alive()):
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        for path in glob.glob(os.path.join(self.directory, "metrics-*.json")):
+            pid = int(os.path.basename(path)[len("metrics-"):-len(".json")])
+            if pid != os.getpid() and not pid_alive(pid):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="metrics-flush", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(METRICS_FLUSH_SECONDS):
+            self.flush()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.flush()
+
+
+def pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def format_labels(labels: Iterable[Tuple[str, str]]) -> str:
+    pairs = [
+        f'{key}="' + value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+        for key, value in labels
+    ]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+metrics = MetricsRegistry(METRICS_DIR)
@@ -0,0 +1,110 @@
+from typing import List, Optional, Tuple
+import numpy as np
+from sqlalchemy import and_, bindparam, or_, select, update
+from sqlalchemy.orm import Session
+from app.models.parcel import Parcel, ParcelStatus
+from app.services.geohash import bounding_box, covering_cells, encode, prefix_range
+from app.services.maps import DistanceEngine
+from app.services.parcel_query import list_columns
+
+BACKFILL_BATCH_SIZE = 1000
+# Searches start at radius / 2**NEARBY_EXPANSIONS and double until enough parcels are found
+NEARBY_EXPANSIONS = 3
+
+
+def find_nearby(db: Session, lat: float, lng: float, radius_m: float, fields: List[str],
+                point: str = "pickup", statuses: Optional[List[str]] = None, limit: int = 50) -> List[dict]:
+    """Parcels whose pickup (or destination) lies within ``radius_m``, nearest first.
+
+    Candidates come from index range scans over the geohash cells covering the
+    circle, cut down to its bounding box inside the index. Exact great-circle
+    distances then drop the corners and pick the nearest ``limit``, and only
+    those rows are loaded. In dense areas a smaller circle already holds
+    ``limit`` parcels, which are then the nearest overall, so the search
+    starts small and widens.
+    """
+    search_radius = radius_m / 2 ** NEARBY_EXPANSIONS
+    while True:
+        search_radius = min(search_radius * 2, radius_m)
+        ids, distances = nearby_candidates(db, lat, lng, search_radius, point, statuses)
+        if len(ids) >= limit or search_radius >= radius_m:
+            break
+
+    nearest = np.argsort(distances, kind="stable")[:limit]
+    if not len(nearest):
+        return []
+
+    distance_by_id = dict(zip(ids[nearest].tolist(), distances[nearest].tolist()))
+    rows = db.execute(
+        select(*list_columns(fields), Parcel.id.label("_id")).where(Parcel.id.in_(distance_by_id))
+    ).all()
+    results = [
+        {**dict(zip(fields, row)), "distance_m": round(distance_by_id[row._id], 1)} for row in rows
+    ]
+    results.sort(key=lambda parcel: parcel["distance_m"])
+    return results
+
+
+def nearby_candidates(db: Session, lat: float, lng: float, radius_m: float,
+                      point: str, statuses: Optional[List[str]]) -> Tuple[np.ndarray, np.ndarray]:
+    """(ids, distances) of every parcel within ``radius_m``, in no particular order"""
+    geohash_column = Parcel.pickup_geohash if point == "pickup" else Parcel.destination_geohash
+    lat_column, lng_column = (
+        (Parcel.pickup_lat, Parcel.pickup_lng) if point == "pickup"
+        else (Parcel.destination_lat, Parcel.destination_lng)
+    )
+    # Listing every status keeps the (status, geohash) index usable without a status filter
+    statuses = statuses or [status.value for status in ParcelStatus]
+    ranges = [
+        and_(geohash_column >= low, geohash_column < high)
+        for low, high in map(prefix_range, covering_cells(lat, lng, radius_m))
+    ]
+    south, west, north, east = bounding_box(lat, lng, radius_m)
+
+    candidates = db.execute(
+        select(Parcel.id, lat_column, lng_column)
+        .where(
+            Parcel.status.in_(statuses), or_(*ranges),
+            lat_column.between(south, north), lng_column.between(west, east)
+        )
+    ).all()
+    if not candidates:
+        return np.array([], dtype=np.int64), np.array([])
+
+    ids, lats, lngs = (np.array(column) for column in zip(*candidates))
+    distances = DistanceEngine.haversine_m(
+        np.column_stack([np.full(len(lats), lat), np.full(len(lngs), lng)]),
+        np.column_stack([lats.astype(float), lngs.astype(float)])
+    )
+    within = distances <= radius_m
+    return ids[within], distances[within]
+
+
+def backfill_geohashes(db: Session):
+    """Fill geohash columns for parcels stored before they existed"""
+    while True:
+        rows = db.execute(
+            select(Parcel.id, Parcel.pickup_lat, Parcel.pickup_lng, Parcel.destination_lat, Parcel.destination_lng)
+            .where(or_(Parcel.pickup_geohash.is_(None), Parcel.destination_geohash.is_(None)))
+            .limit(BACKFILL_BATCH_SIZE)
+        ).all()
+        if not rows:
+            return
+        table = Parcel.__table__
+        db.connection().execute(
+            update(table).where(table.c.id == bindparam("parcel_id")).values(
+                pickup_geohash=bindparam("pickup"),
+                destination_geohash=bindparam("destination"),
+                # Not a change to the parcel; leave updated_at and ETags alone
+                updated_at=table.c.updated_at,
+            ),
+            [
+                {
+                    "parcel_id": row.id,
+                    "pickup": encode(row.pickup_lat, row.pickup_lng),
+                    "destination": encode(row.destination_lat, row.destination_lng),
+                }
+                for row in rows
+            ]
+        )
+        db.commit()
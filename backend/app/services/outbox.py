@@ -0,0 +1,213 @@
+import logging
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from app.database.database import SessionLocal
+from app.models.outbox import EmailOutbox, NotificationKind, OutboxStatus
+from app.services.email import email_service, format_status, SENDGRID_MAX_PERSONALIZATIONS
+
+load_dotenv()
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+EMAIL_OUTBOX_WORKER_ENABLED = os.getenv("EMAIL_OUTBOX_WORKER_ENABLED", "true").lower() == "true"
+EMAIL_OUTBOX_BATCH_SIZE = int(os.getenv("EMAIL_OUTBOX_BATCH_SIZE", 100))
+EMAIL_OUTBOX_POLL_SECONDS = float(os.getenv("EMAIL_OUTBOX_POLL_SECONDS", 2))
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv("EMAIL_OUTBOX_MAX_ATTEMPTS", 5))
+EMAIL_OUTBOX_BACKOFF_SECONDS = int(os.getenv("EMAIL_OUTBOX_BACKOFF_SECONDS", 30))
+EMAIL_OUTBOX_MAX_BACKOFF_SECONDS = 3600
+# Updates to the same parcel within this window go out as one message
+EMAIL_COALESCE_SECONDS = float(os.getenv("EMAIL_COALESCE_SECONDS", 10))
+
+
+def _send_after():
+    return datetime.now(timezone.utc) + timedelta(seconds=EMAIL_COALESCE_SECONDS)
+
+
+def enqueue_status_update(db: Session, to_email: str, parcel_id: int, new_status: str):
+    """Queue a status notification in the caller's transaction"""
+    db.add(EmailOutbox(
+        to_email=to_email, parcel_id=parcel_id,
+        kind=NotificationKind.status, value=new_status,
+        next_attempt_at=_send_after()
+    ))
+
+def enqueue_location_update(db: Session, to_email: str, parcel_id: int, new_location: str):
+    """Queue a location notification in the caller's transaction"""
+    db.add(EmailOutbox(
+        to_email=to_email, parcel_id=parcel_id,
+        kind=NotificationKind.location, value=new_location,
+        next_attempt_at=_send_after()
+    ))
+
+def enqueue_bulk(db: Session, notifications: List[Tuple[str, int, NotificationKind, str]]):
+    """Queue (to_email, parcel_id, kind, value) notifications with one multi-row insert"""
+    if not notifications:
+        return
+    send_after = _send_after()
+    db.execute(insert(EmailOutbox), [
+        {
+            "to_email": to_email, "parcel_id": parcel_id, "kind": kind, "value": value,
+            "next_attempt_at": send_after,
+        }
+        for to_email, parcel_id, kind, value in notifications
+    ])
+
+
+class OutboxWorker:
+    """Drains the email outbox in batches on a background thread.
+
+    Pending updates for the same parcel and recipient are merged into one
+    message, and messages covering the same kind of change are sent together
+    as one multi-recipient request. Failed sends are retried with exponential
+    backoff until ``max_attempts`` is reached. ``transport`` is anything with
+    ``send_batch`` (the SendGrid-backed EmailService or LocalEmailTransport).
+    """
+
+    def __init__(self, session_factory=SessionLocal, transport=None,
+                 batch_size: int = EMAIL_OUTBOX_BATCH_SIZE,
+                 poll_seconds: float = EMAIL_OUTBOX_POLL_SECONDS,
+                 max_attempts: int = EMAIL_OUTBOX_MAX_ATTEMPTS,
+                 backoff_seconds: int = EMAIL_OUTBOX_BACKOFF_SECONDS):
+        self.session_factory = session_factory
+        self.transport = transport or email_service
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def drain_once(self) -> int:
+        """Process one batch of due messages; returns how many were handled"""
+        now = datetime.now(timezone.utc)
+        db = self.session_factory()
+        try:
+            due = (
+                db.query(EmailOutbox)
+                .filter(EmailOutbox.status == OutboxStatus.pending, EmailOutbox.next_attempt_at <= now)
+                .order_by(EmailOutbox.id)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+                .all()
+            )
+            if not due:
+                return 0
+
+            # Pull in later updates for the same parcel and recipient so they are merged
+            keys = {(entry.to_email, entry.parcel_id) for entry in due}
+            later = (
+                db.query(EmailOutbox)
+                .filter(
+                    EmailOutbox.status == OutboxStatus.pending,
+                    EmailOutbox.parcel_id.in_({parcel_id for _, parcel_id in keys}),
+                    EmailOutbox.id.notin_([entry.id for entry in due]),
+                )
+                .with_for_update(skip_locked=True)
+                .all()
+            )
+            entries = due + [entry for entry in later if (entry.to_email, entry.parcel_id) in keys]
+
+            self.deliver(entries, now)
+            db.commit()
+            return len(due)
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error draining email outbox: {e}")
+            return 0
+        finally:
+            db.close()
+
+    def deliver(self, entries: List[EmailOutbox], now: datetime):
+        """Coalesce entries per parcel/recipient and send them as batch messages"""
+        groups: Dict[Tuple[str, int], List[EmailOutbox]] = {}
+        for entry in sorted(entries, key=lambda e: e.id):
+            groups.setdefault((entry.to_email, entry.parcel_id), []).append(entry)
+
+        # Messages with the same set of changes share one template
+        batches: Dict[Tuple[bool, bool], list] = {}
+        for (to_email, parcel_id), group in groups.items():
+            status = location = None
+            for entry in group:
+                if entry.kind == NotificationKind.status:
+                    status = entry.value
+                else:
+                    location = entry.value
+
+            substitutions = {"-parcel_id-": str(parcel_id)}
+            if status is not None:
+                substitutions["-status-"] = format_status(status)
+            if location is not None:
+                substitutions["-location-"] = location
+            batches.setdefault((status is not None, location is not None), []).append(
+                (to_email, group, substitutions)
+            )
+
+        for (has_status, has_location), messages in batches.items():
+            subject, content = email_service.render_parcel_update(
+                "-parcel_id-",
+                status_text="-status-" if has_status else None,
+                location="-location-" if has_location else None,
+            )
+
+            if not getattr(self.transport, "enabled", True):
+                # Nothing to retry against; log the messages and move on
+                self.transport.send_batch(subject, content, [(m[0], m[2]) for m in messages])
+                for _, group, _ in messages:
+                    for entry in group:
+                        entry.status = OutboxStatus.skipped
+                continue
+
+            for i in range(0, len(messages), SENDGRID_MAX_PERSONALIZATIONS):
+                chunk = messages[i:i + SENDGRID_MAX_PERSONALIZATIONS]
+                try:
+                    sent = self.transport.send_batch(subject, content, [(m[0], m[2]) for m in chunk])
+                    error = None if sent else "transport rejected message"
+                except Exception as e:
+                    sent, error = False, str(e)
+
+                for _, group, _ in chunk:
+                    for entry in group:
+                        self.record_attempt(entry, sent, error, now)
+
+    def record_attempt(self, entry: EmailOutbox, sent: bool, error: Optional[str], now: datetime):
+        entry.attempts += 1
+        if sent:
+            entry.status = OutboxStatus.sent
+            entry.sent_at = now
+            entry.last_error = None
+        elif entry.attempts >= self.max_attempts:
+            entry.status = OutboxStatus.failed
+            entry.last_error = error
+            logger.error(f"Giving up on outbox message {entry.id} to {entry.to_email}: {error}")
+        else:
+            delay = min(self.backoff_seconds * 2 ** (entry.attempts - 1), EMAIL_OUTBOX_MAX_BACKOFF_SECONDS)
+            entry.next_attempt_at = now + timedelta(seconds=delay)
+            entry.last_error = error
+
+    def run(self):
+        while not self._stop.is_set():
+            handled = self.drain_once()
+            # Keep going while there is a backlog, otherwise wait for the next poll
+            if handled < self.batch_size:
+                self._stop.wait(self.poll_seconds)
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, name="email-outbox", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+outbox_worker = OutboxWorker()
@@ -0,0 +1,141 @@
+import base64
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from fastapi import HTTPException, Query, status
+from sqlalchemy import func, tuple_
+from app.models.parcel import Parcel
+from app.schemas.parcel import ParcelStatus, WeightCategory
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+# Columns served by the list endpoints, keyed by response field name
+LIST_FIELDS: Dict[str, object] = {
+    column.key: column for column in (
+        Parcel.id, Parcel.user_id,
+        Parcel.pickup_address, Parcel.destination_address,
+        Parcel.pickup_lat, Parcel.pickup_lng, Parcel.destination_lat, Parcel.destination_lng,
+        Parcel.weight_category, Parcel.quote_amount, Parcel.quote_is_estimate, Parcel.status,
+        Parcel.present_location, Parcel.distance_km, Parcel.duration_mins,
+        Parcel.created_at, Parcel.updated_at,
+    )
+}
+
+
+@dataclass
+class ParcelFilters:
+    """Server-side filters shared by the parcel list and export endpoints"""
+    status: Optional[ParcelStatus] = None
+    weight_category: Optional[WeightCategory] = None
+    created_from: Optional[datetime] = None
+    created_to: Optional[datetime] = None
+
+    def conditions(self) -> list:
+        conditions = []
+        if self.status:
+            conditions.append(Parcel.status == self.status.value)
+        if self.weight_category:
+            conditions.append(Parcel.weight_category == self.weight_category.value)
+        if self.created_from:
+            conditions.append(Parcel.created_at >= self.created_from)
+        if self.created_to:
+            conditions.append(Parcel.created_at < self.created_to)
+        return conditions
+
+
+def parcel_filters(
+    status: Optional[ParcelStatus] = None,
+    weight_category: Optional[WeightCategory] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+) -> ParcelFilters:
+    return ParcelFilters(status, weight_category, created_from, created_to)
+
+
+@dataclass
+class Page:
+    """Keyset pagination on (created_at, id)"""
+    limit: int = DEFAULT_PAGE_SIZE
+    cursor: Optional[Tuple[datetime, int]] = None
+    descending: bool = True
+
+    def apply(self, query):
+        if self.cursor:
+            position = tuple_(Parcel.created_at, Parcel.id)
+            after = position < self.cursor if self.descending else position > self.cursor
+            query = query.filter(after)
+        if self.descending:
+            query = query.order_by(Parcel.created_at.desc(), Parcel.id.desc())
+        else:
+            query = query.order_by(Parcel.created_at.asc(), Parcel.id.asc())
+        # One extra row tells us whether there is a next page
+        return query.limit(self.limit + 1)
+
+    def next_cursor(self, rows: List) -> Optional[str]:
+        """Trim the look-ahead row; returns the cursor for the next page, if any"""
+        if len(rows) <= self.limit:
+            return None
+        del rows[self.limit:]
+        last = rows[-1]
+        return encode_cursor(last.created_at, last.id)
+
+# Last time a parcel changed; the versions behind the ETags use it
+LAST_CHANGED = func.coalesce(Parcel.updated_at, Parcel.created_at)
+
+
+def field_params(
+    fields: Optional[str] = Query(None, description="Comma-separated subset of parcel fields to return"),
+) -> List[str]:
+    """Sparse fieldset for the list endpoints; every list field by default"""
+    if not fields:
+        return list(LIST_FIELDS)
+    names = list(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in names if name not in LIST_FIELDS]
+    if unknown or not names:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(unknown)}" if unknown else "No fields requested"
+        )
+    return names
+
+
+def list_columns(names: List[str]) -> list:
+    """Columns to select for the requested fields, plus the keyset columns"""
+    extra = [name for name in ("created_at", "id") if name not in names]
+    return [LIST_FIELDS[name] for name in names + extra]
+
+
+def rows_to_dicts(rows, names: List[str]) -> List[dict]:
+    """Requested fields of each row; enums and datetimes are left to the encoder"""
+    return [dict(zip(names, row)) for row in rows]
+
+
+def encode_cursor(created_at: datetime, parcel_id: int) -> str:
+    raw = json.dumps([created_at.isoformat(), parcel_id])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, parcel_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), int(parcel_id)
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
+def page_params(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+) -> Page:
+    return Page(
+        limit=limit,
+        cursor=decode_cursor(cursor) if cursor else None,
+        descending=order == "desc",
+    )
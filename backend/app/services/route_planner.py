@@ -0,0 +1,186 @@
+import os
+import time
+from dataclasses import dataclass
+from typing import List
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+ROUTE_PLAN_TIME_LIMIT_SECONDS = float(os.getenv("ROUTE_PLAN_TIME_LIMIT_SECONDS", 2))
+
+# Courier capacity is counted in these units per parcel
+WEIGHT_UNITS = {
+    "small": 1,
+    "medium": 2,
+    "large": 4
+}
+OR_OPT_SEGMENT_LENGTHS = (1, 2, 3)
+IMPROVEMENT_EPSILON = 1e-6
+
+
+@dataclass
+class RoutePlan:
+    """Routes as lists of matrix indices (the depot, index 0, is implied at both ends)"""
+    routes: List[List[int]]
+    distance: float
+    construction_distance: float
+    moves: int
+
+
+def route_cost(cost: np.ndarray, route: List[int]) -> float:
+    path = [0] + route + [0]
+    return float(cost[path[:-1], path[1:]].sum())
+
+
+def savings_routes(cost: np.ndarray, demands: np.ndarray, capacity: float) -> List[List[int]]:
+    """Clarke-Wright savings construction for a possibly asymmetric cost matrix.
+
+    Every stop starts on its own depot round trip; the route ending at ``i``
+    is joined to the route starting at ``j`` in order of the saving
+    cost[i, 0] + cost[0, j] - cost[i, j], while the joined load fits.
+    """
+    stops = np.arange(1, len(cost))
+    savings = cost[1:, :1] + cost[:1, 1:] - cost[1:, 1:]
+    np.fill_diagonal(savings, -np.inf)
+    firsts, seconds = np.nonzero(savings > 0)
+    order = np.argsort(-savings[firsts, seconds], kind="stable")
+    candidates = zip((firsts[order] + 1).tolist(), (seconds[order] + 1).tolist())
+
+    routes = {stop: [stop] for stop in stops.tolist()}
+    route_of = {stop: stop for stop in stops.tolist()}
+    loads = {stop: float(demands[stop]) for stop in stops.tolist()}
+    for first, second in candidates:
+        left, right = route_of[first], route_of[second]
+        if left == right or routes[left][-1] != first or routes[right][0] != second:
+            continue
+        if loads[left] + loads[right] > capacity:
+            continue
+        for stop in routes[right]:
+            route_of[stop] = left
+        routes[left].extend(routes.pop(right))
+        loads[left] += loads.pop(right)
+    return list(routes.values())
+
+
+def two_opt(cost: np.ndarray, route: List[int]) -> int:
+    """Reverse the best segment of ``route`` in place until none shortens it.
+
+    Reversal deltas include the reversed segment's own cost, so one-way
+    asymmetries are respected. Returns the number of reversals applied.
+    """
+    moves = 0
+    while len(route) > 2:
+        path = np.array([0] + route + [0])
+        forward = np.concatenate(([0.0], np.cumsum(cost[path[:-1], path[1:]])))
+        backward = np.concatenate(([0.0], np.cumsum(cost[path[1:], path[:-1]])))
+        starts, ends = np.triu_indices(len(path) - 2, 1)
+        starts, ends = starts + 1, ends + 1
+        delta = (cost[path[starts - 1], path[ends]] + cost[path[starts], path[ends + 1]]
+                 - cost[path[starts - 1], path[starts]] - cost[path[ends], path[ends + 1]]
+                 + (backward[ends] - backward[starts]) - (forward[ends] - forward[starts]))
+        best = int(np.argmin(delta))
+        if delta[best] >= -IMPROVEMENT_EPSILON:
+            break
+        start, end = int(starts[best]) - 1, int(ends[best])
+        route[start:end] = route[start:end][::-1]
+        moves += 1
+    return moves
+
+
+def or_opt(cost: np.ndarray, routes: List[List[int]], demands: np.ndarray,
+           capacity: float, deadline: float) -> int:
+    """Move chains of 1-3 consecutive stops to their cheapest position in any route.
+
+    Each move is the best insertion for one chain and must fit the target
+    route's load. Returns the number of moves applied.
+    """
+    moves = 0
+    edges = SolutionEdges(routes, demands)
+    for length in OR_OPT_SEGMENT_LENGTHS:
+        route_index = 0
+        while route_index < len(routes):
+            position = 0
+            while position + length <= len(routes[route_index]):
+                if time.perf_counter() > deadline:
+                    return moves
+                if relocate_segment(cost, routes, demands, capacity, edges, route_index, position, length):
+                    moves += 1
+                    edges = SolutionEdges(routes, demands)
+                    if route_index >= len(routes):
+                        break
+                else:
+                    position += 1
+            route_index += 1
+    return moves
+
+
+class SolutionEdges:
+    """Every edge of the current routes as arrays, with the route each belongs to"""
+
+    def __init__(self, routes: List[List[int]], demands: np.ndarray):
+        paths = [np.array([0] + route + [0]) for route in routes]
+        self.froms = np.concatenate([path[:-1] for path in paths])
+        self.tos = np.concatenate([path[1:] for path in paths])
+        self.owners = np.repeat(np.arange(len(routes)), [len(path) - 1 for path in paths])
+        self.loads = np.array([demands[route].sum() for route in routes])
+
+
+def relocate_segment(cost: np.ndarray, routes: List[List[int]], demands: np.ndarray, capacity: float,
+                     edges: SolutionEdges, route_index: int, position: int, length: int) -> bool:
+    route = routes[route_index]
+    segment = route[position:position + length]
+    first, last = segment[0], segment[-1]
+    before = route[position - 1] if position else 0
+    after = route[position + length] if position + length < len(route) else 0
+    removal_gain = cost[before, first] + cost[last, after] - cost[before, after]
+
+    froms, tos, owners = edges.froms, edges.tos, edges.owners
+    delta = cost[froms, first] + cost[last, tos] - cost[froms, tos] - removal_gain
+    over_capacity = edges.loads[owners] + demands[segment].sum() > capacity
+    # Within its own route the load is unchanged, but the segment's own edges are no insertion point
+    own = owners == route_index
+    delta[np.where(own, np.isin(froms, segment) | np.isin(tos, segment), over_capacity)] = np.inf
+    best = int(np.argmin(delta))
+    if delta[best] >= -IMPROVEMENT_EPSILON:
+        return False
+
+    target_index, target_to = int(owners[best]), int(tos[best])
+    del route[position:position + length]
+    target = routes[target_index]
+    # Insert before the edge's end, or at the end when it returns to the depot
+    insert_at = target.index(target_to) if target_to else len(target)
+    target[insert_at:insert_at] = segment
+    if not route:
+        routes.pop(route_index)
+    return True
+
+
+def plan_routes(cost: np.ndarray, demands: np.ndarray, capacity: float,
+                time_limit: float = ROUTE_PLAN_TIME_LIMIT_SECONDS) -> RoutePlan:
+    """Capacitated vehicle routes from the depot (index 0) through every other index.
+
+    Savings construction gives the starting routes; 2-opt and or-opt passes
+    then run until nothing improves or ``time_limit`` seconds have passed.
+    ``demands[0]`` (the depot) is ignored and no single demand may exceed
+    ``capacity``.
+    """
+    deadline = time.perf_counter() + time_limit
+    demands = np.asarray(demands, dtype=float)
+    routes = savings_routes(cost, demands, capacity)
+    construction_distance = sum(route_cost(cost, route) for route in routes)
+
+    moves = 0
+    while time.perf_counter() < deadline:
+        improved = sum(two_opt(cost, route) for route in routes)
+        improved += or_opt(cost, routes, demands, capacity, deadline)
+        moves += improved
+        if not improved:
+            break
+
+    return RoutePlan(
+        routes=routes,
+        distance=sum(route_cost(cost, route) for route in routes),
+        construction_distance=construction_distance,
+        moves=moves
+    )
@@ -0,0 +1,561 @@
+import asyncio
+import heapq
+import json
+import logging
+import math
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from dotenv import load_dotenv
+from app.services.maps import (
+    AsyncMapsService, DistanceCache, DistanceEngine, MapsService,
+    EARTH_RADIUS_M, format_distance, format_duration
+)
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+ROAD_GRAPH_PATH = os.getenv("ROAD_GRAPH_PATH")
+ROAD_GRAPH_CACHE_DIR = os.getenv("ROAD_GRAPH_CACHE_DIR")
+ROAD_GRAPH_MAX_SNAP_METERS = float(os.getenv("ROAD_GRAPH_MAX_SNAP_METERS", 2000))
+
+# Bump when the cached array layout changes
+GRAPH_CACHE_VERSION = 1
+GRAPH_ARRAYS = ("node_lat", "node_lng", "indptr", "indices", "edge_length", "edge_time",
+                "cell_keys", "cell_starts", "cell_nodes")
+SNAP_CELL_DEGREES = 0.01  # ~1.1 km
+
+# Average speeds by OSM highway class when a way has no usable maxspeed
+HIGHWAY_SPEEDS_KMH = {
+    "motorway": 100, "motorway_link": 60,
+    "trunk": 80, "trunk_link": 50,
+    "primary": 60, "primary_link": 40,
+    "secondary": 50, "secondary_link": 35,
+    "tertiary": 40, "tertiary_link": 30,
+    "unclassified": 30, "residential": 25, "living_street": 10, "service": 15,
+}
+DEFAULT_SPEED_KMH = 30
+# Travel from the requested point to the nearest road node
+SNAP_SPEED_KMH = 15
+
+
+def haversine(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Great-circle distance in metres between two points"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lng2 - lng1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(min(1.0, a)))
+
+
+def encode_polyline(points: Iterable[Tuple[float, float]]) -> str:
+    """Google encoded polyline (precision 5) for (lat, lng) points"""
+    result = []
+    previous_lat = previous_lng = 0
+    for lat, lng in points:
+        lat, lng = int(round(lat * 1e5)), int(round(lng * 1e5))
+        for delta in (lat - previous_lat, lng - previous_lng):
+            value = ~(delta << 1) if delta < 0 else delta << 1
+            while value >= 0x20:
+                result.append(chr((0x20 | (value & 0x1f)) + 63))
+                value >>= 5
+            result.append(chr(value + 63))
+        previous_lat, previous_lng = lat, lng
+    return "".join(result)
+
+
+def way_speed_kmh(properties: Dict) -> float:
+    maxspeed = str(properties.get("maxspeed") or "").split(" ")[0]
+    if maxspeed.isdigit() and int(maxspeed) > 0:
+        return float(maxspeed)
+    return float(HIGHWAY_SPEEDS_KMH.get(properties.get("highway"), DEFAULT_SPEED_KMH))
+
+
+def way_directions(properties: Dict) -> Tuple[bool, bool]:
+    """(forward, backward) travel allowed along a way's coordinate order"""
+    oneway = str(properties.get("oneway", "no")).lower()
+    if oneway in ("yes", "true", "1"):
+        return True, False
+    if oneway == "-1":
+        return False, True
+    return True, True
+
+
+def cell_key(lat, lng):
+    """Snapping grid cell of a point; works on scalars and arrays"""
+    row = np.floor(np.asarray(lat) / SNAP_CELL_DEGREES).astype(np.int64) + (1 << 20)
+    col = np.floor(np.asarray(lng) / SNAP_CELL_DEGREES).astype(np.int64) + (1 << 20)
+    return (row << 32) | col
+
+
+class RoadGraph:
+    """Directed road network in CSR form with a grid snapping index.
+
+    Node ``n``'s outgoing edges are ``indices[indptr[n]:indptr[n + 1]]`` with
+    lengths in metres and travel times in seconds in the matching slots of
+    ``edge_length``/``edge_time``. Nodes are bucketed into grid cells
+    (``cell_keys`` sorted, ``cell_nodes[cell_starts[i]:cell_starts[i + 1]]``)
+    for nearest-node lookups. All arrays can be memory-mapped from a cache
+    directory written by ``save``.
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        for name in GRAPH_ARRAYS:
+            setattr(self, name, arrays[name])
+        self.node_count = len(self.node_lat)
+        # Fastest speed in the graph keeps the A* heuristic admissible
+        self.max_speed_mps = float(np.max(self.edge_length / np.maximum(self.edge_time, 1e-9))) \
+            if len(self.edge_time) else 1.0
+
+    # -- Building -------------------------------------------------------
+
+    @classmethod
+    def from_geojson(cls, path: str) -> "RoadGraph":
+        """Build from a GeoJSON FeatureCollection of LineString/MultiLineString ways.
+
+        Properties follow OSM tags: ``highway``, ``maxspeed`` and ``oneway``.
+        An OSM extract can be converted with e.g.
+        ``osmium export region.osm.pbf -o roads.geojson``.
+        """
+        with open(path) as f:
+            collection = json.load(f)
+
+        node_ids: Dict[Tuple[float, float], int] = {}
+        lats: List[float] = []
+        lngs: List[float] = []
+        sources: List[int] = []
+        targets: List[int] = []
+        lengths: List[float] = []
+        times: List[float] = []
+
+        def node(lng: float, lat: float) -> int:
+            key = (round(lat, 7), round(lng, 7))
+            index = node_ids.get(key)
+            if index is None:
+                index = node_ids[key] = len(lats)
+                lats.append(key[0])
+                lngs.append(key[1])
+            return index
+
+        for feature in collection.get("features", []):
+            geometry = feature.get("geometry") or {}
+            properties = feature.get("properties") or {}
+            if geometry.get("type") == "LineString":
+                lines = [geometry["coordinates"]]
+            elif geometry.get("type") == "MultiLineString":
+                lines = geometry["coordinates"]
+            else:
+                continue
+
+            speed_mps = way_speed_kmh(properties) / 3.6
+            forward, backward = way_directions(properties)
+            for line in lines:
+                points = [node(point[0], point[1]) for point in line]
+                for a, b in zip(points, points[1:]):
+                    if a == b:
+                        continue
+                    length = haversine(lats[a], lngs[a], lats[b], lngs[b])
+                    for source, target, allowed in ((a, b, forward), (b, a, backward)):
+                        if allowed:
+                            sources.append(source)
+                            targets.append(target)
+                            lengths.append(length)
+                            times.append(length / speed_mps)
+
+        return cls.from_edges(np.array(lats), np.array(lngs), np.array(sources, dtype=np.int64),
+                              np.array(targets, dtype=np.int64), np.array(lengths), np.array(times))
+
+    @classmethod
+    def from_edges(cls, lats: np.ndarray, lngs: np.ndarray, sources: np.ndarray, targets: np.ndarray,
+                   lengths: np.ndarray, times: np.ndarray) -> "RoadGraph":
+        # Keep the largest connected piece so points never snap onto isolated fragments
+        keep = cls._largest_component(len(lats), sources, targets)
+        remap = np.full(len(lats), -1, dtype=np.int64)
+        remap[keep] = np.arange(len(keep))
+        edge_mask = (remap[sources] >= 0) & (remap[targets] >= 0)
+        sources, targets = remap[sources[edge_mask]], remap[targets[edge_mask]]
+        lengths, times = lengths[edge_mask], times[edge_mask]
+        lats, lngs = lats[keep], lngs[keep]
+
+        order = np.argsort(sources, kind="stable")
+        indptr = np.zeros(len(lats) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=len(lats)), out=indptr[1:])
+
+        keys = cell_key(lats, lngs)
+        node_order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[node_order]
+        cell_keys, cell_starts = np.unique(sorted_keys, return_index=True)
+
+        return cls({
+            "node_lat": lats.astype(np.float64),
+            "node_lng": lngs.astype(np.float64),
+            "indptr": indptr,
+            "indices": targets[order].astype(np.int32),
+            "edge_length": lengths[order].astype(np.float32),
+            "edge_time": times[order].astype(np.float32),
+            "cell_keys": cell_keys,
+            "cell_starts": np.append(cell_starts, len(sorted_keys)).astype(np.int64),
+            "cell_nodes": node_order.astype(np.int32),
+        })
+
+    @staticmethod
+    def _largest_component(node_count: int, sources: np.ndarray, targets: np.ndarray) -> np.ndarray:
+        """Nodes of the largest weakly connected component"""
+        neighbours: List[List[int]] = [[] for _ in range(node_count)]
+        for a, b in zip(sources.tolist(), targets.tolist()):
+            neighbours[a].append(b)
+            neighbours[b].append(a)
+
+        labels = [-1] * node_count
+        best_label, best_size = -1, 0
+        for start in range(node_count):
+            if labels[start] != -1:
+                continue
+            labels[start] = start
+            stack, size = [start], 0
+            while stack:
+                current = stack.pop()
+                size += 1
+                for neighbour in neighbours[current]:
+                    if labels[neighbour] == -1:
+                        labels[neighbour] = start
+                        stack.append(neighbour)
+            if size > best_size:
+                best_label, best_size = start, size
+        return np.flatnonzero(np.array(labels) == best_label)
+
+    # -- Cache ----------------------------------------------------------
+
+    @staticmethod
+    def source_signature(source_path: str) -> Dict:
+        stat = os.stat(source_path)
+        return {
+            "version": GRAPH_CACHE_VERSION,
+            "source": os.path.abspath(source_path),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+        }
+
+    def save(self, cache_dir: str, signature: Dict):
+        os.makedirs(cache_dir, exist_ok=True)
+        for name in GRAPH_ARRAYS:
+            np.save(os.path.join(cache_dir, f"{name}.npy"), getattr(self, name))
+        # Written last: a cache without meta.json is treated as missing
+        with open(os.path.join(cache_dir, "meta.json"), "w") as f:
+            json.dump(signature, f)
+
+    @classmethod
+    def load(cls, cache_dir: str) -> "RoadGraph":
+        """Memory-map a graph written by ``save``; pages are read on first use"""
+        return cls({
+            name: np.load(os.path.join(cache_dir, f"{name}.npy"), mmap_mode="r")
+            for name in GRAPH_ARRAYS
+        })
+
+    @classmethod
+    def open(cls, source_path: str, cache_dir: Optional[str] = None) -> "RoadGraph":
+        """Load the cached graph for ``source_path``, rebuilding it if the source changed"""
+        cache_dir = cache_dir or f"{source_path}.graph"
+        signature = cls.source_signature(source_path)
+        try:
+            with open(os.path.join(cache_dir, "meta.json")) as f:
+                if json.load(f) == signature:
+                    return cls.load(cache_dir)
+        except (OSError, ValueError):
+            pass
+
+        logger.info(f"Building road graph from {source_path}")
+        graph = cls.from_geojson(source_path)
+        graph.save(cache_dir, signature)
+        return cls.load(cache_dir)
+
+    # -- Queries --------------------------------------------------------
+
+    def nearest_node(self, lat: float, lng: float, max_rings: int = 3) -> Optional[Tuple[int, float]]:
+        """(node, distance in metres) of the closest node, searching nearby grid cells"""
+        center = int(cell_key(lat, lng))
+        center_row, center_col = center >> 32, center & 0xFFFFFFFF
+        best: Optional[Tuple[int, float]] = None
+        for ring in range(max_rings + 1):
+            for row in range(center_row - ring, center_row + ring + 1):
+                for col in range(center_col - ring, center_col + ring + 1):
+                    if max(abs(row - center_row), abs(col - center_col)) != ring:
+                        continue
+                    position = int(np.searchsorted(self.cell_keys, (row << 32) | col))
+                    if position == len(self.cell_keys) or int(self.cell_keys[position]) != (row << 32) | col:
+                        continue
+                    nodes = self.cell_nodes[self.cell_starts[position]:self.cell_starts[position + 1]]
+                    for node in nodes.tolist():
+                        distance = haversine(lat, lng, float(self.node_lat[node]), float(self.node_lng[node]))
+                        if best is None or distance < best[1]:
+                            best = (node, distance)
+            # A node in the next ring out can still be closer than one found in this ring
+            if best is not None and best[1] <= ring * SNAP_CELL_DEGREES * 111_000 * math.cos(math.radians(lat)):
+                break
+        return best
+
+    def shortest_path(self, source: int, target: int) -> Optional[Tuple[float, float, List[int]]]:
+        """Fastest path by A*; returns (seconds, metres, nodes) or None if unreachable"""
+        indptr, indices = self.indptr, self.indices
+        edge_time, edge_length = self.edge_time, self.edge_length
+        node_lat, node_lng = self.node_lat, self.node_lng
+        target_lat, target_lng = float(node_lat[target]), float(node_lng[target])
+        max_speed = self.max_speed_mps
+
+        def estimate(node: int) -> float:
+            return haversine(float(node_lat[node]), float(node_lng[node]), target_lat, target_lng) / max_speed
+
+        best_time = {source: 0.0}
+        best_length = {source: 0.0}
+        previous: Dict[int, int] = {}
+        queue = [(estimate(source), 0.0, source)]
+        settled = set()
+        while queue:
+            _, time_so_far, node = heapq.heappop(queue)
+            if node == target:
+                path = [node]
+                while node in previous:
+                    node = previous[node]
+                    path.append(node)
+                path.reverse()
+                return time_so_far, best_length[target], path
+            if node in settled:
+                continue
+            settled.add(node)
+
+            start, end = int(indptr[node]), int(indptr[node + 1])
+            for neighbour, seconds, metres in zip(
+                indices[start:end].tolist(), edge_time[start:end].tolist(), edge_length[start:end].tolist()
+            ):
+                candidate = time_so_far + seconds
+                if candidate < best_time.get(neighbour, math.inf):
+                    best_time[neighbour] = candidate
+                    best_length[neighbour] = best_length[node] + metres
+                    previous[neighbour] = node
+                    heapq.heappush(queue, (candidate + estimate(neighbour), candidate, neighbour))
+        return None
+
+    def shortest_paths_from(self, source: int, targets: Iterable[int]) -> Dict[int, Tuple[float, float]]:
+        """Fastest (seconds, metres) from ``source`` to every reachable target.
+
+        One Dijkstra search that stops once all targets are settled, so a
+        depot's deliveries share a single expansion instead of one A* each.
+        """
+        remaining = set(targets)
+        if len(remaining) == 1:
+            # A single target is reached sooner with the A* heuristic
+            target = next(iter(remaining))
+            path = self.shortest_path(source, target)
+            return {target: path[:2]} if path else {}
+        indptr, indices = self.indptr, self.indices
+        edge_time, edge_length = self.edge_time, self.edge_length
+
+        best_time = {source: 0.0}
+        best_length = {source: 0.0}
+        found: Dict[int, Tuple[float, float]] = {}
+        queue = [(0.0, source)]
+        settled = set()
+        while queue and remaining:
+            time_so_far, node = heapq.heappop(queue)
+            if node in settled:
+                continue
+            settled.add(node)
+            if node in remaining:
+                remaining.discard(node)
+                found[node] = (time_so_far, best_length[node])
+
+            start, end = int(indptr[node]), int(indptr[node + 1])
+            for neighbour, seconds, metres in zip(
+                indices[start:end].tolist(), edge_time[start:end].tolist(), edge_length[start:end].tolist()
+            ):
+                candidate = time_so_far + seconds
+                if candidate < best_time.get(neighbour, math.inf):
+                    best_time[neighbour] = candidate
+                    best_length[neighbour] = best_length[node] + metres
+                    heapq.heappush(queue, (candidate, neighbour))
+        return found
+
+    def snap(self, point: Tuple[float, float], max_snap_m: float = ROAD_GRAPH_MAX_SNAP_METERS) -> Optional[Tuple[int, float]]:
+        """nearest_node, or None when the point is further than ``max_snap_m`` from the network"""
+        nearest = self.nearest_node(*point)
+        if nearest is None or nearest[1] > max_snap_m:
+            return None
+        return nearest
+
+    def route(self, origin: Tuple[float, float], destination: Tuple[float, float],
+              max_snap_m: float = ROAD_GRAPH_MAX_SNAP_METERS) -> Optional[Tuple[float, float, List[Tuple[float, float]]]]:
+        """(metres, seconds, points) between two coordinates, or None if off the network"""
+        start = self.snap(origin, max_snap_m)
+        end = self.snap(destination, max_snap_m)
+        if start is None or end is None:
+            return None
+        path = self.shortest_path(start[0], end[0])
+        if path is None:
+            return None
+
+        seconds, metres, nodes = path
+        snap_m = start[1] + end[1]
+        points = [tuple(origin)]
+        points += [(float(self.node_lat[node]), float(self.node_lng[node])) for node in nodes]
+        points.append(tuple(destination))
+        return metres + snap_m, seconds + snap_seconds(snap_m), points
+
+
+def snap_seconds(snap_m: float) -> float:
+    """Time to cover the distance between a requested point and its road node"""
+    return snap_m / (SNAP_SPEED_KMH / 3.6)
+
+
+def route_element(metres: float, seconds: float) -> Dict:
+    distance, duration = int(round(metres)), int(round(seconds))
+    return {
+        'distance': {'text': format_distance(distance), 'value': distance},
+        'duration': {'text': format_duration(duration), 'value': duration},
+        'status': 'OK'
+    }
+
+
+class RoadGraphMapsService(MapsService):
+    """MapsService answering from a local road graph instead of Google.
+
+    Points further than ``max_snap_m`` from the network, or with no path
+    between them, fall back to the straight-line DistanceEngine estimate.
+    Graph distances are kept in an in-memory DistanceCache; they depend on
+    the loaded graph, so they are not persisted next to Google's.
+    """
+
+    def __init__(self, graph: RoadGraph, cache: Optional[DistanceCache] = None,
+                 engine: Optional[DistanceEngine] = None, max_snap_m: float = ROAD_GRAPH_MAX_SNAP_METERS):
+        self.graph = graph
+        self.max_snap_m = max_snap_m
+        super().__init__(cache=cache or DistanceCache(), engine=engine)
+
+    def create_client(self):
+        # Never calls Google, so the circuit breaker stays closed
+        return None
+
+    @classmethod
+    def from_config(cls) -> "RoadGraphMapsService":
+        if not ROAD_GRAPH_PATH:
+            raise RuntimeError("MAPS_PROVIDER=graph requires ROAD_GRAPH_PATH")
+        graph = RoadGraph.open(ROAD_GRAPH_PATH, ROAD_GRAPH_CACHE_DIR)
+        logger.info(f"Road graph loaded: {graph.node_count} nodes, {len(graph.indices)} edges")
+        return cls(graph)
+
+    def get_route(self, origin: Tuple[float, float],
+                  destination: Tuple[float, float]) -> Tuple[Dict, Optional[str]]:
+        """Distance info and polyline from one graph search"""
+        route = self.graph.route(origin, destination, self.max_snap_m)
+        if route is None:
+            return self.estimate_distance(origin, destination), None
+        metres, seconds, points = route
+        return route_element(metres, seconds), encode_polyline(points)
+
+    def calculate_distance_matrix(self, origin: Tuple[float, float],
+                                  destination: Tuple[float, float]) -> Optional[Dict]:
+        return self.calculate_distance_matrix_batch([(origin, destination)])[0]
+
+    def calculate_distance_matrix_batch(
+        self, pairs: List[Tuple[Tuple[float, float], Tuple[float, float]]]
+    ) -> List[Dict]:
+        """Graph distances for many pairs: one search per distinct origin.
+
+        Every point is snapped once, each origin's destinations are settled
+        by a single shortest_paths_from search, and pairs off the network
+        are estimated together in one vectorized DistanceEngine pass.
+        """
+        results: List[Optional[Dict]] = [None] * len(pairs)
+        # origin -> destination -> indexes into pairs
+        pending: Dict[Tuple[float, float], Dict[Tuple[float, float], List[int]]] = {}
+        for index, (origin, destination) in enumerate(pairs):
+            cached = self.cache.get(origin, destination)
+            if cached is not None:
+                results[index] = cached
+            else:
+                pending.setdefault(tuple(origin), {}).setdefault(tuple(destination), []).append(index)
+
+        snapped: Dict[Tuple[float, float], Optional[Tuple[int, float]]] = {}
+
+        def snap(point: Tuple[float, float]) -> Optional[Tuple[int, float]]:
+            if point not in snapped:
+                snapped[point] = self.graph.snap(point, self.max_snap_m)
+            return snapped[point]
+
+        for origin, destinations in pending.items():
+            start = snap(origin)
+            if start is None:
+                continue
+            ends = {destination: snap(destination) for destination in destinations}
+            reached = self.graph.shortest_paths_from(start[0], {end[0] for end in ends.values() if end})
+            for destination, end in ends.items():
+                if end is None or end[0] not in reached:
+                    continue
+                seconds, metres = reached[end[0]]
+                snap_m = start[1] + end[1]
+                element = route_element(metres + snap_m, seconds + snap_seconds(snap_m))
+                self.cache.set(origin, destination, element)
+                for index in destinations[destination]:
+                    results[index] = element
+
+        missing = [index for index, result in enumerate(results) if result is None]
+        for index, estimate in zip(missing, self.estimate_distances([pairs[index] for index in missing])):
+            results[index] = estimate
+        return results
+
+    def get_route_polyline(self, origin: Tuple[float, float],
+                           destination: Tuple[float, float]) -> Optional[str]:
+        return self.get_route(origin, destination)[1]
+
+    def distance_matrix(self, points: List[Tuple[float, float]]) -> Tuple[np.ndarray, np.ndarray]:
+        """All-pairs road distance (m) and duration (s) matrices over the graph.
+
+        One shortest_paths_from search per snapped point settles its whole
+        row; pairs where either point is off the network, or no path exists,
+        keep the DistanceEngine estimate.
+        """
+        distance_m, duration_s = super().distance_matrix(points)
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        snapped = [self.graph.snap((float(lat), float(lng)), self.max_snap_m) for lat, lng in points]
+
+        on_network = np.array([index for index, snap in enumerate(snapped) if snap is not None], dtype=np.int64)
+        if not len(on_network):
+            return distance_m, duration_s
+        nodes = [snapped[index][0] for index in on_network]
+        snap_m = np.array([snapped[index][1] for index in on_network])
+
+        for row in on_network.tolist():
+            start = snapped[row]
+            reached = self.graph.shortest_paths_from(start[0], set(nodes))
+            found = np.array([node in reached for node in nodes])
+            if not found.any():
+                continue
+            seconds = np.array([reached[node][0] if node in reached else 0.0 for node in nodes])
+            metres = np.array([reached[node][1] if node in reached else 0.0 for node in nodes])
+            columns = on_network[found]
+            leg_snap_m = start[1] + snap_m[found]
+            distance_m[row, columns] = metres[found] + leg_snap_m
+            duration_s[row, columns] = seconds[found] + snap_seconds(leg_snap_m)
+            distance_m[row, row] = duration_s[row, row] = 0.0
+        return distance_m, duration_s
+
+
+class AsyncRoadGraphMapsService(AsyncMapsService):
+    """Async facade over RoadGraphMapsService; searches run off the event loop"""
+
+    def __init__(self, sync_service: RoadGraphMapsService):
+        super().__init__(sync_service)
+        self.enabled = True
+
+    async def calculate_distance_matrix(self, origin: Tuple[float, float],
+                                        destination: Tuple[float, float],
+                                        timeout: Optional[float] = None) -> Optional[Dict]:
+        return (await self.get_route(origin, destination))[0]
+
+    async def get_route_polyline(self, origin: Tuple[float, float],
+                                 destination: Tuple[float, float],
+                                 timeout: Optional[float] = None) -> Optional[str]:
+        return (await self.get_route(origin, destination))[1]
+
+    async def get_route(self, origin: Tuple[float, float],
+                        destination: Tuple[float, float]) -> Tuple[Optional[Dict], Optional[str]]:
+        return await asyncio.to_thread(self.sync_service.get_route, origin, destination)
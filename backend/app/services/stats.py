@@ -0,0 +1,188 @@
+from collections import defaultdict
+from typing import Dict, Iterable, Tuple
+from sqlalchemy import case, delete, event, func, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import get_history
+from app.models.parcel import Parcel, ParcelStatus, WeightCategory
+from app.models.stats import ParcelCounter
+from app.models.user import User
+
+CounterKey = Tuple[int, str, str]
+
+
+def _value(value) -> str:
+    return value.value if hasattr(value, 'value') else str(value)
+
+
+def _old_value(parcel: Parcel, attribute: str):
+    history = get_history(parcel, attribute)
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(parcel, attribute)
+
+
+def _load_stored_value(target, value, oldvalue, initiator):
+    """Does nothing; registered with active_history so that setting an expired
+    attribute (e.g. after a commit) loads the stored value into its history"""
+
+
+# Counters are keyed on these; _old_value needs their stored values
+for _attribute in (Parcel.status, Parcel.weight_category, Parcel.quote_amount):
+    event.listen(_attribute, "set", _load_stored_value, active_history=True)
+
+
+def apply_counter_deltas(connection, deltas: Dict[CounterKey, Tuple[int, float]]):
+    """Add (count, revenue) deltas to the counters with one upsert per key"""
+    if connection.dialect.name == "postgresql":
+        insert_stmt = postgresql.insert
+    else:
+        insert_stmt = sqlite.insert
+
+    for (user_id, status, weight_category), (count, revenue) in deltas.items():
+        if not count and not revenue:
+            continue
+        statement = insert_stmt(ParcelCounter).values(
+            user_id=user_id, status=status, weight_category=weight_category,
+            parcel_count=count, revenue=revenue
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=["user_id", "status", "weight_category"],
+            set_={
+                "parcel_count": ParcelCounter.parcel_count + statement.excluded.parcel_count,
+                "revenue": ParcelCounter.revenue + statement.excluded.revenue,
+            },
+        )
+        connection.execute(statement)
+
+
+@event.listens_for(Session, "after_flush")
+def track_parcel_counters(session: Session, flush_context):
+    """Keep parcel_counters in step with parcel inserts, status and quote changes"""
+    deltas: Dict[CounterKey, list] = defaultdict(lambda: [0, 0.0])
+
+    def add(user_id, status, weight_category, count, revenue):
+        delta = deltas[(user_id, _value(status or ParcelStatus.pending), _value(weight_category))]
+        delta[0] += count
+        delta[1] += revenue or 0.0
+
+    for obj in session.new:
+        if isinstance(obj, Parcel):
+            add(obj.user_id, obj.status, obj.weight_category, 1, obj.quote_amount)
+
+    for obj in session.dirty:
+        if not isinstance(obj, Parcel):
+            continue
+        old = [_old_value(obj, name) for name in ("status", "weight_category", "quote_amount")]
+        new = [obj.status, obj.weight_category, obj.quote_amount]
+        if [_value(v) for v in old[:2]] + old[2:] == [_value(v) for v in new[:2]] + new[2:]:
+            continue
+        add(obj.user_id, old[0], old[1], -1, -(old[2] or 0.0))
+        add(obj.user_id, new[0], new[1], 1, new[2])
+
+    for obj in session.deleted:
+        if isinstance(obj, Parcel):
+            # The row is counted under the values it was stored with, not unflushed edits
+            status, weight_category, quote_amount = (
+                _old_value(obj, name) for name in ("status", "weight_category", "quote_amount")
+            )
+            add(obj.user_id, status, weight_category, -1, -(quote_amount or 0.0))
+
+    if deltas:
+        apply_counter_deltas(session.connection(), {key: tuple(value) for key, value in deltas.items()})
+
+
+def status_change_deltas(rows, new_status) -> Dict[CounterKey, Tuple[int, float]]:
+    """Counter deltas for moving (user_id, status, weight_category, quote_amount)
+    rows to ``new_status``; for bulk UPDATE statements, which skip the flush hook"""
+    deltas: Dict[CounterKey, list] = defaultdict(lambda: [0, 0.0])
+    new_status = _value(new_status)
+    for user_id, status, weight_category, quote_amount in rows:
+        status, weight_category = _value(status), _value(weight_category)
+        if status == new_status:
+            continue
+        for key, sign in (((user_id, status, weight_category), -1), ((user_id, new_status, weight_category), 1)):
+            deltas[key][0] += sign
+            deltas[key][1] += sign * (quote_amount or 0.0)
+    return {key: tuple(value) for key, value in deltas.items()}
+
+
+def rebuild_counters(db: Session):
+    """Recompute parcel_counters from the parcels table in one grouped query"""
+    grouped = (
+        select(
+            Parcel.user_id, Parcel.status, Parcel.weight_category,
+            func.count(Parcel.id), func.coalesce(func.sum(Parcel.quote_amount), 0.0)
+        )
+        .group_by(Parcel.user_id, Parcel.status, Parcel.weight_category)
+    )
+    db.execute(delete(ParcelCounter))
+    rows = [
+        {
+            "user_id": user_id, "status": _value(status), "weight_category": _value(weight_category),
+            "parcel_count": count, "revenue": revenue,
+        }
+        for user_id, status, weight_category, count, revenue in db.execute(grouped)
+    ]
+    if rows:
+        db.execute(insert(ParcelCounter), rows)
+    db.commit()
+
+
+def ensure_counters(db: Session):
+    """Backfill counters for databases created before they existed"""
+    has_counters = db.query(ParcelCounter.user_id).first() is not None
+    has_parcels = db.query(Parcel.id).first() is not None
+    if has_parcels and not has_counters:
+        rebuild_counters(db)
+
+
+def summarize(rows: Iterable[Tuple[str, str, int, float]]) -> Dict:
+    """Fold (status, weight_category, count, revenue) rows into a summary"""
+    summary = {
+        "total_parcels": 0,
+        "total_revenue": 0.0,
+        "by_status": {status.value: 0 for status in ParcelStatus},
+        "by_weight": {weight.value: 0 for weight in WeightCategory},
+        "revenue_by_status": {status.value: 0.0 for status in ParcelStatus},
+    }
+    for status, weight_category, count, revenue in rows:
+        status, weight_category = _value(status), _value(weight_category)
+        summary["total_parcels"] += count
+        summary["by_status"][status] = summary["by_status"].get(status, 0) + count
+        summary["by_weight"][weight_category] = summary["by_weight"].get(weight_category, 0) + count
+        summary["revenue_by_status"][status] = round(summary["revenue_by_status"].get(status, 0.0) + revenue, 2)
+        # Cancelled parcels are never charged
+        if status != ParcelStatus.cancelled.value:
+            summary["total_revenue"] = round(summary["total_revenue"] + revenue, 2)
+    return summary
+
+
+def user_summary(db: Session, user_id: int) -> Dict:
+    rows = db.query(
+        ParcelCounter.status, ParcelCounter.weight_category,
+        ParcelCounter.parcel_count, ParcelCounter.revenue
+    ).filter(ParcelCounter.user_id == user_id, ParcelCounter.parcel_count > 0)
+    return summarize(rows.all())
+
+
+def database_stats(db: Session) -> Dict:
+    """System-wide statistics from one grouped parcel query and one user query"""
+    parcel_rows = db.query(
+        Parcel.status, Parcel.weight_category,
+        func.count(Parcel.id), func.coalesce(func.sum(Parcel.quote_amount), 0.0)
+    ).group_by(Parcel.status, Parcel.weight_category).all()
+    summary = summarize(parcel_rows)
+
+    total_users, admin_users = db.query(
+        func.count(User.id),
+        func.coalesce(func.sum(case((User.is_admin == True, 1), else_=0)), 0)
+    ).one()
+
+    return {
+        "total_users": total_users,
+        "admin_users": admin_users,
+        **summary,
+        "pending_parcels": summary["by_status"]["pending"],
+        "delivered_parcels": summary["by_status"]["delivered"],
+    }
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Compare rows/second of the parcel list serialization paths.
+
+"orm + dicts" is the previous GET /parcels/ path: load Parcel objects, build
+a dict per row by hand and render it with FastAPI's default JSON response.
+"projected + orjson" is the current path: select only the list columns and
+hand the rows to ORJSONResponse.
+
+Runs against a temporary SQLite database.
+
+Usage: python benchmarks/list_serialization.py [--rows 10000 100000] [--repeat 3]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_db_dir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'bench.db')}"
+os.environ.setdefault("EMAIL_OUTBOX_WORKER_ENABLED", "false")
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+from sqlalchemy import delete, insert, select
+from app.main import app  # noqa: F401 - creates the tables
+from app.database.database import SessionLocal
+from app.models.parcel import Parcel
+from app.services.parcel_query import LIST_FIELDS, list_columns, rows_to_dicts
+
+SEED_BATCH_SIZE = 5000
+
+
+def seed_parcels(count: int):
+    db = SessionLocal()
+    try:
+        db.execute(delete(Parcel))
+        start = datetime(2026, 1, 1)
+        statuses = ["pending", "in_transit", "delivered", "cancelled"]
+        weights = ["small", "medium", "large"]
+        for offset in range(0, count, SEED_BATCH_SIZE):
+            db.execute(insert(Parcel), [
+                {
+                    "user_id": 1 + i % 50,
+                    "pickup_address": f"{i} Pickup Rd",
+                    "destination_address": f"{i} Destination Ave",
+                    "pickup_lat": -1.2864, "pickup_lng": 36.8172,
+                    "destination_lat": -1.3 - i % 100 / 1000, "destination_lng": 36.8,
+                    "weight_category": weights[i % 3],
+                    "quote_amount": 10.0 + i % 40,
+                    "status": statuses[i % 4],
+                    "present_location": "Depot",
+                    "distance_km": 2.5, "duration_mins": 12,
+                    "created_at": start + timedelta(seconds=i),
+                    "updated_at": start + timedelta(seconds=i),
+                }
+                for i in range(offset, min(count, offset + SEED_BATCH_SIZE))
+            ])
+        db.commit()
+    finally:
+        db.close()
+
+
+def legacy_path(db) -> bytes:
+    result = []
+    for parcel in db.query(Parcel).all():
+        result.append({
+            "id": parcel.id,
+            "user_id": parcel.user_id,
+            "pickup_address": parcel.pickup_address,
+            "destination_address": parcel.destination_address,
+            "pickup_lat": parcel.pickup_lat,
+            "pickup_lng": parcel.pickup_lng,
+            "destination_lat": parcel.destination_lat,
+            "destination_lng": parcel.destination_lng,
+            "weight_category": parcel.weight_category.value if hasattr(parcel.weight_category, 'value') else str(parcel.weight_category),
+            "quote_amount": parcel.quote_amount,
+            "status": parcel.status.value if hasattr(parcel.status, 'value') else str(parcel.status),
+            "present_location": parcel.present_location,
+            "distance_km": parcel.distance_km,
+            "duration_mins": parcel.duration_mins,
+            "created_at": parcel.created_at.isoformat() if parcel.created_at else None,
+            "updated_at": parcel.updated_at.isoformat() if parcel.updated_at else None
+        })
+    # FastAPI runs jsonable_encoder over plain return values before rendering
+    return JSONResponse(jsonable_encoder(result)).body
+
+
+def projected_path(db) -> bytes:
+    fields = list(LIST_FIELDS)
+    rows = db.execute(select(*list_columns(fields))).all()
+    return ORJSONResponse(rows_to_dicts(rows, fields)).body
+
+
+def measure(path, repeat: int) -> float:
+    best = None
+    for _ in range(repeat):
+        db = SessionLocal()
+        try:
+            started = time.perf_counter()
+            path(db)
+            elapsed = time.perf_counter() - started
+        finally:
+            db.close()
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for count in args.rows:
+        seed_parcels(count)
+        results = {
+            "orm + dicts": measure(legacy_path, args.repeat),
+            "projected + orjson": measure(projected_path, args.repeat),
+        }
+        baseline = results["orm + dicts"]
+        for name, elapsed in results.items():
+            print(
+                f"{count:>7} rows  {name:20} {elapsed * 1000:9.1f} ms  "
+                f"{count / elapsed:>10.0f} rows/s  x{baseline / elapsed:.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
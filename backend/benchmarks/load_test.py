@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+"""
+Load-test the API in-process and report per-endpoint latency percentiles.
+
+Boots app.main:app (startup hooks included) against a scratch database and
+drives a mixed workload at a fixed arrival rate: logins, parcel creation,
+list reads, parcel detail + route views and admin status updates. Google
+Maps is replaced at the HTTP transport with a fake that has configurable
+latency and error rate, so the real client, cache and fallback paths run;
+SendGrid is replaced by an in-memory transport for the outbox worker with
+its own latency and error rate.
+
+Requests are sent on schedule whether or not earlier ones have finished, and
+latency is measured from the scheduled send time, so a stalled server shows
+up in the tail instead of lowering the request rate.
+
+Results (p50/p95/p99, error rates and DB queries per request, per endpoint)
+are printed as JSON and optionally written to --output; pass an earlier
+results file as --baseline to print the change in tail latency.
+
+DATABASE_URL defaults to a temporary SQLite file; point it at a scratch
+PostgreSQL database to test production-like contention.
+
+Usage: python benchmarks/load_test.py [--rps 50] [--duration 30] [--output results.json]
+       [--mix login=5,create=15,list=40,detail=25,admin_update=15]
+       [--maps-latency-ms 120] [--maps-error-rate 0.01] [--email-latency-ms 200] [--email-error-rate 0.02]
+"""
+import argparse
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from urllib.parse import parse_qs
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_db_dir = tempfile.mkdtemp()
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_db_dir, 'bench.db')}")
+os.environ.setdefault("EMAIL_OUTBOX_WORKER_ENABLED", "true")
+
+import httpx
+from sqlalchemy import event, insert
+from app.main import app
+from app.database.database import SessionLocal, engine
+from app.models.parcel import Parcel
+from app.models.user import User
+from app.services.auth import get_password_hash, create_access_token
+from app.services.email import LocalEmailTransport
+from app.services.maps import GOOGLE_MAPS_API_URL, async_maps_service
+from app.services.outbox import outbox_worker
+from app.services.routing import encode_polyline
+
+PASSWORD = "benchmark-password"
+ADMIN_EMAIL = "loadtest-admin@example.com"
+CENTER = (-1.2864, 36.8172)
+SPAN_DEGREES = 0.15
+DEFAULT_MIX = "login=5,create=15,list=40,detail=25,admin_update=15"
+STATUSES = ["in_transit", "delivered"]
+
+logging.getLogger("httpx").setLevel(logging.WARNING)
+# Injected maps failures are counted in the results rather than logged
+logging.getLogger("app.services.maps").setLevel(logging.CRITICAL)
+
+# Set around each request so engine events can charge its queries to it
+_query_counter: contextvars.ContextVar = contextvars.ContextVar("query_counter", default=None)
+background_queries = [0]
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def count_query(conn, cursor, statement, parameters, context, executemany):
+    counter = _query_counter.get()
+    if counter is not None:
+        counter[0] += 1
+    else:
+        background_queries[0] += 1
+
+
+class FakeGoogleMaps:
+    """Answers Distance Matrix and Directions requests after a simulated delay"""
+
+    def __init__(self, latency_ms: float, error_rate: float, rng: random.Random):
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.rng = rng
+        self.calls = 0
+        self.errors = 0
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.calls += 1
+        # Log-normal jitter gives the long right tail of real network calls
+        await asyncio.sleep(self.latency_ms / 1000 * self.rng.lognormvariate(0, 0.5))
+        if self.rng.random() < self.error_rate:
+            self.errors += 1
+            return httpx.Response(503, json={"status": "UNKNOWN_ERROR"})
+
+        params = {key: values[0] for key, values in parse_qs(request.url.query.decode()).items()}
+        if request.url.path.endswith("/distancematrix/json"):
+            origin = tuple(map(float, params["origins"].split(",")))
+            destination = tuple(map(float, params["destinations"].split(",")))
+            element = async_maps_service.sync_service.estimate_distance(origin, destination)
+            return httpx.Response(200, json={"status": "OK", "rows": [{"elements": [element]}]})
+
+        origin = tuple(map(float, params["origin"].split(",")))
+        destination = tuple(map(float, params["destination"].split(",")))
+        element = async_maps_service.sync_service.estimate_distance(origin, destination)
+        route = {
+            "legs": [{"distance": element["distance"], "duration": element["duration"]}],
+            "overview_polyline": {"points": encode_polyline([origin, destination])},
+        }
+        return httpx.Response(200, json={"status": "OK", "routes": [route]})
+
+
+class FakeEmailTransport(LocalEmailTransport):
+    """LocalEmailTransport that takes time and sometimes fails, like SendGrid"""
+
+    def __init__(self, latency_ms: float, error_rate: float, rng: random.Random):
+        super().__init__()
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.rng = rng
+        self.failed = 0
+
+    def send_batch(self, subject, content, recipients):
+        time.sleep(self.latency_ms / 1000 * self.rng.lognormvariate(0, 0.5))
+        if self.rng.random() < self.error_rate:
+            self.failed += 1
+            return False
+        return super().send_batch(subject, content, recipients)
+
+
+def random_point(rng: random.Random):
+    return (CENTER[0] + rng.uniform(-SPAN_DEGREES, SPAN_DEGREES),
+            CENTER[1] + rng.uniform(-SPAN_DEGREES, SPAN_DEGREES))
+
+
+def parcel_payload(rng: random.Random, index: int) -> dict:
+    pickup, destination = random_point(rng), random_point(rng)
+    return {
+        "pickup_address": f"{index} Pickup Rd",
+        "destination_address": f"{index} Destination Ave",
+        "pickup_lat": pickup[0], "pickup_lng": pickup[1],
+        "destination_lat": destination[0], "destination_lng": destination[1],
+        "weight_category": rng.choice(["small", "medium", "large"]),
+    }
+
+
+def seed(users: int, parcels_per_user: int, rng: random.Random):
+    """Create users, an admin and their parcels; returns parcel ids by owner email"""
+    db = SessionLocal()
+    try:
+        hashed = get_password_hash(PASSWORD)
+        accounts = [User(email=f"load{i}@example.com", full_name=f"Load {i}", hashed_password=hashed)
+                    for i in range(users)]
+        db.add_all(accounts + [User(email=ADMIN_EMAIL, full_name="Load Admin",
+                                    hashed_password=hashed, is_admin=True)])
+        db.commit()
+
+        now = datetime.now(timezone.utc)
+        rows = []
+        for account in accounts:
+            for i in range(parcels_per_user):
+                rows.append({**parcel_payload(rng, i), "user_id": account.id, "quote_amount": 10.0,
+                             "status": "pending", "created_at": now})
+        if rows:
+            # Core insert skips the ORM listeners, so the first geohash backfill covers these
+            db.execute(insert(Parcel), rows)
+            db.commit()
+
+        owned = defaultdict(list)
+        for parcel_id, user_id in db.query(Parcel.id, Parcel.user_id):
+            owned[user_id].append(parcel_id)
+        return {account.email: owned[account.id] for account in accounts}
+    finally:
+        db.close()
+
+
+def parse_mix(mix: str) -> dict:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        weights[name.strip()] = float(weight)
+    unknown = set(weights) - set(OPERATIONS)
+    if unknown:
+        raise SystemExit(f"Unknown operations in --mix: {', '.join(sorted(unknown))}")
+    return weights
+
+
+class LoadTest:
+    def __init__(self, client: httpx.AsyncClient, parcels_by_email: dict, rng: random.Random):
+        self.client = client
+        self.parcels_by_email = parcels_by_email
+        self.emails = list(parcels_by_email)
+        self.rng = rng
+        self.tokens = {email: create_access_token(data={"sub": email}) for email in self.emails + [ADMIN_EMAIL]}
+        self.samples = defaultdict(list)  # endpoint -> [(latency ms, ok, queries)]
+        self.created = 0
+
+    def headers(self, email: str) -> dict:
+        return {"Authorization": f"Bearer {self.tokens[email]}"}
+
+    async def request(self, endpoint: str, scheduled: float, record: bool, method: str, url: str, **kwargs):
+        counter = [0]
+        token = _query_counter.set(counter)
+        try:
+            response = await self.client.request(method, url, **kwargs)
+            ok = response.status_code < 400
+        except Exception:
+            response, ok = None, False
+        finally:
+            _query_counter.reset(token)
+        if record:
+            self.samples[endpoint].append(((time.perf_counter() - scheduled) * 1000, ok, counter[0]))
+        return response
+
+    async def login(self, scheduled, record):
+        email = self.rng.choice(self.emails)
+        await self.request("POST /auth/login", scheduled, record, "POST", "/auth/login",
+                           data={"username": email, "password": PASSWORD})
+
+    async def create_parcel(self, scheduled, record):
+        email = self.rng.choice(self.emails)
+        self.created += 1
+        response = await self.request("POST /parcels/", scheduled, record, "POST", "/parcels/",
+                                      json=parcel_payload(self.rng, self.created), headers=self.headers(email))
+        if response is not None and response.status_code == 200:
+            self.parcels_by_email[email].append(response.json()["id"])
+
+    async def list_parcels(self, scheduled, record):
+        email = self.rng.choice(self.emails)
+        await self.request("GET /parcels/", scheduled, record, "GET", "/parcels/", headers=self.headers(email))
+
+    async def view_parcel(self, scheduled, record):
+        email = self.rng.choice(self.emails)
+        if not self.parcels_by_email[email]:
+            return
+        parcel_id = self.rng.choice(self.parcels_by_email[email])
+        headers = self.headers(email)
+        await self.request("GET /parcels/{id}", scheduled, record, "GET", f"/parcels/{parcel_id}", headers=headers)
+        await self.request("GET /parcels/{id}/route", time.perf_counter(), record, "GET",
+                           f"/parcels/{parcel_id}/route", headers=headers)
+
+    async def admin_update(self, scheduled, record):
+        email = self.rng.choice(self.emails)
+        if not self.parcels_by_email[email]:
+            return
+        parcel_id = self.rng.choice(self.parcels_by_email[email])
+        body = {"status": self.rng.choice(STATUSES), "present_location": f"Hub {self.rng.randint(1, 20)}"}
+        await self.request("PUT /parcels/{id}/admin", scheduled, record, "PUT", f"/parcels/{parcel_id}/admin",
+                           json=body, headers=self.headers(ADMIN_EMAIL))
+
+    async def run(self, mix: dict, rps: float, duration: float, warmup: float, concurrency: int):
+        operations = [getattr(self, OPERATIONS[name]) for name in mix]
+        weights = list(mix.values())
+        limit = asyncio.Semaphore(concurrency)
+        loop = asyncio.get_running_loop()
+        tasks = set()
+
+        async def run_one(operation, scheduled, record):
+            async with limit:
+                await operation(scheduled, record)
+
+        started = time.perf_counter()
+        for sent in range(int((warmup + duration) * rps)):
+            offset = sent / rps
+            delay = started + offset - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            operation = self.rng.choices(operations, weights)[0]
+            task = loop.create_task(run_one(operation, started + offset, offset >= warmup))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        await asyncio.gather(*tasks)
+        return time.perf_counter() - started - warmup
+
+
+# --mix names -> LoadTest methods
+OPERATIONS = {
+    "login": "login",
+    "create": "create_parcel",
+    "list": "list_parcels",
+    "detail": "view_parcel",
+    "admin_update": "admin_update",
+}
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def summarize(samples: list) -> dict:
+    latencies = [latency for latency, _, _ in samples]
+    errors = sum(1 for _, ok, _ in samples if not ok)
+    queries = [count for _, _, count in samples]
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "error_rate": round(errors / len(samples), 4),
+        "p50_ms": round(statistics.median(latencies), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "max_ms": round(max(latencies), 2),
+        "db_queries_per_request": round(statistics.mean(queries), 2),
+    }
+
+
+def compare(results: dict, baseline: dict):
+    for endpoint, current in results["endpoints"].items():
+        previous = baseline.get("endpoints", {}).get(endpoint)
+        if not previous:
+            continue
+        changes = "  ".join(
+            f"{key}={previous[key]}->{current[key]} ({(current[key] - previous[key]) / previous[key] * 100:+.0f}%)"
+            for key in ("p50_ms", "p95_ms", "p99_ms") if previous[key]
+        )
+        print(f"{endpoint:26} {changes}", file=sys.stderr)
+
+
+async def main_async(args) -> dict:
+    rng = random.Random(args.seed)
+    parcels_by_email = seed(args.users, args.parcels_per_user, rng)
+
+    fake_maps = FakeGoogleMaps(args.maps_latency_ms, args.maps_error_rate, rng)
+    async_maps_service.api_key = "load-test"
+    async_maps_service.enabled = True
+    async_maps_service._client = httpx.AsyncClient(base_url=GOOGLE_MAPS_API_URL,
+                                                   transport=httpx.MockTransport(fake_maps))
+    fake_email = FakeEmailTransport(args.email_latency_ms, args.email_error_rate, rng)
+    outbox_worker.transport = fake_email
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=None) as client:
+            load_test = LoadTest(client, parcels_by_email, rng)
+            elapsed = await load_test.run(parse_mix(args.mix), args.rps, args.duration, args.warmup,
+                                          args.concurrency)
+
+    endpoints = {endpoint: summarize(samples) for endpoint, samples in sorted(load_test.samples.items())}
+    total = sum(endpoint["requests"] for endpoint in endpoints.values())
+    return {
+        "config": vars(args),
+        "database": engine.dialect.name,
+        "elapsed_s": round(elapsed, 2),
+        "requests": total,
+        "achieved_rps": round(total / elapsed, 1),
+        "endpoints": endpoints,
+        "background_db_queries": background_queries[0],
+        "maps": {"calls": fake_maps.calls, "errors": fake_maps.errors},
+        "email": {"sent": len(fake_email.sent), "batches": fake_email.batches, "failed_batches": fake_email.failed},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rps", type=float, default=50, help="operations started per second")
+    parser.add_argument("--duration", type=float, default=30, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=3, help="unmeasured seconds before the run")
+    parser.add_argument("--concurrency", type=int, default=200, help="most operations in flight")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="operation weights")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--parcels-per-user", type=int, default=20)
+    parser.add_argument("--maps-latency-ms", type=float, default=120)
+    parser.add_argument("--maps-error-rate", type=float, default=0.01)
+    parser.add_argument("--email-latency-ms", type=float, default=200)
+    parser.add_argument("--email-error-rate", type=float, default=0.02)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write the JSON results here")
+    parser.add_argument("--baseline", help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    results = asyncio.run(main_async(args))
+    report = json.dumps(results, indent=2)
+    print(report)
+    if args.output:
+        with open(args.output, "w") as output:
+            output.write(report + "\n")
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            compare(results, json.load(baseline))
+
+
+if __name__ == "__main__":
+    main()
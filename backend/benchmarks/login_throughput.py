@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Measure GET /parcels/ latency while a burst of logins is running.
+
+Runs the app in-process against a temporary SQLite database and compares
+bcrypt on the shared threadpool (the old behaviour) with the dedicated
+password hashing pool.
+
+Usage: python benchmarks/login_throughput.py [--logins 200] [--readers 20]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_db_dir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'bench.db')}"
+os.environ.setdefault("EMAIL_OUTBOX_WORKER_ENABLED", "false")
+
+import httpx
+from app.main import app
+from app.database.database import SessionLocal
+from app.models.user import User
+from app.routers import auth as auth_router
+from app.services.auth import PasswordHasher, get_password_hash, create_access_token
+
+PASSWORD = "benchmark-password"
+
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+
+def seed_users(count: int):
+    db = SessionLocal()
+    try:
+        hashed = get_password_hash(PASSWORD)
+        for i in range(count):
+            db.add(User(email=f"bench{i}@example.com", full_name=f"Bench {i}", hashed_password=hashed))
+        db.commit()
+    finally:
+        db.close()
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def run_scenario(hasher: PasswordHasher, logins: int, readers: int, users: int):
+    auth_router.password_hasher = hasher
+    token = create_access_token(data={"sub": "bench0@example.com"})
+    headers = {"Authorization": f"Bearer {token}"}
+    transport = httpx.ASGITransport(app=app)
+    read_latencies = []
+    login_statuses = []
+    done = asyncio.Event()
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def login(i):
+            response = await client.post("/auth/login", data={
+                "username": f"bench{i % users}@example.com", "password": PASSWORD
+            })
+            login_statuses.append(response.status_code)
+
+        async def reader():
+            while not done.is_set():
+                started = time.perf_counter()
+                await client.get("/parcels/", headers=headers)
+                read_latencies.append((time.perf_counter() - started) * 1000)
+
+        reader_tasks = [asyncio.create_task(reader()) for _ in range(readers)]
+        started = time.perf_counter()
+        await asyncio.gather(*(login(i) for i in range(logins)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await asyncio.gather(*reader_tasks)
+
+    hasher.shutdown()
+    return {
+        "logins_per_second": round(logins / elapsed, 1),
+        "login_ok": login_statuses.count(200),
+        "login_503": login_statuses.count(503),
+        "parcels_requests": len(read_latencies),
+        "parcels_p50_ms": round(statistics.median(read_latencies), 2),
+        "parcels_p99_ms": round(percentile(read_latencies, 99), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--readers", type=int, default=20)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=2, help="size of the dedicated hashing pool")
+    parser.add_argument("--max-pending", type=int, default=1000)
+    args = parser.parse_args()
+
+    seed_users(args.users)
+
+    scenarios = {
+        "shared threadpool": PasswordHasher(workers=0, max_pending=args.max_pending),
+        f"dedicated pool ({args.workers} workers)": PasswordHasher(workers=args.workers, max_pending=args.max_pending),
+    }
+    for name, hasher in scenarios.items():
+        result = asyncio.run(run_scenario(hasher, args.logins, args.readers, args.users))
+        print(f"{name:32} " + "  ".join(f"{key}={value}" for key, value in result.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Time POST /parcels/admin/route-plan's matrix and solver on random stops.
+
+Stops are scattered over a 40 km x 40 km area around Nairobi with random
+small/medium/large parcels; reports the matrix build time, the solver time
+and how far 2-opt/or-opt improved on the savings construction.
+
+Usage: python benchmarks/route_plan.py [--stops 100 500 1000] [--capacity 30] [--time-limit 2]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from app.services.maps import MapsService
+from app.services.route_planner import plan_routes, WEIGHT_UNITS
+
+CENTER = (-1.2864, 36.8172)
+SPAN_DEGREES = 0.18  # ~20 km either side
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stops", type=int, nargs="+", default=[100, 500, 1000])
+    parser.add_argument("--capacity", type=int, default=30)
+    parser.add_argument("--time-limit", type=float, default=2)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    service = MapsService()
+    for count in args.stops:
+        rng = np.random.default_rng(args.seed)
+        points = np.column_stack([
+            CENTER[0] + rng.uniform(-SPAN_DEGREES, SPAN_DEGREES, count + 1),
+            CENTER[1] + rng.uniform(-SPAN_DEGREES, SPAN_DEGREES, count + 1),
+        ])
+        demands = np.concatenate(([0], rng.choice(list(WEIGHT_UNITS.values()), count)))
+
+        started = time.perf_counter()
+        distance_m, _ = service.distance_matrix(points)
+        matrix_s = time.perf_counter() - started
+
+        started = time.perf_counter()
+        plan = plan_routes(distance_m, demands, args.capacity, args.time_limit)
+        solve_s = time.perf_counter() - started
+
+        print(
+            f"{count:>5} stops  matrix {matrix_s * 1000:7.1f} ms  solve {solve_s:5.2f} s  "
+            f"{len(plan.routes):>3} vehicles  {plan.construction_distance / 1000:8.1f} km -> "
+            f"{plan.distance / 1000:8.1f} km ({plan.moves} moves)"
+        )
+
+
+if __name__ == "__main__":
+    main()
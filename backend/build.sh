@@ -4,8 +4,8 @@ set -o errexit
 pip install --upgrade pip
 pip install -r requirements.txt
 
-# Initialize database tables
-python -c "from app.database.database import Base, engine; Base.metadata.create_all(bind=engine)"
+# Create database tables and migrate existing ones
+python init_database.py
 
 # Create demo users (admin and regular user)
 python create_demo_users.py
@@ -1,8 +1,9 @@
-from app.database.database import SessionLocal, engine, Base
+from app.database.database import SessionLocal, engine
+from app.database.migrations import create_schema
 from app.models.user import User
 from app.services.auth import get_password_hash
 
-Base.metadata.create_all(bind=engine)
+create_schema(engine)
 
 db = SessionLocal()
 
@@ -3,12 +3,13 @@
 Script to initialize the database by creating all tables.
 """
 
-from app.database.database import engine, Base
+from app.database.database import engine
+from app.database.migrations import create_schema
 
 def init_database():
-    """Create all database tables."""
+    """Create all database tables and add columns and indexes missing from existing ones."""
     print("Creating database tables...")
-    Base.metadata.create_all(bind=engine)
+    create_schema(engine)
     print("Database initialized successfully!")
 
 if __name__ == "__main__":
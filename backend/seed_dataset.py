@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Generate a large synthetic dataset for scale testing.
+
+Creates N users and M parcels with pickups and destinations clustered around
+Kenyan cities and their neighbourhoods, a realistic weight mix, creation times
+with daily and weekly patterns, and statuses that depend on parcel age.
+Distances and quotes come from the local distance engine and pricing.
+
+The data depends only on --seed and --end, so runs are comparable. Rows go
+in with COPY on PostgreSQL and batched executemany inserts elsewhere; the
+parcel summary counters are rebuilt and the tables analyzed afterwards.
+Every seeded user has the password given by --password.
+
+Uses DATABASE_URL like the app; run it against an empty or scratch database.
+
+Usage: python seed_dataset.py --users 100000 --parcels 2000000 [--seed 1] [--end 2026-01-01]
+"""
+import argparse
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+import numpy as np
+from sqlalchemy import insert, select, text
+from app.database.database import engine, SessionLocal
+from app.database.migrations import create_schema
+from app.models.user import User
+from app.models.parcel import Parcel
+from app.services.auth import get_password_hash
+from app.services.geohash import encode_many
+from app.services.maps import DistanceEngine, calculate_quotes
+from app.services.stats import rebuild_counters
+
+# (name, lat, lng, share of parcels, spread in km)
+CITIES = [
+    ("Nairobi", -1.2864, 36.8172, 0.55, 9.0),
+    ("Mombasa", -4.0435, 39.6682, 0.14, 6.0),
+    ("Kisumu", -0.0917, 34.7680, 0.09, 5.0),
+    ("Nakuru", -0.3031, 36.0800, 0.09, 5.0),
+    ("Eldoret", 0.5143, 35.2698, 0.08, 4.0),
+    ("Thika", -1.0333, 37.0693, 0.05, 3.0),
+]
+NEIGHBOURHOODS_PER_CITY = 12
+NEIGHBOURHOOD_SPREAD_KM = 1.2
+INTERCITY_SHARE = 0.08
+WEIGHT_MIX = {"small": 0.6, "medium": 0.3, "large": 0.1}
+# Relative order volume by UTC hour of day (Kenya is UTC+3)
+HOURLY_PROFILE = np.array([1, 1, 1, 1, 2, 4, 7, 9, 10, 10, 9, 8, 8, 8, 7, 6, 5, 4, 3, 2, 2, 1, 1, 1], dtype=float)
+WEEKDAY_PROFILE = np.array([1.0, 1.0, 1.0, 1.0, 1.1, 0.8, 0.5])  # Monday first
+STREETS = ["Moi Ave", "Kenyatta Ave", "Ngong Rd", "Mombasa Rd", "Waiyaki Way", "Thika Rd",
+           "Jogoo Rd", "Langata Rd", "Kimathi St", "Tom Mboya St", "Haile Selassie Ave", "Oginga Odinga St"]
+FIRST_NAMES = ["Amina", "Brian", "Cynthia", "David", "Esther", "Felix", "Grace", "Hassan",
+               "Irene", "James", "Kevin", "Lucy", "Mercy", "Njeri", "Otieno", "Wanjiru"]
+LAST_NAMES = ["Kamau", "Odhiambo", "Mwangi", "Wanjiku", "Kiprop", "Achieng", "Mutua", "Njoroge",
+              "Omondi", "Chebet", "Kariuki", "Mohamed"]
+KM_PER_DEGREE = 111.32
+CHUNK_SIZE = 100_000
+INSERT_BATCH_SIZE = 10_000
+
+PARCEL_COLUMNS = [
+    "user_id", "pickup_address", "destination_address",
+    "pickup_lat", "pickup_lng", "destination_lat", "destination_lng",
+    "pickup_geohash", "destination_geohash",
+    "weight_category", "quote_amount", "status", "present_location",
+    "distance_km", "duration_mins", "created_at", "updated_at",
+]
+
+
+def neighbourhood_centres(rng: np.random.Generator) -> np.ndarray:
+    """(cities, neighbourhoods, 2) centres scattered around each city centre"""
+    centres = np.empty((len(CITIES), NEIGHBOURHOODS_PER_CITY, 2))
+    for index, (_, lat, lng, _, spread_km) in enumerate(CITIES):
+        offsets = rng.normal(0, spread_km / KM_PER_DEGREE, (NEIGHBOURHOODS_PER_CITY, 2))
+        centres[index] = np.array([lat, lng]) + offsets
+    return centres
+
+
+def clustered_points(rng: np.random.Generator, centres: np.ndarray, cities: np.ndarray) -> np.ndarray:
+    """One point per entry of ``cities``, near a random neighbourhood of that city"""
+    neighbourhoods = rng.integers(0, NEIGHBOURHOODS_PER_CITY, len(cities))
+    spread = NEIGHBOURHOOD_SPREAD_KM / KM_PER_DEGREE
+    return centres[cities, neighbourhoods] + rng.normal(0, spread, (len(cities), 2))
+
+
+def creation_times(rng: np.random.Generator, count: int, end: datetime, days: int) -> np.ndarray:
+    """Creation times as seconds before ``end``, oldest first"""
+    # Volume grows linearly over the period and dips at weekends
+    days_before = np.arange(days)
+    weekdays = ((end - timedelta(days=1)).weekday() - days_before) % 7
+    day_weights = (days - days_before) * WEEKDAY_PROFILE[weekdays]
+    day = rng.choice(days, count, p=day_weights / day_weights.sum())
+    hour = rng.choice(24, count, p=HOURLY_PROFILE / HOURLY_PROFILE.sum())
+    seconds_into_day = hour * 3600 + rng.integers(0, 3600, count)
+    return np.sort((day + 1) * 86400 - seconds_into_day)[::-1]
+
+
+def statuses_for_age(rng: np.random.Generator, age_hours: np.ndarray) -> np.ndarray:
+    draw = rng.random(len(age_hours))
+    fresh = np.select([draw < 0.6, draw < 0.95], ["pending", "in_transit"], "cancelled")
+    recent = np.select([draw < 0.1, draw < 0.6, draw < 0.95], ["pending", "in_transit", "delivered"], "cancelled")
+    settled = np.select([draw < 0.02, draw < 0.92], ["in_transit", "delivered"], "cancelled")
+    return np.select([age_hours < 24, age_hours < 72], [fresh, recent], settled)
+
+
+def addresses(rng: np.random.Generator, cities: np.ndarray) -> list:
+    numbers = rng.integers(1, 999, len(cities)).tolist()
+    streets = rng.integers(0, len(STREETS), len(cities)).tolist()
+    return [f"{number} {STREETS[street]}, {CITIES[city][0]}"
+            for number, street, city in zip(numbers, streets, cities.tolist())]
+
+
+def generate_parcels(rng: np.random.Generator, centres: np.ndarray, user_ids: np.ndarray,
+                     user_shares: np.ndarray, seconds_before_end: np.ndarray, end: datetime):
+    """Rows (tuples in PARCEL_COLUMNS order) for one chunk of parcels"""
+    count = len(seconds_before_end)
+    shares = np.array([city[3] for city in CITIES])
+    pickup_cities = rng.choice(len(CITIES), count, p=shares / shares.sum())
+    destination_cities = np.where(
+        rng.random(count) < INTERCITY_SHARE, rng.choice(len(CITIES), count, p=shares / shares.sum()), pickup_cities
+    )
+    pickups = clustered_points(rng, centres, pickup_cities)
+    destinations = clustered_points(rng, centres, destination_cities)
+
+    weights = rng.choice(list(WEIGHT_MIX), count, p=list(WEIGHT_MIX.values()))
+    distance_m, duration_s = DistanceEngine().estimate(pickups, destinations)
+    distance_km = np.round(distance_m / 1000, 2)
+    quotes = calculate_quotes(weights, distance_km)
+
+    age_hours = seconds_before_end / 3600
+    statuses = statuses_for_age(rng, age_hours)
+    # Updates follow creation by minutes to a couple of days, never past the end
+    update_delay = np.minimum(rng.lognormal(np.log(6 * 3600), 1.0, count), seconds_before_end)
+    created_at = [end - timedelta(seconds=int(seconds)) for seconds in seconds_before_end.tolist()]
+    updated_at = [
+        None if status == "pending" else end - timedelta(seconds=int(seconds))
+        for status, seconds in zip(statuses.tolist(), (seconds_before_end - update_delay).tolist())
+    ]
+
+    pickup_addresses = addresses(rng, pickup_cities)
+    destination_addresses = addresses(rng, destination_cities)
+    present_locations = [
+        f"{CITIES[city][0]} sorting hub" if status == "in_transit"
+        else destination if status == "delivered" else None
+        for status, city, destination in zip(statuses.tolist(), pickup_cities.tolist(), destination_addresses)
+    ]
+
+    return list(zip(
+        rng.choice(user_ids, count, p=user_shares).tolist(),
+        pickup_addresses, destination_addresses,
+        pickups[:, 0].tolist(), pickups[:, 1].tolist(), destinations[:, 0].tolist(), destinations[:, 1].tolist(),
+        encode_many(pickups[:, 0], pickups[:, 1]), encode_many(destinations[:, 0], destinations[:, 1]),
+        weights.tolist(), quotes.tolist(), statuses.tolist(), present_locations,
+        distance_km.tolist(), np.rint(duration_s / 60).astype(int).tolist(), created_at, updated_at,
+    ))
+
+
+def user_weights(count: int) -> np.ndarray:
+    """Zipf-like activity: a few users send many parcels, most send a handful"""
+    weights = 1 / np.arange(1, count + 1) ** 0.8
+    return weights / weights.sum()
+
+
+def insert_rows(connection, table, columns, rows):
+    """COPY on PostgreSQL, batched executemany elsewhere"""
+    if connection.dialect.name == "postgresql":
+        cursor = connection.connection.driver_connection.cursor()
+        with cursor.copy(f"COPY {table.name} ({', '.join(columns)}) FROM STDIN") as copy:
+            for row in rows:
+                copy.write_row(row)
+        return
+    for offset in range(0, len(rows), INSERT_BATCH_SIZE):
+        connection.execute(insert(table), [dict(zip(columns, row)) for row in rows[offset:offset + INSERT_BATCH_SIZE]])
+
+
+def seed_users(count: int, password: str, rng: np.random.Generator, end: datetime) -> np.ndarray:
+    hashed = get_password_hash(password)
+    first = rng.integers(0, len(FIRST_NAMES), count).tolist()
+    last = rng.integers(0, len(LAST_NAMES), count).tolist()
+    joined = np.sort(rng.integers(0, 400 * 86400, count))[::-1].tolist()
+    columns = ["email", "hashed_password", "full_name", "is_active", "is_admin", "created_at"]
+    rows = [
+        (f"seed{index}@example.com", hashed, f"{FIRST_NAMES[first[index]]} {LAST_NAMES[last[index]]}",
+         True, False, end - timedelta(seconds=joined[index]))
+        for index in range(count)
+    ]
+    with engine.begin() as connection:
+        insert_rows(connection, User.__table__, columns, rows)
+        user_ids = connection.execute(
+            select(User.id).where(User.email.like("seed%@example.com")).order_by(User.id)
+        ).scalars().all()
+    return np.array(user_ids)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--parcels", type=int, default=1_000_000)
+    parser.add_argument("--days", type=int, default=365, help="period the parcels are spread over")
+    parser.add_argument("--end", default="2026-01-01", help="date the period ends (UTC)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--password", default="seed-password")
+    args = parser.parse_args()
+
+    create_schema(engine)
+    with engine.connect() as connection:
+        if connection.execute(select(User.id).where(User.email == "seed0@example.com")).first():
+            sys.exit("This database is already seeded; use an empty database")
+
+    end = datetime.fromisoformat(args.end).replace(tzinfo=timezone.utc)
+    rng = np.random.default_rng(args.seed)
+    started = time.perf_counter()
+
+    user_ids = seed_users(args.users, args.password, rng, end)
+    print(f"users: {len(user_ids)} in {time.perf_counter() - started:.1f} s")
+
+    centres = neighbourhood_centres(rng)
+    user_shares = user_weights(len(user_ids))
+    seconds_before_end = creation_times(rng, args.parcels, end, args.days)
+    for offset in range(0, args.parcels, CHUNK_SIZE):
+        rows = generate_parcels(rng, centres, user_ids, user_shares, seconds_before_end[offset:offset + CHUNK_SIZE], end)
+        with engine.begin() as connection:
+            insert_rows(connection, Parcel.__table__, PARCEL_COLUMNS, rows)
+        done = min(args.parcels, offset + CHUNK_SIZE)
+        elapsed = time.perf_counter() - started
+        print(f"parcels: {done}/{args.parcels} ({done / elapsed:.0f} rows/s)")
+
+    db = SessionLocal()
+    try:
+        rebuild_counters(db)
+        db.execute(text("ANALYZE"))
+        db.commit()
+    finally:
+        db.close()
+    print(f"done in {time.perf_counter() - started:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
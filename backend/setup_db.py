@@ -1,10 +1,11 @@
 #!/usr/bin/env python3
-from app.database.database import engine, Base, SessionLocal
+from app.database.database import engine, SessionLocal
+from app.database.migrations import create_schema
 from app.models.user import User
 from app.services.auth import get_password_hash
 
 print("Creating database tables...")
-Base.metadata.create_all(bind=engine)
+create_schema(engine)
 print("Database initialized successfully!")
 
 print("Creating admin user...")
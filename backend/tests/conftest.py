@@ -1,14 +1,22 @@
+import os
+
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
+# Background workers poll the real database; tests drive them explicitly
+os.environ.setdefault("EMAIL_OUTBOX_WORKER_ENABLED", "false")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ.setdefault("METRICS_ENABLED", "true")
+os.environ.setdefault("METRICS_TOKEN", "test-metrics-token")
+
 from app.main import app
 from app.database.database import Base, get_db
 from app.models.user import User
 from app.models.parcel import Parcel
-from app.services.auth import get_password_hash, create_access_token
+from app.services.auth import get_password_hash, create_access_token, principal_cache
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
 
@@ -19,6 +27,12 @@ engine = create_engine(
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+@pytest.fixture(autouse=True)
+def clear_principal_cache():
+    principal_cache.clear()
+    yield
+    principal_cache.clear()
+
 @pytest.fixture(scope="function")
 def db_session():
     Base.metadata.create_all(bind=engine)
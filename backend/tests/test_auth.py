@@ -114,3 +114,70 @@ def test_login_inactive_user(client: TestClient, db: Session):
     response = client.post("/auth/login", data=login_data)
     assert response.status_code == 400
     assert "Inactive user" in response.json()["detail"]
+
+def test_principal_is_cached_between_requests(client, auth_headers, db_session):
+    from sqlalchemy import event
+
+    statements = []
+    def count_user_queries(conn, cursor, statement, parameters, context, executemany):
+        if "FROM users" in statement:
+            statements.append(statement)
+
+    engine = db_session.get_bind()
+    event.listen(engine, "before_cursor_execute", count_user_queries)
+    try:
+        for _ in range(3):
+            assert client.get("/parcels/", headers=auth_headers).status_code == 200
+    finally:
+        event.remove(engine, "before_cursor_execute", count_user_queries)
+
+    assert len(statements) == 1
+
+def test_principal_cache_invalidated_on_role_change(client, auth_headers, test_user, db_session):
+    assert client.get("/parcels/all", headers=auth_headers).status_code == 403
+
+    test_user.is_admin = True
+    db_session.commit()
+    assert client.get("/parcels/all", headers=auth_headers).status_code == 200
+
+    test_user.is_active = False
+    db_session.commit()
+    response = client.get("/parcels/", headers=auth_headers)
+    assert response.status_code == 400
+    assert "Inactive user" in response.json()["detail"]
+
+
+def test_password_hasher_rejects_when_saturated():
+    import asyncio
+    from fastapi import HTTPException
+    from app.services.auth import PasswordHasher, verify_password
+
+    hasher = PasswordHasher(workers=1, max_pending=0)
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(hasher.hash("secret"))
+    assert exc_info.value.status_code == 503
+
+    hasher = PasswordHasher(workers=1, max_pending=4)
+    hashed = asyncio.run(hasher.hash("secret"))
+    assert verify_password("secret", hashed)
+    assert asyncio.run(hasher.verify("secret", hashed))
+    hasher.shutdown()
+
+def test_register_race_on_same_email(client: TestClient, db_session, monkeypatch):
+    """An email registered while the password is being hashed is still rejected."""
+    from app.services.auth import password_hasher
+
+    original_hash = password_hasher.hash
+
+    async def hash_while_other_request_registers(password):
+        db_session.add(User(email="race@example.com", full_name="Other", hashed_password="x"))
+        db_session.commit()
+        return await original_hash(password)
+
+    monkeypatch.setattr(password_hasher, "hash", hash_while_other_request_registers)
+
+    response = client.post(
+        "/auth/register", json={"email": "race@example.com", "full_name": "Racer", "password": "testpassword"}
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Email already registered"
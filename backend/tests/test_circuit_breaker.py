@@ -0,0 +1,70 @@
+from app.services.circuit_breaker import CircuitBreaker
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker("test", failure_threshold=3, reset_seconds=10, clock=FakeClock())
+
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success(0.1)  # resets the run of failures
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+    assert breaker.trips == 1
+
+
+def test_breaker_counts_slow_calls_as_failures():
+    breaker = CircuitBreaker("test", failure_threshold=2, latency_slo_seconds=0.5, clock=FakeClock())
+
+    breaker.record_success(0.6)
+    breaker.record_success(0.7)
+
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_breaker_half_opens_for_a_single_probe():
+    clock = FakeClock()
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_seconds=10, clock=clock)
+    breaker.record_failure()
+
+    clock.now = 9.9
+    assert not breaker.allow()
+
+    clock.now = 10.0
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()  # only one probe at a time
+
+    # A failed probe re-opens the circuit for another reset period
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    clock.now = 15.0
+    assert not breaker.allow()
+
+    clock.now = 20.0
+    assert breaker.allow()
+    breaker.record_success(0.1)
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+    assert breaker.trips == 2
+
+
+def test_late_success_does_not_close_an_open_circuit():
+    breaker = CircuitBreaker("test", failure_threshold=1, clock=FakeClock())
+    breaker.record_failure()
+
+    breaker.record_success(0.1)
+
+    assert breaker.state == CircuitBreaker.OPEN
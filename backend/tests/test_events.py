@@ -0,0 +1,123 @@
+import asyncio
+
+from app.services.events import LocalEventBroker, SQLiteEventBroker, event_broker, format_sse
+
+def test_local_broker_delivers_only_to_the_owner():
+    broker = LocalEventBroker()
+
+    async def scenario():
+        mine = broker.subscribe(1)
+        other = broker.subscribe(2)
+        # Sync handlers publish from threadpool threads
+        await asyncio.to_thread(broker.publish, 1, {"change": "status", "parcel_id": 7})
+        assert await mine.get(1) == {"change": "status", "parcel_id": 7}
+        assert await other.get(0.05) is None
+        broker.unsubscribe(mine)
+        broker.unsubscribe(other)
+        assert broker.subscriber_count() == 0
+
+    asyncio.run(scenario())
+
+def test_slow_subscriber_drops_oldest_events():
+    broker = LocalEventBroker()
+
+    async def scenario():
+        subscription = broker.subscribe(1)
+        for i in range(subscription.queue.maxsize + 5):
+            subscription.put({"parcel_id": i})
+        assert subscription.dropped == 5
+        assert (await subscription.get(1))["parcel_id"] == 5
+
+    asyncio.run(scenario())
+
+def test_sqlite_broker_fans_out_between_workers(tmp_path):
+    path = str(tmp_path / "events.db")
+    publisher = SQLiteEventBroker(path)
+    worker = SQLiteEventBroker(path, poll_seconds=0.01)
+
+    async def scenario():
+        publisher.publish(1, {"change": "before-subscribe"})
+        subscription = worker.subscribe(1)
+        publisher.publish(1, {"change": "location"})
+        assert await subscription.get(1) == {"change": "location"}
+        worker.unsubscribe(subscription)
+        worker.close()
+
+    asyncio.run(scenario())
+
+def test_parcel_changes_are_published(client, auth_headers, admin_headers, test_user, db_session):
+    from app.models.parcel import Parcel, ParcelStatus, WeightCategory
+
+    parcel = Parcel(
+        user_id=test_user.id,
+        pickup_address="123 Start St",
+        destination_address="456 End Ave",
+        pickup_lat=-1.2864,
+        pickup_lng=36.8172,
+        destination_lat=-1.3000,
+        destination_lng=36.8000,
+        weight_category=WeightCategory.small,
+        quote_amount=10.0,
+        status=ParcelStatus.pending
+    )
+    db_session.add(parcel)
+    db_session.commit()
+
+    async def scenario():
+        subscription = event_broker.subscribe(test_user.id)
+        try:
+            await asyncio.to_thread(
+                client.put, f"/parcels/{parcel.id}/admin",
+                json={"present_location": "Depot"}, headers=admin_headers
+            )
+            await asyncio.to_thread(client.put, f"/parcels/{parcel.id}/cancel", headers=auth_headers)
+            location = await subscription.get(1)
+            cancelled = await subscription.get(1)
+        finally:
+            event_broker.unsubscribe(subscription)
+        assert (location["change"], location["present_location"]) == ("location", "Depot")
+        assert (cancelled["change"], cancelled["status"]) == ("status", "cancelled")
+        assert format_sse(cancelled).startswith("event: parcel\ndata: {")
+
+    asyncio.run(scenario())
+
+def test_stream_requires_a_token(client):
+    assert client.get("/parcels/stream").status_code == 401
+    assert client.get("/parcels/stream", params={"ticket": "not-a-token"}).status_code == 401
+
+def test_stream_tickets_only_open_the_stream(client, auth_headers, test_user, db_session):
+    from starlette.requests import Request
+    from app.services.auth import get_stream_user
+
+    response = client.post("/parcels/stream/ticket", headers=auth_headers)
+    assert response.status_code == 200
+    ticket = response.json()["ticket"]
+    assert response.json()["expires_in"] == 60
+
+    principal = get_stream_user(Request({"type": "http", "headers": []}), ticket=ticket, bearer=None, db=db_session)
+    assert principal.id == test_user.id
+
+    # A ticket is not an access token, and an access token is not a ticket
+    assert client.get("/parcels/", headers={"Authorization": f"Bearer {ticket}"}).status_code == 401
+    access_token = auth_headers["Authorization"].removeprefix("Bearer ")
+    assert client.get("/parcels/stream", params={"ticket": access_token}).status_code == 401
+
+def test_sqlite_broker_publishes_many_events_in_one_commit(tmp_path):
+    path = str(tmp_path / "events.db")
+    publisher = SQLiteEventBroker(path)
+    worker = SQLiteEventBroker(path, poll_seconds=0.01)
+    statements = []
+    publisher._connection().set_trace_callback(statements.append)
+
+    async def scenario():
+        subscription = worker.subscribe(1)
+        await asyncio.sleep(0.05)
+        publisher.publish_many((user_id, {"parcel_id": i}) for i, user_id in enumerate([1, 2] * 50))
+        received = [await subscription.get(1) for _ in range(50)]
+        worker.unsubscribe(subscription)
+        worker.close()
+        return received
+
+    received = asyncio.run(scenario())
+    assert [event["parcel_id"] for event in received] == list(range(0, 100, 2))
+    assert statements.count("COMMIT") == 1
@@ -0,0 +1,16 @@
+import numpy as np
+
+from app.services.geohash import encode, encode_many
+
+
+def test_encode_matches_reference_geohash():
+    # Reference values from geohash.org
+    assert encode(57.64911, 10.40744, 11) == "u4pruydqqvj"
+    assert encode(-1.2864, 36.8172, 5) == "kzf0t"
+
+
+def test_encode_many_matches_encode():
+    rng = np.random.default_rng(0)
+    lats, lngs = rng.uniform(-90, 90, 2000), rng.uniform(-180, 180, 2000)
+    assert encode_many(lats, lngs) == [encode(lat, lng) for lat, lng in zip(lats.tolist(), lngs.tolist())]
+    assert encode_many([90, -90], [180, -180], 4) == ["zzzz", "0000"]
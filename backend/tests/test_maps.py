@@ -0,0 +1,198 @@
+import asyncio
+import time
+
+import httpx
+import numpy as np
+
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.maps import (
+    AsyncMapsService, DistanceCache, DistanceEngine, MapsService, calculate_quotes, format_duration
+)
+
+ELEMENT = {
+    "distance": {"text": "5.0 km", "value": 5000},
+    "duration": {"text": "0h 10m", "value": 600},
+    "status": "OK",
+}
+
+def test_distance_cache_snaps_nearby_coordinates():
+    cache = DistanceCache(max_size=10, ttl_seconds=60, grid_degrees=0.001)
+    cache.set((-1.28640, 36.81720), (-1.30000, 36.80000), ELEMENT)
+
+    assert cache.get((-1.28642, 36.81718), (-1.30001, 36.80002)) == ELEMENT
+    assert cache.get((-1.29000, 36.81720), (-1.30000, 36.80000)) is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+def test_distance_cache_evicts_least_recently_used():
+    cache = DistanceCache(max_size=2, ttl_seconds=60)
+    cache.set((0.0, 0.0), (0.0, 1.0), ELEMENT)
+    cache.set((0.0, 0.0), (0.0, 2.0), ELEMENT)
+    cache.get((0.0, 0.0), (0.0, 1.0))
+    cache.set((0.0, 0.0), (0.0, 3.0), ELEMENT)
+
+    assert cache.get((0.0, 0.0), (0.0, 2.0)) is None
+    assert cache.get((0.0, 0.0), (0.0, 1.0)) == ELEMENT
+    assert cache.stats()["evictions"] == 1
+
+def test_distance_cache_expires_entries():
+    cache = DistanceCache(max_size=10, ttl_seconds=-1)
+    cache.set((0.0, 0.0), (0.0, 1.0), ELEMENT)
+
+    assert cache.get((0.0, 0.0), (0.0, 1.0)) is None
+
+def test_distance_cache_persists_across_instances(tmp_path):
+    path = str(tmp_path / "maps_cache.db")
+    DistanceCache(persist_path=path).set((0.0, 0.0), (0.0, 1.0), ELEMENT)
+
+    assert DistanceCache(persist_path=path).get((0.0, 0.0), (0.0, 1.0)) == ELEMENT
+
+class FakeGoogleClient:
+    def __init__(self):
+        self.calls = []
+
+    def distance_matrix(self, origins, destinations, mode, units):
+        self.calls.append((list(origins), list(destinations)))
+        return {
+            "status": "OK",
+            "rows": [{"elements": [ELEMENT for _ in destinations]} for _ in origins],
+        }
+
+def test_distance_engine_matches_great_circle_distance():
+    engine = DistanceEngine(circuity=1.0)
+    # London to Paris is about 343.5 km along the great circle
+    distance_m, _ = engine.estimate([(51.5074, -0.1278)], [(48.8566, 2.3522)])
+    assert abs(distance_m[0] - 343_500) < 1_000
+
+    road = DistanceEngine(circuity=1.3)
+    assert road.estimate([(51.5074, -0.1278)], [(48.8566, 2.3522)])[0][0] == np.float64(distance_m[0] * 1.3)
+
+def test_distance_engine_speed_profile_is_continuous():
+    engine = DistanceEngine(circuity=1.0, speed_profile="5:20,inf:60")
+    # Along the equator one degree of longitude is ~111.2 km
+    distances = np.array([4.99, 5.0, 5.01, 50.0]) / 111.195
+    origins = np.zeros((4, 2))
+    destinations = np.column_stack([np.zeros(4), distances])
+    _, duration_s = engine.estimate(origins, destinations)
+
+    assert abs(duration_s[1] - 15 * 60) < 5
+    assert np.all(np.diff(duration_s) > 0)
+    assert abs(duration_s[3] - (15 * 60 + 45 * 60)) < 10
+    assert format_duration(3900) == "1 hour 5 mins"
+
+def test_vectorized_quotes_match_scalar_pricing():
+    service = MapsService(engine=DistanceEngine())
+    categories = ["small", "medium", "large"]
+    distances = [1.25, 10.0, 33.3]
+
+    assert calculate_quotes(categories, distances).tolist() == [
+        service.calculate_quote(category, distance) for category, distance in zip(categories, distances)
+    ]
+
+def test_batch_distance_matrix_chunks_requests():
+    service = MapsService(cache=DistanceCache())
+    service.gmaps = FakeGoogleClient()
+    depot = (-1.2864, 36.8172)
+    pairs = [(depot, (-1.0 - i * 0.01, 36.0)) for i in range(60)]
+
+    results = service.calculate_distance_matrix_batch(pairs)
+
+    assert results == [ELEMENT] * 60
+    assert len(service.gmaps.calls) == 3
+    assert all(len(o) * len(d) <= 100 for o, d in service.gmaps.calls)
+
+    # A second pass is served entirely from the cache
+    service.calculate_distance_matrix_batch(pairs)
+    assert len(service.gmaps.calls) == 3
+
+def test_batch_distance_matrix_bills_only_requested_pairs():
+    service = MapsService(cache=DistanceCache())
+    service.gmaps = FakeGoogleClient()
+    # Ten couriers, each with its own three drops
+    pairs = [((-1.0 - i * 0.01, 36.0), (-2.0 - i * 0.01 - j * 0.001, 37.0)) for i in range(10) for j in range(3)]
+
+    assert service.calculate_distance_matrix_batch(pairs) == [ELEMENT] * 30
+    assert len(service.gmaps.calls) == 10
+    assert sum(len(o) * len(d) for o, d in service.gmaps.calls) == 30
+
+def test_async_maps_service_fetches_distance_and_polyline():
+    requests = []
+
+    def handler(request):
+        requests.append(request.url.path)
+        if request.url.path.endswith("/distancematrix/json"):
+            return httpx.Response(200, json={"status": "OK", "rows": [{"elements": [ELEMENT]}]})
+        return httpx.Response(200, json={
+            "status": "OK",
+            "routes": [{
+                "legs": [{"distance": ELEMENT["distance"], "duration": ELEMENT["duration"]}],
+                "overview_polyline": {"points": "abc"},
+            }],
+        })
+
+    async def run():
+        service = AsyncMapsService(MapsService(cache=DistanceCache()))
+        service.enabled = True
+        service._client = httpx.AsyncClient(
+            transport=httpx.MockTransport(handler), base_url="https://maps.test"
+        )
+        route = await service.get_route((0.0, 0.0), (0.0, 1.0))
+        cached = await service.calculate_distance_matrix((0.0, 0.0), (0.0, 1.0))
+        await service.aclose()
+        return route, cached
+
+    (distance_info, polyline), cached = asyncio.run(run())
+
+    assert distance_info == ELEMENT
+    assert polyline == "abc"
+    assert cached == ELEMENT
+    # One Directions request; the leg's distance is cached for later lookups
+    assert requests == ["/directions/json"]
+
+def test_slow_google_falls_back_to_flagged_estimate_and_opens_circuit():
+    requests = []
+
+    async def handler(request):
+        requests.append(request.url.path)
+        await asyncio.sleep(1)
+        return httpx.Response(200, json={"status": "OK", "rows": [{"elements": [ELEMENT]}]})
+
+    async def run():
+        breaker = CircuitBreaker("test", failure_threshold=2, reset_seconds=60)
+        service = AsyncMapsService(MapsService(cache=DistanceCache(), breaker=breaker), deadline=0.05)
+        service.enabled = True
+        service._client = httpx.AsyncClient(
+            transport=httpx.MockTransport(handler), base_url="https://maps.test"
+        )
+        started = time.perf_counter()
+        results = [await service.calculate_distance_matrix((0.0, 0.0), (0.0, 0.1)) for _ in range(5)]
+        elapsed = time.perf_counter() - started
+        await service.aclose()
+        return breaker, results, elapsed
+
+    breaker, results, elapsed = asyncio.run(run())
+
+    # Two calls hit the deadline, then the open circuit answers immediately
+    assert len(requests) == 2
+    assert breaker.state == CircuitBreaker.OPEN
+    assert elapsed < 0.5
+    assert all(result["estimate"] for result in results)
+    assert results[0]["distance"]["value"] > 0
+
+def test_batch_stops_calling_google_while_circuit_is_open():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_seconds=60)
+    service = MapsService(cache=DistanceCache(), breaker=breaker)
+    service.gmaps = FakeGoogleClient()
+    breaker.record_failure()
+    pairs = [((-1.2864, 36.8172), (-1.0 - i * 0.01, 36.0)) for i in range(30)]
+
+    results = service.calculate_distance_matrix_batch(pairs)
+
+    assert service.gmaps.calls == []
+    assert all(result["estimate"] for result in results)
+
+def test_estimates_are_not_flagged_without_google():
+    service = MapsService(cache=DistanceCache())
+    service.gmaps = None
+
+    assert "estimate" not in service.calculate_distance_matrix((0.0, 0.0), (0.0, 0.1))
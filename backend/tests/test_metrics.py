@@ -0,0 +1,131 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+
+import httpx
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.middleware.metrics import MetricsMiddleware
+from app.services.email import EmailService
+from app.services.metrics import MetricsRegistry, metrics
+
+
+def sample(text, line_prefix):
+    for line in text.splitlines():
+        if line.startswith(line_prefix + " "):
+            return float(line.rsplit(" ", 1)[1])
+    return None
+
+
+def test_histogram_per_route_template_and_status():
+    registry = MetricsRegistry()
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware, registry=registry)
+
+    @app.get("/parcels/{parcel_id}")
+    def parcel(parcel_id: int):
+        return {"id": parcel_id}
+
+    with TestClient(app) as client:
+        client.get("/parcels/1")
+        client.get("/parcels/2")
+        client.get("/parcels/x")
+        client.get("/missing")
+
+    text = registry.render()
+    series = 'http_request_duration_seconds_count{method="GET",route="/parcels/{parcel_id}",status="200"}'
+    assert sample(text, series) == 2
+    assert sample(text, series.replace("200", "422")) == 1
+    assert sample(text, 'http_request_duration_seconds_count{method="GET",route="unmatched",status="404"}') == 1
+    assert sample(text, 'http_request_duration_seconds_bucket{method="GET",route="unmatched",status="404",le="+Inf"}') == 1
+    assert sample(text, "http_requests_in_flight") == 0
+    assert "# TYPE http_request_duration_seconds histogram" in text
+
+
+def test_metrics_merge_across_workers(tmp_path):
+    registry = MetricsRegistry(str(tmp_path))
+    registry.add_collector(lambda: [("db_pool_checked_out", {}, 2)])
+    registry.inc("maps_requests_total", api="directions")
+    registry.observe("http_request_duration_seconds", 0.02, method="GET", route="/health", status=200)
+
+    # A worker that has exited: its counters still count, its gauges do not
+    dead = subprocess.Popen([sys.executable, "-c", "pass"])
+    dead.wait()
+    (tmp_path / f"metrics-{dead.pid}.json").write_text(json.dumps({
+        "pid": dead.pid,
+        "counters": [["maps_requests_total", {"api": "directions"}, 3]],
+        "histograms": [["http_request_duration_seconds", {"method": "GET", "route": "/health", "status": "200"},
+                        [1] + [0] * 11 + [0.001]]],
+        "gauges": [["db_pool_checked_out", {}, 5]],
+    }))
+
+    text = registry.render()
+    assert sample(text, 'maps_requests_total{api="directions"}') == 4
+    assert sample(text, 'http_request_duration_seconds_count{method="GET",route="/health",status="200"}') == 2
+    assert sample(text, 'http_request_duration_seconds_bucket{method="GET",route="/health",status="200",le="0.005"}') == 1
+    assert sample(text, "db_pool_checked_out") == 2
+
+    registry.start()
+    registry.stop()
+    assert not (tmp_path / f"metrics-{dead.pid}.json").exists()
+    assert json.loads((tmp_path / f"metrics-{os.getpid()}.json").read_text())["counters"]
+
+
+def test_metrics_endpoint(client):
+    client.get("/health")
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    response = client.get("/metrics", headers={"Authorization": "Bearer test-metrics-token"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'http_request_duration_seconds_count{method="GET",route="/health",status="200"}' in response.text
+    assert "db_pool_checked_out" in response.text
+    assert "maps_cache_hit_ratio" in response.text
+
+
+def test_email_requests_and_errors_counted():
+    service = EmailService()
+    statuses = iter([202, 500])
+    service._client = httpx.Client(
+        base_url="https://sendgrid.test",
+        transport=httpx.MockTransport(lambda request: httpx.Response(next(statuses))),
+    )
+    service.enabled = True
+    before = metrics.render()
+
+    assert service.send_notification("a@example.com", "Hi", "<p>Hi</p>")
+    assert not service.send_notification("b@example.com", "Hi", "<p>Hi</p>")
+
+    after = metrics.render()
+    assert (sample(after, "email_requests_total") or 0) - (sample(before, "email_requests_total") or 0) == 2
+    assert (sample(after, "email_errors_total") or 0) - (sample(before, "email_errors_total") or 0) == 1
+
+
+def test_maps_requests_and_errors_counted():
+    from app.services.maps import AsyncMapsService, MapsService
+
+    service = AsyncMapsService(MapsService())
+    service.enabled, service.api_key = True, "test-key"
+    statuses = iter(["OK", "OVER_QUERY_LIMIT"])
+    service._client = httpx.AsyncClient(
+        base_url="https://maps.test",
+        transport=httpx.MockTransport(lambda request: httpx.Response(
+            200, json={"status": next(statuses), "routes": [{"overview_polyline": {"points": "abc"}}]}
+        )),
+    )
+    series = 'maps_requests_total{api="directions"}'
+    before = metrics.render()
+
+    async def fetch():
+        return [await service.get_route_polyline((0, 0), (1, 1)) for _ in range(2)]
+
+    assert asyncio.run(fetch()) == ["abc", None]
+
+    after = metrics.render()
+    assert (sample(after, series) or 0) - (sample(before, series) or 0) == 2
+    errors = series.replace("requests", "errors")
+    assert (sample(after, errors) or 0) - (sample(before, errors) or 0) == 1
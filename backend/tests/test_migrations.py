@@ -0,0 +1,68 @@
+from sqlalchemy import create_engine, inspect, text
+
+from app.database.database import SessionLocal
+from app.database.migrations import create_schema
+from app.models.parcel import Parcel
+from app.services.nearby import backfill_geohashes
+
+# The parcels and users tables as first deployed, before any column was added
+BASELINE_SCHEMA = [
+    """CREATE TABLE users (
+        id INTEGER PRIMARY KEY, email VARCHAR NOT NULL UNIQUE, hashed_password VARCHAR NOT NULL,
+        full_name VARCHAR NOT NULL, is_active BOOLEAN, is_admin BOOLEAN,
+        created_at DATETIME DEFAULT (CURRENT_TIMESTAMP), updated_at DATETIME
+    )""",
+    """CREATE TABLE parcels (
+        id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL REFERENCES users (id),
+        pickup_address VARCHAR NOT NULL, destination_address VARCHAR NOT NULL,
+        pickup_lat FLOAT NOT NULL, pickup_lng FLOAT NOT NULL,
+        destination_lat FLOAT NOT NULL, destination_lng FLOAT NOT NULL,
+        weight_category VARCHAR(6) NOT NULL, quote_amount FLOAT NOT NULL, status VARCHAR(10) NOT NULL,
+        present_location VARCHAR, distance_km FLOAT, duration_mins INTEGER,
+        created_at DATETIME DEFAULT (CURRENT_TIMESTAMP), updated_at DATETIME
+    )""",
+    "INSERT INTO users (id, email, hashed_password, full_name) VALUES (1, 'a@example.com', 'x', 'A')",
+    """INSERT INTO parcels (id, user_id, pickup_address, destination_address, pickup_lat, pickup_lng,
+        destination_lat, destination_lng, weight_category, quote_amount, status)
+        VALUES (1, 1, 'Pickup', 'Destination', -1.28, 36.81, -1.30, 36.80, 'small', 7.0, 'pending')""",
+]
+
+
+def baseline_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'baseline.db'}")
+    with engine.begin() as connection:
+        for statement in BASELINE_SCHEMA:
+            connection.execute(text(statement))
+    return engine
+
+
+def test_create_schema_adds_columns_to_existing_tables(tmp_path):
+    engine = baseline_engine(tmp_path)
+
+    create_schema(engine)
+    create_schema(engine)  # a second start finds nothing to do
+
+    inspector = inspect(engine)
+    columns = {column["name"] for column in inspector.get_columns("parcels")}
+    assert {"distance_text", "duration_text", "route_polyline", "route_coordinates"} <= columns
+    assert {"pickup_geohash", "destination_geohash", "quote_is_estimate"} <= columns
+    indexes = {index["name"] for index in inspector.get_indexes("parcels")}
+    assert {"ix_parcels_status_pickup_geohash", "ix_parcels_quote_estimate"} <= indexes
+    assert {"ix_parcels_created_id", "ix_parcels_user_created_id", "ix_parcels_status_created_id"} <= indexes
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT route_coordinates FROM parcels")).scalar() is None
+
+
+def test_geohash_backfill_runs_on_migrated_database(tmp_path):
+    engine = baseline_engine(tmp_path)
+    create_schema(engine)
+
+    db = SessionLocal(bind=engine)
+    try:
+        backfill_geohashes(db)
+        parcel = db.query(Parcel).one()
+        assert parcel.pickup_geohash and parcel.destination_geohash
+        # Existing quotes were priced normally
+        assert parcel.quote_is_estimate is False
+    finally:
+        db.close()
@@ -0,0 +1,94 @@
+from app.models.outbox import EmailOutbox, OutboxStatus
+from app.models.parcel import Parcel, ParcelStatus, WeightCategory
+from app.services.email import LocalEmailTransport
+from app.services.outbox import OutboxWorker
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+@pytest.fixture(autouse=True)
+def no_coalesce_delay(monkeypatch):
+    monkeypatch.setattr("app.services.outbox.EMAIL_COALESCE_SECONDS", 0)
+
+def create_parcel(db_session, user):
+    parcel = Parcel(
+        user_id=user.id,
+        pickup_address="123 Start St",
+        destination_address="456 End Ave",
+        pickup_lat=-1.2864,
+        pickup_lng=36.8172,
+        destination_lat=-1.3000,
+        destination_lng=36.8000,
+        weight_category=WeightCategory.medium,
+        quote_amount=25.0,
+        status=ParcelStatus.pending
+    )
+    db_session.add(parcel)
+    db_session.commit()
+    return parcel
+
+def test_admin_update_queues_notifications(client, admin_headers, test_user, db_session):
+    parcel = create_parcel(db_session, test_user)
+
+    response = client.put(
+        f"/parcels/{parcel.id}/admin",
+        json={"status": "in_transit", "present_location": "Nairobi Hub"},
+        headers=admin_headers
+    )
+    assert response.status_code == 200
+
+    entries = db_session.query(EmailOutbox).order_by(EmailOutbox.id).all()
+    assert [(e.kind.value, e.value) for e in entries] == [
+        ("status", "in_transit"), ("location", "Nairobi Hub")
+    ]
+    assert all(e.to_email == test_user.email for e in entries)
+    assert all(e.status == OutboxStatus.pending for e in entries)
+
+def test_outbox_worker_sends_pending_messages(client, admin_headers, test_user, db_session):
+    parcel = create_parcel(db_session, test_user)
+    client.put(f"/parcels/{parcel.id}/admin", json={"status": "delivered"}, headers=admin_headers)
+
+    transport = LocalEmailTransport()
+    worker = OutboxWorker(session_factory=sessionmaker(bind=db_session.get_bind()), transport=transport)
+
+    assert worker.drain_once() == 1
+    assert [m["to_email"] for m in transport.sent] == [test_user.email]
+
+    db_session.expire_all()
+    assert db_session.query(EmailOutbox).one().status == OutboxStatus.sent
+    assert worker.drain_once() == 0
+
+def test_outbox_worker_backs_off_failed_sends(client, admin_headers, test_user, db_session):
+    parcel = create_parcel(db_session, test_user)
+    client.put(f"/parcels/{parcel.id}/admin", json={"status": "delivered"}, headers=admin_headers)
+
+    worker = OutboxWorker(
+        session_factory=sessionmaker(bind=db_session.get_bind()), transport=LocalEmailTransport(fail=True), max_attempts=2
+    )
+
+    assert worker.drain_once() == 1
+    db_session.expire_all()
+    entry = db_session.query(EmailOutbox).one()
+    assert entry.status == OutboxStatus.pending
+    assert entry.attempts == 1
+
+    # Not due yet because of the backoff delay
+    assert worker.drain_once() == 0
+
+def test_outbox_worker_coalesces_updates_per_parcel(client, admin_headers, test_user, db_session):
+    first = create_parcel(db_session, test_user)
+    second = create_parcel(db_session, test_user)
+    client.put(f"/parcels/{first.id}/admin", json={"status": "in_transit"}, headers=admin_headers)
+    client.put(f"/parcels/{first.id}/admin", json={"present_location": "Nairobi Hub"}, headers=admin_headers)
+    client.put(f"/parcels/{second.id}/admin", json={"status": "in_transit"}, headers=admin_headers)
+
+    transport = LocalEmailTransport()
+    worker = OutboxWorker(session_factory=sessionmaker(bind=db_session.get_bind()), transport=transport)
+    worker.drain_once()
+
+    # One message per parcel, the two status-only messages share a batch request
+    assert len(transport.sent) == 2
+    assert transport.batches == 2
+    merged = next(m for m in transport.sent if f"#{first.id} " in m["subject"])
+    assert "In Transit" in merged["content"] and "Nairobi Hub" in merged["content"]
+    db_session.expire_all()
+    assert all(e.status == OutboxStatus.sent for e in db_session.query(EmailOutbox).all())
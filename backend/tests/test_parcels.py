@@ -11,6 +11,27 @@ def test_create_parcel(client, auth_headers):
     assert response.status_code == 200
     assert response.json()["status"] == "pending"
 
+def test_quote_parcels_batch(client, auth_headers):
+    item = {
+        "pickup_lat": -1.2864,
+        "pickup_lng": 36.8172,
+        "destination_lat": -1.3000,
+        "destination_lng": 36.8000,
+        "weight_category": "small"
+    }
+    response = client.post(
+        "/parcels/quotes",
+        json={"items": [item, {**item, "weight_category": "large"}]},
+        headers=auth_headers
+    )
+    assert response.status_code == 200
+    quotes = response.json()
+    assert len(quotes) == 2
+    assert round(quotes[1]["quote_amount"] - quotes[0]["quote_amount"], 2) == 10.0
+
+    response = client.get("/parcels/", headers=auth_headers)
+    assert response.json() == []
+
 def test_get_user_parcels(client, auth_headers):
     response = client.get("/parcels/", headers=auth_headers)
     assert response.status_code == 200
@@ -54,3 +75,577 @@ def test_update_parcel_admin_only(client, auth_headers, admin_headers, test_user
         headers=admin_headers
     )
     assert response.status_code == 200
+
+
+def test_parcel_route_is_served_from_stored_columns(client, auth_headers, monkeypatch):
+    response = client.post(
+        "/parcels/",
+        json={
+            "pickup_address": "123 Start St",
+            "destination_address": "456 End Ave",
+            "pickup_lat": -1.2864,
+            "pickup_lng": 36.8172,
+            "destination_lat": -1.3000,
+            "destination_lng": 36.8000,
+            "weight_category": "medium"
+        },
+        headers=auth_headers
+    )
+    assert response.status_code == 200
+    parcel_id = response.json()["id"]
+
+    from app.services.maps import async_maps_service
+
+    async def fail_get_route(origin, destination):
+        raise AssertionError("route should not be recomputed")
+
+    monkeypatch.setattr(async_maps_service, "get_route", fail_get_route)
+
+    response = client.get(f"/parcels/{parcel_id}/route", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json()["distance"].endswith("km")
+
+def test_parcel_list_keyset_pagination_and_filters(client, auth_headers, test_user, db_session):
+    from datetime import datetime, timedelta
+    from app.models.parcel import Parcel, ParcelStatus, WeightCategory
+
+    start = datetime(2026, 1, 1)
+    for i in range(5):
+        db_session.add(Parcel(
+            user_id=test_user.id,
+            pickup_address="123 Start St",
+            destination_address=f"{i} End Ave",
+            pickup_lat=-1.2864,
+            pickup_lng=36.8172,
+            destination_lat=-1.3000,
+            destination_lng=36.8000,
+            weight_category=WeightCategory.small,
+            quote_amount=10.0,
+            status=ParcelStatus.delivered if i % 2 else ParcelStatus.pending,
+            # Two parcels share a timestamp so the id tie-breaker is exercised
+            created_at=start + timedelta(minutes=min(i, 3))
+        ))
+    db_session.commit()
+
+    seen = []
+    cursor = None
+    while True:
+        params = {"limit": 2, "fields": "destination_address", **({"cursor": cursor} if cursor else {})}
+        response = client.get("/parcels/", params=params, headers=auth_headers)
+        assert response.status_code == 200
+        assert all(list(p) == ["destination_address"] for p in response.json())
+        seen.extend(p["destination_address"] for p in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+
+    assert seen == ["4 End Ave", "3 End Ave", "2 End Ave", "1 End Ave", "0 End Ave"]
+
+    response = client.get("/parcels/", params={"status": "delivered", "order": "asc"}, headers=auth_headers)
+    assert [p["destination_address"] for p in response.json()] == ["1 End Ave", "3 End Ave"]
+    assert response.json()[0]["status"] == "delivered"
+    assert response.json()[0]["weight_category"] == "small"
+    assert response.json()[0]["created_at"] == "2026-01-01T00:01:00"
+
+    response = client.get("/parcels/", params={"cursor": "not-a-cursor"}, headers=auth_headers)
+    assert response.status_code == 400
+
+    response = client.get("/parcels/", params={"fields": "id,secret"}, headers=auth_headers)
+    assert response.status_code == 400
+
+def test_export_parcels_streams_ndjson_and_csv(client, auth_headers, admin_headers, test_user, db_session):
+    import json
+    from app.models.parcel import Parcel, ParcelStatus, WeightCategory
+
+    for status in (ParcelStatus.pending, ParcelStatus.delivered, ParcelStatus.delivered):
+        db_session.add(Parcel(
+            user_id=test_user.id,
+            pickup_address="123 Start St",
+            destination_address="456 End Ave",
+            pickup_lat=-1.2864,
+            pickup_lng=36.8172,
+            destination_lat=-1.3000,
+            destination_lng=36.8000,
+            weight_category=WeightCategory.large,
+            quote_amount=30.0,
+            status=status
+        ))
+    db_session.commit()
+
+    assert client.get("/parcels/export", headers=auth_headers).status_code == 403
+
+    response = client.get("/parcels/export", params={"status": "delivered"}, headers=admin_headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert len(rows) == 2
+    assert rows[0]["status"] == "delivered"
+    assert rows[0]["weight_category"] == "large"
+
+    response = client.get("/parcels/export", params={"format": "csv"}, headers=admin_headers)
+    lines = response.text.splitlines()
+    assert lines[0].startswith("id,user_id,pickup_address")
+    assert len(lines) == 4
+
+def test_parcel_summary_counters_follow_changes(client, auth_headers, admin_headers, test_user, db_session):
+    from app.models.parcel import Parcel, ParcelStatus, WeightCategory
+
+    parcels = [
+        Parcel(
+            user_id=test_user.id,
+            pickup_address="123 Start St",
+            destination_address="456 End Ave",
+            pickup_lat=-1.2864,
+            pickup_lng=36.8172,
+            destination_lat=-1.3000,
+            destination_lng=36.8000,
+            weight_category=weight,
+            quote_amount=amount,
+            status=ParcelStatus.pending
+        )
+        for weight, amount in ((WeightCategory.small, 10.0), (WeightCategory.large, 30.0))
+    ]
+    db_session.add_all(parcels)
+    db_session.commit()
+
+    response = client.put(
+        f"/parcels/{parcels[1].id}/admin",
+        json={"status": "delivered"},
+        headers=admin_headers
+    )
+    assert response.status_code == 200
+    response = client.put(f"/parcels/{parcels[0].id}/cancel", headers=auth_headers)
+    assert response.status_code == 200
+
+    summary = client.get("/parcels/summary", headers=auth_headers).json()
+    assert summary["total_parcels"] == 2
+    assert summary["by_status"] == {"pending": 0, "in_transit": 0, "delivered": 1, "cancelled": 1}
+    assert summary["by_weight"]["large"] == 1
+    assert summary["total_revenue"] == 30.0
+
+    stats = client.get("/admin/database-stats", headers=admin_headers).json()
+    assert stats["total_parcels"] == 2
+    assert stats["delivered_parcels"] == 1
+    assert stats["pending_parcels"] == 0
+    assert stats["admin_users"] == 1
+    assert stats["by_status"] == summary["by_status"]
+
+def test_parcel_counters_drop_a_deleted_parcel_with_unflushed_edits(client, auth_headers, test_user, db_session):
+    from app.models.parcel import Parcel, ParcelStatus, WeightCategory
+
+    parcel = Parcel(
+        user_id=test_user.id,
+        pickup_address="123 Start St",
+        destination_address="456 End Ave",
+        pickup_lat=-1.2864,
+        pickup_lng=36.8172,
+        destination_lat=-1.3000,
+        destination_lng=36.8000,
+        weight_category=WeightCategory.small,
+        quote_amount=10.0,
+        status=ParcelStatus.pending
+    )
+    db_session.add(parcel)
+    db_session.commit()
+
+    parcel.status = ParcelStatus.in_transit
+    parcel.weight_category = WeightCategory.large
+    parcel.quote_amount = 30.0
+    db_session.delete(parcel)
+    db_session.commit()
+
+    summary = client.get("/parcels/summary", headers=auth_headers).json()
+    assert summary["total_parcels"] == 0
+    assert set(summary["by_status"].values()) == {0}
+    assert set(summary["by_weight"].values()) == {0}
+    assert summary["total_revenue"] == 0
+
+def test_parcel_etags_answer_revalidation_with_304(client, auth_headers, admin_headers, test_user, db_session):
+    from app.models.parcel import Parcel, ParcelStatus, WeightCategory
+
+    parcel = Parcel(
+        user_id=test_user.id,
+        pickup_address="123 Start St",
+        destination_address="456 End Ave",
+        pickup_lat=-1.2864,
+        pickup_lng=36.8172,
+        destination_lat=-1.3000,
+        destination_lng=36.8000,
+        weight_category=WeightCategory.small,
+        quote_amount=10.0,
+        status=ParcelStatus.pending
+    )
+    db_session.add(parcel)
+    db_session.commit()
+
+    detail = client.get(f"/parcels/{parcel.id}", headers=auth_headers)
+    listing = client.get("/parcels/", params={"limit": 10}, headers=auth_headers)
+    assert detail.headers["ETag"] and listing.headers["ETag"]
+    assert detail.headers["Cache-Control"] == "private, no-cache"
+
+    response = client.get(
+        f"/parcels/{parcel.id}", headers={**auth_headers, "If-None-Match": detail.headers["ETag"]}
+    )
+    assert response.status_code == 304
+    assert response.content == b""
+    response = client.get(
+        "/parcels/", params={"limit": 10}, headers={**auth_headers, "If-None-Match": listing.headers["ETag"]}
+    )
+    assert response.status_code == 304
+    response = client.get(
+        f"/parcels/{parcel.id}", headers={**auth_headers, "If-Modified-Since": detail.headers["Last-Modified"]}
+    )
+    assert response.status_code == 304
+
+    # A different page of the same list is a different representation
+    response = client.get(
+        "/parcels/", params={"limit": 5}, headers={**auth_headers, "If-None-Match": listing.headers["ETag"]}
+    )
+    assert response.status_code == 200
+
+    client.put(f"/parcels/{parcel.id}/admin", json={"present_location": "Depot"}, headers=admin_headers)
+
+    response = client.get(
+        f"/parcels/{parcel.id}", headers={**auth_headers, "If-None-Match": detail.headers["ETag"]}
+    )
+    assert response.status_code == 200
+    assert response.json()["present_location"] == "Depot"
+    response = client.get(
+        "/parcels/", params={"limit": 10}, headers={**auth_headers, "If-None-Match": listing.headers["ETag"]}
+    )
+    assert response.status_code == 200
+
+def test_admin_bulk_update_in_one_transaction(client, auth_headers, admin_headers, test_user, test_admin, db_session):
+    from app.models.outbox import EmailOutbox
+    from app.models.parcel import Parcel, ParcelStatus, WeightCategory
+
+    parcels = [
+        Parcel(
+            user_id=test_user.id if i % 2 else test_admin.id,
+            pickup_address="123 Start St",
+            destination_address=f"{i} End Ave",
+            pickup_lat=-1.2864,
+            pickup_lng=36.8172,
+            destination_lat=-1.3000,
+            destination_lng=36.8000,
+            weight_category=WeightCategory.medium,
+            quote_amount=20.0,
+            status=ParcelStatus.delivered if i == 0 else ParcelStatus.pending
+        )
+        for i in range(1000)
+    ]
+    db_session.add_all(parcels)
+    db_session.commit()
+    ids = [parcel.id for parcel in parcels]
+
+    response = client.put(
+        "/parcels/admin/bulk",
+        json={"parcel_ids": ids, "status": "in_transit", "present_location": "Hub"},
+        headers=auth_headers
+    )
+    assert response.status_code == 403
+
+    response = client.put(
+        "/parcels/admin/bulk",
+        json={"filter": {"status": "pending"}, "status": "in_transit", "present_location": "Hub"},
+        headers=admin_headers
+    )
+    assert response.status_code == 200
+    assert response.json()["updated"] == 999
+    assert ids[0] not in response.json()["parcel_ids"]
+
+    summary = client.get("/parcels/summary", headers=auth_headers).json()
+    assert summary["by_status"]["in_transit"] == 500
+    assert summary["by_status"]["pending"] == 0
+
+    detail = client.get(f"/parcels/{ids[1]}", headers=auth_headers).json()
+    assert (detail["status"], detail["present_location"]) == ("in_transit", "Hub")
+    # One status and one location notification per parcel
+    assert db_session.query(EmailOutbox).count() == 999 * 2
+
+    response = client.put("/parcels/admin/bulk", json={"status": "delivered"}, headers=admin_headers)
+    assert response.status_code == 400
+    # An empty filter must not select every parcel
+    response = client.put("/parcels/admin/bulk", json={"filter": {}, "status": "delivered"}, headers=admin_headers)
+    assert response.status_code == 422
+    assert summary["by_status"] == client.get("/parcels/summary", headers=auth_headers).json()["by_status"]
+
+def test_nearby_parcels_sorted_by_distance(client, auth_headers, admin_headers, test_user, db_session):
+    from app.models.parcel import Parcel, ParcelStatus, WeightCategory
+
+    depot = (-1.2864, 36.8172)
+    # Roughly 0.5 km, 1.5 km, 2.5 km and 10 km north of the depot
+    offsets = [0.0045, 0.0135, 0.0225, 0.09]
+    parcels = [
+        Parcel(
+            user_id=test_user.id,
+            pickup_address=f"{offset} North Rd",
+            destination_address="456 End Ave",
+            pickup_lat=depot[0] + offset,
+            pickup_lng=depot[1],
+            destination_lat=-1.3000,
+            destination_lng=36.8000,
+            weight_category=WeightCategory.small,
+            quote_amount=10.0,
+            status=ParcelStatus.delivered if offset == 0.0135 else ParcelStatus.pending
+        )
+        for offset in reversed(offsets)
+    ]
+    db_session.add_all(parcels)
+    db_session.commit()
+    assert parcels[0].pickup_geohash.startswith("kzf")
+
+    params = {"lat": depot[0], "lng": depot[1], "radius_m": 3000, "fields": "id,pickup_address"}
+    response = client.get("/parcels/nearby", params=params, headers=auth_headers)
+    assert response.status_code == 403
+
+    response = client.get("/parcels/nearby", params=params, headers=admin_headers)
+    assert response.status_code == 200
+    found = response.json()
+    assert [p["pickup_address"] for p in found] == ["0.0045 North Rd", "0.0135 North Rd", "0.0225 North Rd"]
+    assert 450 < found[0]["distance_m"] < 550
+
+    response = client.get("/parcels/nearby", params={**params, "status": "pending", "limit": 1}, headers=admin_headers)
+    assert [p["pickup_address"] for p in response.json()] == ["0.0045 North Rd"]
+
+    # Moving a destination re-indexes it
+    far = parcels[0]
+    response = client.get(
+        "/parcels/nearby", params={**params, "point": "destination", "radius_m": 100}, headers=admin_headers
+    )
+    assert response.json() == []
+    far.destination_lat, far.destination_lng = depot
+    db_session.commit()
+    response = client.get(
+        "/parcels/nearby", params={**params, "point": "destination", "radius_m": 100}, headers=admin_headers
+    )
+    assert [p["id"] for p in response.json()] == [far.id]
+
+
+def test_admin_route_plan(client, auth_headers, admin_headers, test_user, db_session):
+    from app.models.parcel import Parcel, ParcelStatus, WeightCategory
+
+    depot = (-1.2864, 36.8172)
+    parcels = [
+        Parcel(
+            user_id=test_user.id,
+            pickup_address=f"Pickup {index}",
+            destination_address=f"Destination {index}",
+            pickup_lat=depot[0] + 0.01 * (index % 4 + 1),
+            pickup_lng=depot[1] + 0.01 * (index // 4),
+            destination_lat=-1.3000,
+            destination_lng=36.8000,
+            weight_category=WeightCategory.large if index % 3 == 0 else WeightCategory.small,
+            quote_amount=10.0,
+            status=ParcelStatus.pending
+        )
+        for index in range(12)
+    ]
+    db_session.add_all(parcels)
+    db_session.commit()
+
+    body = {"depot_lat": depot[0], "depot_lng": depot[1], "filter": {"status": "pending"},
+            "vehicle_capacity": 8, "time_limit_seconds": 1}
+    response = client.post("/parcels/admin/route-plan", json=body, headers=auth_headers)
+    assert response.status_code == 403
+
+    response = client.post("/parcels/admin/route-plan", json=body, headers=admin_headers)
+    assert response.status_code == 200
+    plan = response.json()
+    assert plan["parcel_count"] == 12
+    # 4 large (4 units) + 8 small (1 unit) = 24 units over vehicles of 8
+    assert plan["vehicle_count"] == len(plan["routes"]) >= 3
+    assert sorted(stop["parcel_id"] for route in plan["routes"] for stop in route["stops"]) == \
+        sorted(parcel.id for parcel in parcels)
+    assert all(route["load"] <= 8 for route in plan["routes"])
+    assert plan["total_distance_m"] <= plan["construction_distance_m"]
+    first_stop = plan["routes"][0]["stops"][0]
+    assert first_stop["address"].startswith("Pickup")
+    assert first_stop["leg_distance_m"] > 0
+
+    response = client.post(
+        "/parcels/admin/route-plan", json={**body, "vehicle_capacity": 2}, headers=admin_headers
+    )
+    assert response.status_code == 400
+
+    response = client.post(
+        "/parcels/admin/route-plan", json={**body, "parcel_ids": [parcels[0].id]}, headers=admin_headers
+    )
+    assert response.status_code == 400
+
+
+def test_admin_requote_estimated_parcels(client, auth_headers, admin_headers, test_user, db_session, monkeypatch):
+    from app.models.parcel import Parcel, ParcelStatus, WeightCategory
+    from app.services.circuit_breaker import CircuitBreaker
+    from app.services.maps import DistanceCache, maps_service
+
+    class FakeGoogleClient:
+        def distance_matrix(self, origins, destinations, mode, units):
+            element = {
+                "distance": {"text": "20.0 km", "value": 20000},
+                "duration": {"text": "0h 30m", "value": 1800},
+                "status": "OK",
+            }
+            return {"status": "OK", "rows": [{"elements": [element for _ in destinations]} for _ in origins]}
+
+    parcels = [
+        Parcel(
+            user_id=test_user.id,
+            pickup_address="Pickup",
+            destination_address="Destination",
+            pickup_lat=-1.2864,
+            pickup_lng=36.8172,
+            destination_lat=-1.3000 - 0.01 * index,
+            destination_lng=36.8000,
+            weight_category=WeightCategory.small,
+            quote_amount=7.0,
+            quote_is_estimate=index < 2,
+            status=ParcelStatus.delivered if index == 1 else ParcelStatus.pending
+        )
+        for index in range(3)
+    ]
+    db_session.add_all(parcels)
+    db_session.commit()
+
+    response = client.post("/parcels/admin/requote", headers=admin_headers)
+    assert response.status_code == 503
+
+    monkeypatch.setattr(maps_service, "gmaps", FakeGoogleClient())
+    monkeypatch.setattr(maps_service, "cache", DistanceCache())
+    monkeypatch.setattr(maps_service, "breaker", CircuitBreaker("test"))
+
+    response = client.post("/parcels/admin/requote", headers=auth_headers)
+    assert response.status_code == 403
+
+    response = client.post("/parcels/admin/requote", headers=admin_headers)
+    assert response.status_code == 200
+    # Only the pending parcel priced from an estimate is re-quoted
+    assert response.json() == {"requoted": 1, "still_estimated": 0, "changed": 0, "parcel_ids": [parcels[0].id]}
+
+    db_session.expire_all()
+    assert parcels[0].quote_amount == 15.0
+    assert parcels[0].distance_km == 20.0
+    assert not parcels[0].quote_is_estimate
+    assert parcels[1].quote_is_estimate
+
+    summary = client.get("/parcels/summary", headers=auth_headers).json()
+    assert summary["total_revenue"] == 15.0 + 7.0 + 7.0
+
+
+def test_admin_requote_skips_parcels_changed_while_pricing(client, admin_headers, test_user, db_session, monkeypatch):
+    from app.models.parcel import Parcel, ParcelStatus, WeightCategory
+    from app.services.maps import maps_service
+
+    parcel = Parcel(
+        user_id=test_user.id,
+        pickup_address="Pickup",
+        destination_address="Destination",
+        pickup_lat=-1.2864,
+        pickup_lng=36.8172,
+        destination_lat=-1.3000,
+        destination_lng=36.8000,
+        weight_category=WeightCategory.small,
+        quote_amount=7.0,
+        quote_is_estimate=True,
+        status=ParcelStatus.pending
+    )
+    db_session.add(parcel)
+    db_session.commit()
+
+    def price_while_owner_moves_destination(pairs):
+        # The owner changes the destination while Google is being asked
+        parcel.destination_lat = -4.0
+        parcel.quote_amount = 50.0
+        db_session.commit()
+        element = {"distance": {"text": "20.0 km", "value": 20000}, "duration": {"text": "0h 30m", "value": 1800}}
+        return [element for _ in pairs]
+
+    monkeypatch.setattr(maps_service, "gmaps", object())
+    monkeypatch.setattr(maps_service, "calculate_distance_matrix_batch", price_while_owner_moves_destination)
+
+    response = client.post("/parcels/admin/requote", headers=admin_headers)
+    assert response.status_code == 200
+    assert response.json() == {"requoted": 0, "still_estimated": 0, "changed": 1, "parcel_ids": []}
+
+    db_session.expire_all()
+    assert parcel.quote_amount == 50.0
+    assert parcel.quote_is_estimate
+
+
+def test_destination_update_rechecks_status_after_pricing(client, auth_headers, test_user, db_session, monkeypatch):
+    from app.models.parcel import Parcel, ParcelStatus, WeightCategory
+    from app.services.maps import async_maps_service
+
+    parcel = Parcel(
+        user_id=test_user.id,
+        pickup_address="Pickup",
+        destination_address="Destination",
+        pickup_lat=-1.2864,
+        pickup_lng=36.8172,
+        destination_lat=-1.3000,
+        destination_lng=36.8000,
+        weight_category=WeightCategory.small,
+        quote_amount=7.0,
+        status=ParcelStatus.in_transit
+    )
+    db_session.add(parcel)
+    db_session.commit()
+
+    async def route_while_delivered(origin, destination):
+        # The courier delivers the parcel while the new route is being priced
+        parcel.status = ParcelStatus.delivered
+        db_session.commit()
+        return async_maps_service.sync_service.estimate_distance(origin, destination), None
+
+    monkeypatch.setattr(async_maps_service, "get_route", route_while_delivered)
+
+    response = client.put(
+        f"/parcels/{parcel.id}/destination",
+        json={"destination_address": "Elsewhere", "destination_lat": -1.25, "destination_lng": 36.9},
+        headers=auth_headers
+    )
+    assert response.status_code == 400
+
+    db_session.expire_all()
+    assert parcel.destination_address == "Destination"
+    assert parcel.destination_lat == -1.3000
+
+
+def test_list_etag_follows_only_the_page(client, auth_headers, test_user, db_session):
+    from datetime import datetime, timedelta
+    from app.models.parcel import Parcel, ParcelStatus, WeightCategory
+
+    start = datetime(2026, 1, 1)
+    parcels = [
+        Parcel(
+            user_id=test_user.id,
+            pickup_address="Pickup",
+            destination_address="Destination",
+            pickup_lat=-1.2864,
+            pickup_lng=36.8172,
+            destination_lat=-1.3000,
+            destination_lng=36.8000,
+            weight_category=WeightCategory.small,
+            quote_amount=7.0,
+            status=ParcelStatus.pending,
+            created_at=start + timedelta(minutes=i)
+        )
+        for i in range(4)
+    ]
+    db_session.add_all(parcels)
+    db_session.commit()
+
+    listing = client.get("/parcels/", params={"limit": 2}, headers=auth_headers)
+    etag = listing.headers["ETag"]
+
+    # The oldest parcel is two pages down, so the first page is unchanged
+    parcels[0].present_location = "Depot"
+    db_session.commit()
+    response = client.get("/parcels/", params={"limit": 2}, headers={**auth_headers, "If-None-Match": etag})
+    assert response.status_code == 304
+
+    db_session.delete(parcels[3])
+    db_session.commit()
+    response = client.get("/parcels/", params={"limit": 2}, headers={**auth_headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert [row["id"] for row in response.json()] == [parcels[2].id, parcels[1].id]
@@ -0,0 +1,91 @@
+import threading
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.middleware.rate_limit import MemoryRateLimitStore, RateLimitRule, RateLimitStore, SQLiteRateLimitStore
+from app.middleware.security import RateLimitMiddleware
+from app.services.auth import create_access_token
+
+def test_memory_store_limits_within_window():
+    store = MemoryRateLimitStore()
+    results = [store.hit("ip:1", limit=3, period=60, now=120.0 + i) for i in range(4)]
+
+    assert [allowed for allowed, _ in results] == [True, True, True, False]
+    assert results[-1][1] > 0
+
+def test_memory_store_slides_into_next_window():
+    store = MemoryRateLimitStore()
+    for i in range(3):
+        store.hit("ip:1", limit=3, period=60, now=0.0 + i)
+
+    # Halfway through the next window half of the previous count still applies
+    assert store.hit("ip:1", limit=3, period=60, now=90.0)[0] is True
+    assert store.hit("ip:1", limit=3, period=60, now=90.0)[0] is False
+    # Two windows later everything has expired
+    assert store.hit("ip:1", limit=3, period=60, now=200.0)[0] is True
+
+def test_memory_store_bounds_number_of_keys():
+    store = MemoryRateLimitStore(max_keys=2)
+    for key in ("a", "b", "c"):
+        store.hit(key, limit=1, period=60, now=0.0)
+
+    # "a" was evicted, so it is allowed again
+    assert store.hit("a", limit=1, period=60, now=1.0)[0] is True
+    assert store.hit("c", limit=1, period=60, now=1.0)[0] is False
+
+def test_sqlite_store_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "rate_limits.db")
+    first, second = SQLiteRateLimitStore(path), SQLiteRateLimitStore(path)
+
+    assert first.hit("ip:1", limit=2, period=60, now=0.0)[0] is True
+    assert second.hit("ip:1", limit=2, period=60, now=1.0)[0] is True
+    assert first.hit("ip:1", limit=2, period=60, now=2.0)[0] is False
+
+def test_store_must_implement_hit():
+    with pytest.raises(TypeError):
+        RateLimitStore()
+
+def make_client(rules, store=None):
+    app = FastAPI()
+    app.add_middleware(RateLimitMiddleware, rules=rules, store=store)
+
+    @app.get("/parcels/")
+    def parcels():
+        return []
+
+    @app.get("/loop")
+    async def loop():
+        return {"thread": threading.get_ident()}
+
+    @app.get("/health")
+    def health():
+        return {}
+
+    return TestClient(app)
+
+def test_middleware_applies_per_route_and_per_user_limits():
+    client = make_client([RateLimitRule(calls=2, period=60, path_prefix="/parcels", per="user")])
+    alice = {"Authorization": f"Bearer {create_access_token(data={'sub': 'alice@example.com'})}"}
+    bob = {"Authorization": f"Bearer {create_access_token(data={'sub': 'bob@example.com'})}"}
+
+    assert [client.get("/parcels/", headers=alice).status_code for _ in range(3)] == [200, 200, 429]
+    assert client.get("/parcels/", headers=bob).status_code == 200
+    assert client.get("/health").status_code == 200
+
+    response = client.get("/parcels/", headers=alice)
+    assert int(response.headers["Retry-After"]) >= 1
+
+def test_middleware_calls_blocking_store_off_the_event_loop(tmp_path):
+    threads = []
+
+    class RecordingStore(SQLiteRateLimitStore):
+        def hit(self, key, limit, period, now):
+            threads.append(threading.get_ident())
+            return super().hit(key, limit, period, now)
+
+    client = make_client([RateLimitRule(calls=5, period=60)], RecordingStore(str(tmp_path / "rate_limits.db")))
+    loop_thread = client.get("/loop").json()["thread"]
+
+    assert threads and loop_thread not in threads
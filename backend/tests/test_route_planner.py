@@ -0,0 +1,57 @@
+import itertools
+
+import numpy as np
+
+from app.services.maps import MapsService
+from app.services.route_planner import plan_routes, route_cost, savings_routes, two_opt
+
+
+def random_instance(count, seed=1):
+    rng = np.random.default_rng(seed)
+    points = np.column_stack([-1.2864 + rng.uniform(-0.1, 0.1, count + 1),
+                              36.8172 + rng.uniform(-0.1, 0.1, count + 1)])
+    distance_m, _ = MapsService().distance_matrix(points)
+    demands = np.concatenate(([0], rng.choice([1, 2, 4], count)))
+    return distance_m, demands
+
+
+def test_distance_matrix_matches_pairwise_estimates():
+    service = MapsService()
+    points = [(-1.2864, 36.8172), (-1.3000, 36.8000), (-1.2500, 36.9000)]
+    distance_m, duration_s = service.distance_matrix(points)
+    assert distance_m.shape == duration_s.shape == (3, 3)
+    assert np.allclose(np.diag(distance_m), 0)
+    element = service.estimate_distance(points[1], points[2])
+    assert round(distance_m[1, 2]) == element['distance']['value']
+    assert round(duration_s[1, 2]) == element['duration']['value']
+
+
+def test_plan_visits_every_stop_once_within_capacity():
+    distance_m, demands = random_instance(200)
+    plan = plan_routes(distance_m, demands, capacity=20, time_limit=5)
+
+    visited = sorted(stop for route in plan.routes for stop in route)
+    assert visited == list(range(1, 201))
+    assert all(demands[route].sum() <= 20 for route in plan.routes)
+    assert plan.distance <= plan.construction_distance
+    assert abs(plan.distance - sum(route_cost(distance_m, route) for route in plan.routes)) < 1e-6
+
+
+def test_single_vehicle_matches_brute_force_optimum():
+    distance_m, demands = random_instance(7, seed=3)
+    plan = plan_routes(distance_m, demands, capacity=100, time_limit=5)
+
+    best = min(route_cost(distance_m, list(order)) for order in itertools.permutations(range(1, 8)))
+    assert len(plan.routes) == 1
+    assert plan.distance <= best * 1.02
+
+
+def test_asymmetric_costs_are_respected():
+    # Going round 1 -> 2 -> 3 is cheap, the other way is expensive
+    cost = np.full((4, 4), 10.0)
+    np.fill_diagonal(cost, 0)
+    cost[0, 1] = cost[1, 2] = cost[2, 3] = cost[3, 0] = 1
+    route = [3, 2, 1]
+    two_opt(cost, route)
+    assert route == [1, 2, 3]
+    assert savings_routes(cost, np.array([0, 1, 1, 1]), 3) == [[1, 2, 3]]
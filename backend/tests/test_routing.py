@@ -0,0 +1,158 @@
+import asyncio
+import json
+
+import numpy as np
+
+from app.services.maps import MapsService
+from app.services.routing import (
+    AsyncRoadGraphMapsService, RoadGraph, RoadGraphMapsService, encode_polyline
+)
+
+# Streets every 0.005 degrees (~550 m) around Nairobi CBD
+ORIGIN_LAT, ORIGIN_LNG, STEP, SIZE = -1.30, 36.80, 0.005, 6
+
+def grid_geojson(path, oneway_row=None, island=False):
+    features = []
+    for i in range(SIZE):
+        row = [[ORIGIN_LNG + j * STEP, ORIGIN_LAT + i * STEP] for j in range(SIZE)]
+        column = [[ORIGIN_LNG + i * STEP, ORIGIN_LAT + j * STEP] for j in range(SIZE)]
+        properties = {"highway": "residential"}
+        if i == oneway_row:
+            properties = {"highway": "primary", "oneway": "yes"}
+        features.append({"type": "Feature", "properties": properties,
+                         "geometry": {"type": "LineString", "coordinates": row}})
+        features.append({"type": "Feature", "properties": {"highway": "residential"},
+                         "geometry": {"type": "LineString", "coordinates": column}})
+    if island:
+        features.append({"type": "Feature", "properties": {}, "geometry": {
+            "type": "LineString", "coordinates": [[37.5, -1.0], [37.501, -1.0]]
+        }})
+    path.write_text(json.dumps({"type": "FeatureCollection", "features": features}))
+    return str(path)
+
+def test_encode_polyline_matches_reference():
+    points = [(38.5, -120.2), (40.7, -120.95), (43.252, -126.453)]
+    assert encode_polyline(points) == "_p~iF~ps|U_ulLnnqC_mqNvxq`@"
+
+def test_graph_build_snap_and_route(tmp_path):
+    graph = RoadGraph.from_geojson(grid_geojson(tmp_path / "roads.geojson", island=True))
+    # The disconnected way is dropped
+    assert graph.node_count == SIZE * SIZE
+    assert len(graph.indptr) == graph.node_count + 1
+
+    node, distance = graph.nearest_node(ORIGIN_LAT + 0.0004, ORIGIN_LNG + 0.0001)
+    assert (graph.node_lat[node], graph.node_lng[node]) == (ORIGIN_LAT, ORIGIN_LNG)
+    assert distance < 50
+
+    metres, seconds, points = graph.route((ORIGIN_LAT, ORIGIN_LNG), (ORIGIN_LAT + 2 * STEP, ORIGIN_LNG + 3 * STEP))
+    # Manhattan distance along the grid: five blocks of ~556 m at 25 km/h
+    assert abs(metres - 5 * 556) < 20
+    assert abs(seconds - metres / (25 / 3.6)) < 5
+    assert points[0] == (ORIGIN_LAT, ORIGIN_LNG)
+    assert graph.route((ORIGIN_LAT, ORIGIN_LNG), (10.0, 10.0)) is None
+
+def test_oneway_streets_are_respected(tmp_path):
+    graph = RoadGraph.from_geojson(grid_geojson(tmp_path / "roads.geojson", oneway_row=0))
+    east = graph.route((ORIGIN_LAT, ORIGIN_LNG), (ORIGIN_LAT, ORIGIN_LNG + 5 * STEP))
+    west = graph.route((ORIGIN_LAT, ORIGIN_LNG + 5 * STEP), (ORIGIN_LAT, ORIGIN_LNG))
+    # Eastbound uses the fast one-way street, westbound has to detour
+    assert east[1] < west[1]
+    assert west[0] > east[0]
+
+def test_graph_cache_is_memory_mapped_and_rebuilt_when_stale(tmp_path):
+    source = grid_geojson(tmp_path / "roads.geojson")
+    cache_dir = str(tmp_path / "cache")
+
+    graph = RoadGraph.open(source, cache_dir)
+    assert isinstance(graph.indices, np.memmap)
+    assert RoadGraph.open(source, cache_dir).node_count == graph.node_count
+
+    grid_geojson(tmp_path / "roads.geojson", island=False, oneway_row=1)
+    rebuilt = RoadGraph.open(source, cache_dir)
+    assert len(rebuilt.indices) < len(graph.indices)
+
+def test_graph_provider_serves_routes(tmp_path):
+    service = RoadGraphMapsService(RoadGraph.from_geojson(grid_geojson(tmp_path / "roads.geojson")))
+    async_service = AsyncRoadGraphMapsService(service)
+    origin, destination = (ORIGIN_LAT, ORIGIN_LNG), (ORIGIN_LAT + STEP, ORIGIN_LNG + STEP)
+
+    distance_info, polyline = asyncio.run(async_service.get_route(origin, destination))
+    assert distance_info["status"] == "OK"
+    assert abs(distance_info["distance"]["value"] - 2 * 556) < 10
+    assert polyline.startswith(encode_polyline([origin]))
+    assert async_service.enabled
+
+    # Off the network: the straight-line estimate, and no polyline
+    distance_info, polyline = service.get_route(origin, (-4.0, 39.6))
+    assert distance_info["distance"]["value"] > 300_000
+    assert polyline is None
+
+def test_graph_batch_matches_single_routes(tmp_path):
+    service = RoadGraphMapsService(RoadGraph.from_geojson(grid_geojson(tmp_path / "roads.geojson", oneway_row=0)))
+    depot = (ORIGIN_LAT, ORIGIN_LNG)
+    stops = [(ORIGIN_LAT + i * STEP, ORIGIN_LNG + j * STEP) for i in range(SIZE) for j in range(SIZE)]
+    pairs = [(depot, stop) for stop in stops] + [(stops[-1], depot), (depot, (-4.0, 39.6))]
+
+    results = service.calculate_distance_matrix_batch(pairs)
+
+    for (origin, destination), result in zip(pairs[:-1], results):
+        assert result == service.get_route(origin, destination)[0]
+    # Off the network: the straight-line estimate
+    assert results[-1] == service.estimate_distance(depot, (-4.0, 39.6))
+    assert service.cache.get(depot, stops[-1]) == results[len(stops) - 1]
+    # A regular MapsService underneath: never calls Google, breaker closed
+    assert service.gmaps is None and service.breaker.state == service.breaker.CLOSED
+
+def test_graph_distance_matrix_falls_back_only_off_the_network(tmp_path):
+    service = RoadGraphMapsService(RoadGraph.from_geojson(grid_geojson(tmp_path / "roads.geojson", oneway_row=0)))
+    points = [(ORIGIN_LAT, ORIGIN_LNG), (ORIGIN_LAT, ORIGIN_LNG + 5 * STEP), (ORIGIN_LAT + 2 * STEP, ORIGIN_LNG + STEP),
+              (-4.0, 39.6)]
+
+    distance_m, duration_s = service.distance_matrix(points)
+    estimate_m, _ = MapsService.distance_matrix(service, points)
+
+    for i, origin in enumerate(points[:3]):
+        for j, destination in enumerate(points[:3]):
+            if i != j:
+                route = service.graph.route(origin, destination)
+                assert abs(distance_m[i, j] - route[0]) < 1e-3
+                assert abs(duration_s[i, j] - route[1]) < 1e-3
+    assert distance_m[0, 0] == 0
+    assert distance_m[0, 3] == estimate_m[0, 3] and distance_m[3, 1] == estimate_m[3, 1]
+
+def test_route_plan_uses_graph_distances(tmp_path, client, admin_headers, test_user, db_session, monkeypatch):
+    from app.models.parcel import Parcel, ParcelStatus, WeightCategory
+    from app.routers import parcels as parcels_router
+
+    service = RoadGraphMapsService(RoadGraph.from_geojson(grid_geojson(tmp_path / "roads.geojson")))
+    monkeypatch.setattr(parcels_router, "maps_service", service)
+    stops = [(ORIGIN_LAT + STEP * (1 + index % 3), ORIGIN_LNG + STEP * (1 + index // 3)) for index in range(6)]
+    db_session.add_all([
+        Parcel(
+            user_id=test_user.id,
+            pickup_address=f"Pickup {index}",
+            destination_address="Destination",
+            pickup_lat=lat,
+            pickup_lng=lng,
+            destination_lat=ORIGIN_LAT,
+            destination_lng=ORIGIN_LNG,
+            weight_category=WeightCategory.small,
+            quote_amount=10.0,
+            status=ParcelStatus.pending
+        )
+        for index, (lat, lng) in enumerate(stops)
+    ])
+    db_session.commit()
+
+    body = {"depot_lat": ORIGIN_LAT, "depot_lng": ORIGIN_LNG, "filter": {"status": "pending"},
+            "vehicle_capacity": 3, "time_limit_seconds": 1}
+    response = client.post("/parcels/admin/route-plan", json=body, headers=admin_headers)
+    assert response.status_code == 200
+
+    for route in response.json()["routes"]:
+        previous = (ORIGIN_LAT, ORIGIN_LNG)
+        for stop in route["stops"]:
+            # Along the street grid, not the straight-line estimate
+            metres = service.graph.route(previous, (stop["lat"], stop["lng"]))[0]
+            assert abs(stop["leg_distance_m"] - metres) < 0.1
+            previous = (stop["lat"], stop["lng"])
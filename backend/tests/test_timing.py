@@ -0,0 +1,101 @@
+import asyncio
+import json
+import logging
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+
+from app.middleware.timing import ServerTimingMiddleware, instrument_engine, instrument_service, timed
+
+
+class FakeMaps:
+    def __init__(self):
+        self.calls = 0
+
+    def estimate_distance(self, origin, destination):
+        self.calls += 1
+        return {"distance": {"value": 1000}}
+
+    def calculate_distance_matrix(self, origin, destination):
+        # Nested calls into the same service count once
+        return self.estimate_distance(origin, destination)
+
+    async def get_route(self, origin, destination):
+        await asyncio.sleep(0.01)
+        return self.calculate_distance_matrix(origin, destination), None
+
+
+def timed_app():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    instrument_engine(engine)
+    maps = FakeMaps()
+    instrument_service(maps, "maps", ["estimate_distance", "calculate_distance_matrix", "get_route"])
+
+    app = FastAPI()
+    app.add_middleware(ServerTimingMiddleware)
+
+    @app.get("/parcels/{parcel_id}")
+    async def parcel(parcel_id: int):
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+            connection.execute(text("SELECT 2"))
+        await maps.get_route((0, 0), (1, 1))
+        return {"id": parcel_id}
+
+    @app.get("/plain")
+    def plain():
+        return {}
+
+    @app.get("/broken")
+    def broken():
+        with engine.connect() as connection:
+            try:
+                connection.execute(text("SELECT * FROM missing_table"))
+            except Exception:
+                pass
+            connection.execute(text("SELECT 1"))
+            return {"leftover": "query_started" in connection.info}
+
+    return app, maps
+
+
+def test_server_timing_header_and_access_log(caplog):
+    app, maps = timed_app()
+    with caplog.at_level(logging.INFO, logger="app.access"), TestClient(app) as client:
+        response = client.get("/parcels/7")
+
+    assert response.status_code == 200
+    metrics = {part.split(";")[0]: part for part in response.headers["server-timing"].split(", ")}
+    assert set(metrics) == {"db", "maps", "total"}
+    assert 'desc="2 calls"' in metrics["db"]
+    assert 'desc="1 calls"' in metrics["maps"]
+    assert float(metrics["maps"].split("dur=")[1].split(";")[0]) >= 10
+    assert maps.calls == 1
+
+    access = [record for record in caplog.records if record.name == "app.access"]
+    entry = json.loads(access[-1].getMessage())
+    assert entry["route"] == "/parcels/{parcel_id}"
+    assert entry["path"] == "/parcels/7"
+    assert entry["status"] == 200
+    assert entry["db_calls"] == 2 and entry["maps_calls"] == 1 and entry["email_calls"] == 0
+    assert entry["duration_ms"] >= entry["maps_ms"]
+
+
+def test_timed_calls_outside_requests_pass_through():
+    app, maps = timed_app()
+    assert maps.calculate_distance_matrix((0, 0), (1, 1)) == {"distance": {"value": 1000}}
+    assert timed("maps", lambda value: value * 2)(21) == 42
+
+    with TestClient(app) as client:
+        assert client.get("/plain").headers["server-timing"].startswith("total;dur=")
+
+
+def test_failed_statements_are_timed_and_leave_nothing_behind():
+    app, _ = timed_app()
+    with TestClient(app) as client:
+        response = client.get("/broken")
+
+    assert response.json() == {"leftover": False}
+    assert 'desc="2 calls"' in response.headers["server-timing"]
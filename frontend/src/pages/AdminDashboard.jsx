@@ -34,6 +34,8 @@ import { motion } from 'framer-motion';
 const AdminDashboard = () => {
   const [parcels, setParcels] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [statusFilter, setStatusFilter] = useState('');
+  const [nextCursor, setNextCursor] = useState(null);
   const [editDialog, setEditDialog] = useState(false);
   const [selectedParcel, setSelectedParcel] = useState(null);
   const [updateData, setUpdateData] = useState({
@@ -42,11 +44,16 @@ const AdminDashboard = () => {
   });
   const navigate = useNavigate();
 
-  const fetchAllParcels = useCallback(async () => {
+  const fetchAllParcels = useCallback(async (cursor = null) => {
     try {
       setLoading(true);
-      const response = await api.get('/parcels/all');
-      setParcels(response.data);
+      // Filtering and pagination happen on the server
+      const params = { limit: 100 };
+      if (statusFilter) params.status = statusFilter;
+      if (cursor) params.cursor = cursor;
+      const response = await api.get('/parcels/all', { params });
+      setParcels((previous) => (cursor ? [...previous, ...response.data] : response.data));
+      setNextCursor(response.headers['x-next-cursor'] || null);
       toast.success('Parcels loaded successfully');
     } catch (error) {
       if (error.response && error.response.status === 403) {
@@ -58,7 +65,7 @@ const AdminDashboard = () => {
     } finally {
       setLoading(false);
     }
-  }, [navigate]);
+  }, [navigate, statusFilter]);
 
   useEffect(() => {
     fetchAllParcels();
@@ -158,7 +165,7 @@ const AdminDashboard = () => {
               <Button
                 variant="outlined"
                 startIcon={<RefreshIcon />}
-                onClick={fetchAllParcels}
+                onClick={() => fetchAllParcels()}
                 disabled={loading}
                 sx={{ borderRadius: 3, px: 3 }}
               >
@@ -218,11 +225,27 @@ const AdminDashboard = () => {
           transition={{ duration: 0.5, delay: 0.3 }}
         >
           <Paper sx={{ p: 3 }}>
-            <Typography variant="h5" fontWeight={600} gutterBottom>
-              All Parcels
-            </Typography>
+            <Box sx={{ display: 'flex', justifyContent: 'space-between', alignItems: 'center', mb: 2 }}>
+              <Typography variant="h5" fontWeight={600}>
+                All Parcels
+              </Typography>
+              <TextField
+                select
+                size="small"
+                label="Status"
+                value={statusFilter}
+                onChange={(e) => setStatusFilter(e.target.value)}
+                sx={{ minWidth: 180 }}
+              >
+                <MenuItem value="">All</MenuItem>
+                <MenuItem value="pending">Pending</MenuItem>
+                <MenuItem value="in_transit">In Transit</MenuItem>
+                <MenuItem value="delivered">Delivered</MenuItem>
+                <MenuItem value="cancelled">Cancelled</MenuItem>
+              </TextField>
+            </Box>
             
-            {loading ? (
+            {loading && parcels.length === 0 ? (
               <Box sx={{ textAlign: 'center', py: 8 }}>
                 <Typography>Loading parcels...</Typography>
               </Box>
@@ -317,6 +340,18 @@ const AdminDashboard = () => {
                     ))}
                   </TableBody>
                 </Table>
+                {nextCursor && (
+                  <Box sx={{ textAlign: 'center', mt: 2 }}>
+                    <Button
+                      variant="outlined"
+                      onClick={() => fetchAllParcels(nextCursor)}
+                      disabled={loading}
+                      sx={{ borderRadius: 3, px: 3 }}
+                    >
+                      Load more
+                    </Button>
+                  </Box>
+                )}
               </TableContainer>
             )}
           </Paper>
@@ -24,6 +24,7 @@ import { PieChart, Pie, Cell, BarChart, Bar, XAxis, YAxis, CartesianGrid, Toolti
 
 const Dashboard = () => {
   const [parcels, setParcels] = useState([]);
+  const [summary, setSummary] = useState(null);
   const [loading, setLoading] = useState(true);
   const navigate = useNavigate();
 
@@ -33,8 +34,13 @@ const Dashboard = () => {
 
   const fetchParcels = async () => {
     try {
-      const response = await api.get('/parcels/');
-      setParcels(response.data);
+      // Counts come from the server-side summary; only the recent parcels are listed
+      const [summaryResponse, recentResponse] = await Promise.all([
+        api.get('/parcels/summary'),
+        api.get('/parcels/', { params: { limit: 3 } }),
+      ]);
+      setSummary(summaryResponse.data);
+      setParcels(recentResponse.data);
     } catch (error) {
       toast.error('Failed to fetch parcels');
     } finally {
@@ -42,23 +48,14 @@ const Dashboard = () => {
     }
   };
 
-  const getStatusCounts = () => {
-    const counts = {
-      pending: 0,
-      in_transit: 0,
-      delivered: 0,
-      cancelled: 0,
-    };
-    
-    parcels.forEach(parcel => {
-      counts[parcel.status] = (counts[parcel.status] || 0) + 1;
-    });
-    
-    return counts;
+  const statusCounts = {
+    pending: 0,
+    in_transit: 0,
+    delivered: 0,
+    cancelled: 0,
+    ...(summary ? summary.by_status : {}),
   };
-
-  const statusCounts = getStatusCounts();
-  const totalParcels = parcels.length;
+  const totalParcels = summary ? summary.total_parcels : 0;
 
   const pieData = [
     { name: 'Pending', value: statusCounts.pending, color: '#FF9800' },
@@ -47,7 +47,7 @@ import {
   Verified as VerifiedIcon,
 } from '@mui/icons-material';
 import { useParams, useNavigate } from 'react-router-dom';
-import api from '../utils/api';
+import api, { subscribeToParcelEvents } from '../utils/api';
 import { toast } from 'react-hot-toast';
 import { motion, AnimatePresence } from 'framer-motion';
 import MapContainer from '../components/MapContainer';
@@ -87,6 +87,12 @@ const ParcelDetail = () => {
     fetchParcel();
   }, [fetchParcel]);
 
+  useEffect(() => subscribeToParcelEvents(({ parcelId, fields }) => {
+    if (String(parcelId) === String(id)) {
+      setParcel((current) => (current ? { ...current, ...fields } : current));
+    }
+  }), [id]);
+
   const handleCancel = async () => {
     if (!window.confirm('Are you sure you want to cancel this delivery?')) {
       return;
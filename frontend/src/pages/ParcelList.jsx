@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useCallback } from 'react';
 import {
   Container,
   Paper,
@@ -23,7 +23,7 @@ import {
   Edit as EditIcon,
 } from '@mui/icons-material';
 import { useNavigate } from 'react-router-dom';
-import api from '../utils/api';
+import api, { subscribeToParcelEvents } from '../utils/api';
 import { toast } from 'react-hot-toast';
 import { motion } from 'framer-motion';
 
@@ -33,27 +33,42 @@ const ParcelList = () => {
   const [loading, setLoading] = useState(true);
   const [searchTerm, setSearchTerm] = useState('');
   const [statusFilter, setStatusFilter] = useState('all');
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [actionLoading, setActionLoading] = useState({});
   const navigate = useNavigate();
 
-  useEffect(() => {
-    fetchParcels();
-  }, []);
-
-  useEffect(() => {
-    filterParcels();
-  }, [parcels, searchTerm, statusFilter]);
-
-  const fetchParcels = async () => {
+  const fetchParcels = useCallback(async (cursor = null) => {
     try {
-      const response = await api.get('/parcels/');
-      setParcels(response.data);
+      if (cursor) setLoadingMore(true);
+      // The status filter and pagination happen on the server
+      const params = { limit: 100 };
+      if (statusFilter !== 'all') params.status = statusFilter;
+      if (cursor) params.cursor = cursor;
+      const response = await api.get('/parcels/', { params });
+      setParcels((previous) => (cursor ? [...previous, ...response.data] : response.data));
+      setNextCursor(response.headers['x-next-cursor'] || null);
     } catch (error) {
       toast.error('Failed to fetch parcels');
     } finally {
       setLoading(false);
+      setLoadingMore(false);
     }
-  };
+  }, [statusFilter]);
+
+  useEffect(() => {
+    fetchParcels();
+  }, [fetchParcels]);
+
+  useEffect(() => subscribeToParcelEvents(({ parcelId, fields }) => {
+    setParcels((current) => current.map((parcel) => (
+      parcel.id === parcelId ? { ...parcel, ...fields } : parcel
+    )));
+  }), []);
+
+  useEffect(() => {
+    filterParcels();
+  }, [parcels, searchTerm, statusFilter]);
 
   const filterParcels = () => {
     let filtered = parcels;
@@ -67,7 +82,7 @@ const ParcelList = () => {
       );
     }
 
-    // Filter by status
+    // Live status updates can move a loaded parcel out of the filter
     if (statusFilter !== 'all') {
       filtered = filtered.filter(parcel => parcel.status === statusFilter);
     }
@@ -381,6 +396,20 @@ const ParcelList = () => {
             </Paper>
           </motion.div>
         )}
+
+        {/* Next page; search only covers the parcels loaded so far */}
+        {nextCursor && (
+          <Box sx={{ textAlign: 'center', mt: 4 }}>
+            <Button
+              variant="outlined"
+              onClick={() => fetchParcels(nextCursor)}
+              disabled={loadingMore}
+              sx={{ borderRadius: 3, px: 3 }}
+            >
+              {loadingMore ? 'Loading...' : 'Load more'}
+            </Button>
+          </Box>
+        )}
       </Box>
     </Container>
   );
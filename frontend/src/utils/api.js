@@ -68,4 +68,51 @@ api.interceptors.response.use(
   }
 );
 
+// Subscribe to pushed status, location and destination changes for the
+// user's parcels. EventSource cannot send headers, so the stream is opened
+// with a short-lived ticket in the query string rather than the access token;
+// a stream the server closed is reopened with a fresh ticket. Returns a
+// function that closes the stream.
+export const subscribeToParcelEvents = (onEvent) => {
+  if (!localStorage.getItem('token') || typeof EventSource === 'undefined') {
+    return () => {};
+  }
+
+  let source = null;
+  let retry = null;
+  let closed = false;
+
+  const connect = async () => {
+    if (!localStorage.getItem('token')) return;
+    try {
+      const response = await api.post('/parcels/stream/ticket');
+      if (closed) return;
+      source = new EventSource(
+        `${API_BASE_URL}/parcels/stream?ticket=${encodeURIComponent(response.data.ticket)}`
+      );
+    } catch (error) {
+      if (!closed) retry = setTimeout(connect, 5000);
+      return;
+    }
+    source.addEventListener('parcel', (message) => {
+      const { change, parcel_id: parcelId, ...fields } = JSON.parse(message.data);
+      onEvent({ change, parcelId, fields });
+    });
+    source.onerror = () => {
+      // EventSource retries dropped connections itself, but gives up once
+      // the server refuses the URL, e.g. after the ticket has expired
+      if (source.readyState === EventSource.CLOSED && !closed) {
+        retry = setTimeout(connect, 5000);
+      }
+    };
+  };
+
+  connect();
+  return () => {
+    closed = true;
+    clearTimeout(retry);
+    if (source) source.close();
+  };
+};
+
 export default api;
\ No newline at end of file